@@ -0,0 +1,293 @@
+"""
+SAR/ATR/滑动极值内核及SMA/EMA/RSI一致性检查
+用原始的逐根Python实现作为基准，在随机游走、单边趋势、横盘（最高价=最低价）以及含NaN的行情上
+比对indicators.kernels和向量化均线的输出（多组参数的sar_grid_loop与逐组sar_loop逐位比对）；安装了numba时编译版本和纯Python版本都会检查，并给出每1000根K线的耗时
+
+运行:
+    python3 -m indicators.conformance
+"""
+import sys
+import time
+import numpy as np
+from . import kernels
+
+def _reference_sar(high, low, af_start=0.02, af_increment=0.02, af_maximum=0.2):
+    """calculate_sar改为内核实现之前的代码"""
+    n = len(high)
+    sar = np.zeros(n)
+    trend = np.zeros(n, dtype=int)
+    sar[0] = low[0]
+    trend[0] = 1
+    ep = high[0]
+    af = af_start
+    for i in range(1, n):
+        if trend[i-1] == 1:
+            sar[i] = sar[i-1] + af * (ep - sar[i-1])
+            if sar[i] > low[i]:
+                sar[i] = low[i]
+            if high[i] > ep:
+                ep = high[i]
+                af = min(af + af_increment, af_maximum)
+            if low[i] < sar[i]:
+                trend[i] = -1
+                sar[i] = ep
+                ep = low[i]
+                af = af_start
+            else:
+                trend[i] = 1
+        else:
+            sar[i] = sar[i-1] + af * (ep - sar[i-1])
+            if sar[i] < high[i]:
+                sar[i] = high[i]
+            if low[i] < ep:
+                ep = low[i]
+                af = min(af + af_increment, af_maximum)
+            if high[i] > sar[i]:
+                trend[i] = 1
+                sar[i] = ep
+                ep = high[i]
+                af = af_start
+            else:
+                trend[i] = -1
+    return sar, trend
+
+def _reference_parabolic_sar(high, low, initial_af=0.02, af_increment=0.02, max_af=0.2):
+    """AdvancedIndicators.parabolic_sar改为内核实现之前的代码（pandas逐根iloc）"""
+    import pandas as pd
+
+    high, low = pd.Series(high), pd.Series(low)
+    length = len(high)
+    sar = np.zeros(length)
+    trend = np.zeros(length, dtype=int)
+    af = np.zeros(length)
+    ep = np.zeros(length)
+    sar[0] = low.iloc[0]
+    trend[0] = 1
+    af[0] = initial_af
+    ep[0] = high.iloc[0]
+    for i in range(1, length):
+        if trend[i-1] == 1:
+            sar[i] = sar[i-1] + af[i-1] * (ep[i-1] - sar[i-1])
+            if low.iloc[i] <= sar[i]:
+                trend[i] = -1
+                sar[i] = ep[i-1]
+                af[i] = initial_af
+                ep[i] = low.iloc[i]
+            else:
+                trend[i] = 1
+                if high.iloc[i] > ep[i-1]:
+                    af[i] = min(af[i-1] + af_increment, max_af)
+                    ep[i] = high.iloc[i]
+                else:
+                    af[i] = af[i-1]
+                    ep[i] = ep[i-1]
+        else:
+            sar[i] = sar[i-1] + af[i-1] * (ep[i-1] - sar[i-1])
+            if high.iloc[i] >= sar[i]:
+                trend[i] = 1
+                sar[i] = ep[i-1]
+                af[i] = initial_af
+                ep[i] = high.iloc[i]
+            else:
+                trend[i] = -1
+                if low.iloc[i] < ep[i-1]:
+                    af[i] = min(af[i-1] + af_increment, max_af)
+                    ep[i] = low.iloc[i]
+                else:
+                    af[i] = af[i-1]
+                    ep[i] = ep[i-1]
+    return sar
+
+def _reference_atr(high, low, close, period=14):
+    """OptimizedSARStrategy.calculate_atr最初的嵌套循环实现"""
+    n = len(close)
+    tr = np.zeros(n)
+    for i in range(1, n):
+        tr[i] = max(high[i] - low[i], abs(high[i] - close[i-1]), abs(low[i] - close[i-1]))
+    atr = np.full(n, np.nan)
+    for i in range(period, n):
+        atr[i] = np.mean(tr[i-period+1:i+1])
+    return atr
+
+def _reference_sma(prices, period):
+    """calculate_sma向量化之前的逐窗口均值"""
+    n = len(prices)
+    sma = np.full(n, np.nan)
+    for i in range(period - 1, n):
+        sma[i] = np.mean(prices[i - period + 1:i + 1])
+    return sma
+
+def _reference_ema(prices, period):
+    """calculate_ema向量化之前的逐根递推"""
+    n = len(prices)
+    ema = np.full(n, np.nan)
+    if n < period:
+        return ema
+    multiplier = 2 / (period + 1)
+    ema[period - 1] = np.mean(prices[:period])
+    for i in range(period, n):
+        ema[i] = (prices[i] * multiplier) + (ema[i - 1] * (1 - multiplier))
+    return ema
+
+def _reference_rsi(prices, period=14):
+    """calculate_rsi向量化之前的逐根Wilder平滑"""
+    n = len(prices)
+    rsi = np.full(n, np.nan)
+    if n <= period:
+        return rsi
+    deltas = np.diff(prices)
+    gains = np.where(deltas > 0, deltas, 0)
+    losses = np.where(deltas < 0, -deltas, 0)
+    avg_gain = np.mean(gains[:period])
+    avg_loss = np.mean(losses[:period])
+    rsi[period] = 100 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+    for i in range(period + 1, n):
+        avg_gain = (avg_gain * (period - 1) + gains[i - 1]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i - 1]) / period
+        rsi[i] = 100 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+    return rsi
+
+def _reference_rolling_extrema(high, low, period):
+    """stochastic/williams_r原来使用的pandas滑动窗口极值"""
+    import pandas as pd
+
+    return pd.Series(high).rolling(period).max().to_numpy(), pd.Series(low).rolling(period).min().to_numpy()
+
+def sample_series(n, seed):
+    """生成测试行情：随机游走 + 单边趋势段 + 最高价等于最低价的横盘段"""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.002, n)
+    if n >= 300:
+        steps[100:200] = 0.003   # 单边上涨
+        steps[200:300] = -0.003  # 单边下跌
+    close = 50000 * np.exp(np.cumsum(steps))
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    high = close + spread
+    low = close - spread
+    if n >= 400:
+        high[300:400] = low[300:400] = close[300:400] = close[299]
+    return high, low, close
+
+def with_nans(values, seed):
+    """在随机位置插入几个NaN（缺失的K线）"""
+    values = np.array(values, dtype=float)
+    if len(values):
+        rng = np.random.default_rng(seed)
+        values[rng.integers(0, len(values), max(1, len(values) // 100))] = np.nan
+    return values
+
+def _compare(name, actual, expected, rtol, failures, atol=0):
+    ok = len(actual) == len(expected) and np.allclose(actual, expected, rtol=rtol, atol=atol, equal_nan=True)
+    if not ok:
+        failures.append(name)
+        print(f"❌ {name}: 与基准实现不一致")
+
+def check(sizes=(1, 2, 3, 15, 16, 500, 5000), seeds=(0, 1, 2), params=((0.02, 0.02, 0.2), (0.015, 0.015, 0.15))):
+    """
+    比对内核与基准实现
+
+    返回:
+        list: 不一致的检查项名称，为空表示全部通过
+    """
+    failures = []
+    for n in sizes:
+        for seed in seeds:
+            high, low, close = sample_series(n, seed)
+            for af_start, af_increment, af_maximum in params:
+                tag = f'n={n} seed={seed} af={af_start}/{af_maximum}'
+                sar, trend = kernels.sar_loop(high, low, af_start, af_increment, af_maximum)
+                ref_sar, ref_trend = _reference_sar(high, low, af_start, af_increment, af_maximum)
+                _compare(f'sar {tag}', sar, ref_sar, 1e-12, failures)
+                _compare(f'trend {tag}', trend, ref_trend, 0, failures)
+                _compare(f'parabolic_sar {tag}', kernels.psar_loop(high, low, af_start, af_increment, af_maximum),
+                         _reference_parabolic_sar(high, low, af_start, af_increment, af_maximum), 1e-12, failures)
+            starts, increments, maxima = (np.array(column) for column in zip(*params))
+            grid_sar, grid_trend = kernels.sar_grid_loop(high, low, starts, increments, maxima)
+            for k, (af_start, af_increment, af_maximum) in enumerate(params):
+                sar, trend = kernels.sar_loop(high, low, af_start, af_increment, af_maximum)
+                tag = f'n={n} seed={seed} af={af_start}/{af_maximum}'
+                _compare(f'sar_grid {tag}', grid_sar[k], sar, 0, failures)
+                _compare(f'sar_grid trend {tag}', grid_trend[k], trend, 0, failures)
+            for period in (1, 14):
+                _compare(f'atr n={n} seed={seed} period={period}', kernels.atr_values(high, low, close, period),
+                         _reference_atr(high, low, close, period), 1e-9, failures)
+                # 缺失的最高价/收盘价只影响包含它们的窗口
+                for name, args in (('high', (with_nans(high, seed), low, close)),
+                                   ('close', (high, low, with_nans(close, seed + 1)))):
+                    _compare(f'atr nan_{name} n={n} seed={seed} period={period}', kernels.atr_values(*args, period),
+                             _reference_atr(*args, period), 1e-9, failures)
+                highest, lowest = kernels.rolling_extrema(high, low, period)
+                ref_highest, ref_lowest = _reference_rolling_extrema(high, low, period)
+                _compare(f'rolling_max n={n} seed={seed} period={period}', highest, ref_highest, 0, failures)
+                _compare(f'rolling_min n={n} seed={seed} period={period}', lowest, ref_lowest, 0, failures)
+        failures += check_averages(close, f'n={n} seed={seed}')
+    return failures
+
+def check_averages(close, tag):
+    """
+    比对向量化的SMA/EMA/RSI与逐根基准实现
+
+    除原始收盘价外还检查含NaN的序列和开头为NaN的序列（把一个指标的输出再传给另一个指标时的情况），
+    NaN的传播范围必须与基准实现相同
+    """
+    from .ema import calculate_ema
+    from .rsi import calculate_rsi
+    from .sma import calculate_sma
+
+    failures = []
+    # numba版本的EMA/Wilder递推与逐根实现逐位相同，纯NumPy的分块闭式解在舍入误差内一致
+    tolerance = 0 if kernels.JIT_ENABLED else 1e-9
+    inputs = {
+        'close': close,
+        'nan': with_nans(close, len(close)),
+        'rsi14': _reference_rsi(close, 14),
+        'ema12': _reference_ema(close, 12),
+    }
+    for name, prices in inputs.items():
+        for period in (1, 5, 14):
+            case = f'{tag} input={name} period={period}'
+            _compare(f'sma {case}', calculate_sma(prices, period), _reference_sma(prices, period), 1e-9, failures)
+            _compare(f'ema {case}', calculate_ema(prices, period), _reference_ema(prices, period), tolerance, failures)
+            # RSI在0-100之间，接近0时按绝对误差比较
+            _compare(f'rsi {case}', calculate_rsi(prices, period), _reference_rsi(prices, period), tolerance, failures,
+                     atol=tolerance)
+    return failures
+
+def benchmark(n=1000, repeat=200):
+    """每n根K线的耗时（微秒）"""
+    high, low, close = sample_series(n, 0)
+    results = {}
+    for name, func in (('sar', lambda: kernels.sar_loop(high, low)),
+                       ('parabolic_sar', lambda: kernels.psar_loop(high, low)),
+                       ('atr', lambda: kernels.atr_values(high, low, close))):
+        func()  # 首次调用包含编译
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        results[name] = best * 1e6
+    return results
+
+def main():
+    enabled = kernels.JIT_ENABLED
+    modes = [True, False] if enabled else [False]
+    failed = False
+    for jit in modes:
+        kernels.JIT_ENABLED = jit
+        label = 'numba' if jit else '纯Python/NumPy'
+        failures = check()
+        timings = benchmark()
+        if failures:
+            failed = True
+            print(f"❌ {label}: {len(failures)}项不一致")
+        else:
+            print(f"✅ {label}: 全部一致")
+        print("   " + "  ".join(f"{name} {us:.1f}µs/千根" for name, us in timings.items()))
+    kernels.JIT_ENABLED = enabled
+    if not enabled:
+        print("🔧 未启用numba，只检查了纯Python/NumPy实现（pip install numba）")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -4,21 +4,89 @@
 """
 
 import numpy as np
+from . import kernels
+
+# 分块时每块内的衰减量：块越长块数越少，但块内缩放后的数值跨度越大、舍入误差越大
+_BLOCK_DECAY = 1e-3
+
+def recursive_filter(values, alpha, initial):
+    """
+    一阶递推滤波 y[i] = (1 - alpha) * y[i-1] + alpha * values[i]，y[-1] = initial
+
+    EMA和Wilder平滑都是这种形式。按块求闭式解，全部为NumPy向量运算：
+    块内用缩放后的累加和得到零初值解，块间的进位是衰减因子很小的同类递推，
+    只需对前几块求和即可精确到浮点精度
+
+    参数:
+        values: 输入数组
+        alpha: 平滑系数 (0, 1]
+        initial: 第一个元素之前的值
+
+    返回:
+        np.ndarray: 与values等长的滤波结果
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    decay = 1.0 - alpha
+    if n == 0:
+        return values.copy()
+    # 与逐根递推相同，NaN之后的结果全部为NaN（块间进位只累加有限项，不会自动传播）
+    nans = np.flatnonzero(np.isnan(values))
+    first_nan = 0 if np.isnan(initial) else (nans[0] if len(nans) else n)
+    if first_nan < n:
+        result = np.full(n, np.nan)
+        result[:first_nan] = recursive_filter(values[:first_nan], alpha, initial)
+        return result
+    if decay <= 0:
+        return values.copy()
+
+    # 块长L使decay^L约为_BLOCK_DECAY
+    length = int(min(n, max(1, np.ceil(np.log(_BLOCK_DECAY) / np.log(decay)))))
+    blocks = -(-n // length)
+    result = np.empty(blocks * length)
+    partial = result.reshape(blocks, length)
+
+    # 块内: y[j] = decay^j * (alpha * sum(values[k] / decay^k, k <= j) + decay * 前一块末值)
+    powers = decay ** np.arange(length)
+    full = n // length
+    np.multiply(values[:full * length].reshape(full, length), 1.0 / powers, out=partial[:full])
+    if full < blocks:
+        rest = n - full * length
+        partial[full, :rest] = values[full * length:] / powers[:rest]
+        partial[full, rest:] = 0
+    np.cumsum(partial, axis=1, out=partial)
+    np.multiply(partial, alpha, out=partial)
+
+    # 块末值 Y[c] = r * Y[c-1] + 块内零初值解的末值，r = decay^L，r^k小于浮点精度后的项可以忽略
+    ratio = decay ** length
+    tail = partial[:, -1] * powers[-1]
+    ends = tail.copy()
+    terms = min(blocks, int(np.ceil(np.log(1e-17) / np.log(ratio))) + 1)
+    for k in range(1, terms):
+        ends[k:] += ratio ** k * tail[:-k]
+    ends += initial * ratio ** np.arange(1, blocks + 1)
+
+    previous = np.concatenate(([initial], ends[:-1]))
+    partial += decay * previous[:, None]
+    np.multiply(partial, powers, out=partial)
+    return result[:n]
 
 def calculate_ema(prices, period):
     """
     计算指数移动平均线
     
     参数:
-        prices: 价格数组
+        prices: 价格数组，也可以传入Candles（使用收盘价）
         period: 周期
     
     返回:
         ema: EMA值数组
     """
-    prices = np.array(prices, dtype=float)
+    prices = np.asarray(getattr(prices, 'close', prices), dtype=float)
     n = len(prices)
     ema = np.full(n, np.nan)
+    if n < period:
+        return ema
     
     # 计算平滑因子
     multiplier = 2 / (period + 1)
@@ -26,9 +94,8 @@ def calculate_ema(prices, period):
     # 第一个EMA值使用SMA
     ema[period - 1] = np.mean(prices[:period])
     
-    # 计算后续EMA值
-    for i in range(period, n):
-        ema[i] = (prices[i] * multiplier) + (ema[i - 1] * (1 - multiplier))
+    # 后续EMA值: ema[i] = prices[i] * multiplier + ema[i-1] * (1 - multiplier)
+    ema[period:] = kernels.ema_recursion(prices[period:], multiplier, ema[period - 1])
     
     return ema
 
@@ -0,0 +1,463 @@
+"""
+路径依赖指标的计算内核 (SAR、ATR、EMA/Wilder递推、滑动窗口极值)
+SAR每一根K线都依赖上一根的状态，无法整体向量化。安装了numba时内核在第一次调用时被编译为机器码，
+1000根K线只需几微秒；未安装时同一份代码在纯Python中对list运行（比逐个索引NumPy数组快数倍），
+ATR则退回NumPy分块前缀和实现，EMA/Wilder递推退回ema.recursive_filter的分块闭式解（与逐根递推差在浮点舍入误差内）
+
+环境变量 OKX_DISABLE_JIT=1 可以强制使用纯Python/NumPy实现
+"""
+import importlib.util
+import os
+import numpy as np
+
+# 只检查numba是否安装；导入numba本身需要数百毫秒，推迟到第一次调用内核时
+JIT_ENABLED = os.environ.get('OKX_DISABLE_JIT') != '1' and importlib.util.find_spec('numba') is not None
+
+_compiled = {}
+
+def _jit(func):
+    """返回编译后的内核（结果缓存到__pycache__，下次启动不必重新编译）"""
+    kernel = _compiled.get(func.__name__)
+    if kernel is None:
+        import numba
+
+        kernel = _compiled[func.__name__] = numba.njit(cache=True, nogil=True)(func)
+    return kernel
+
+def _sar_kernel(high, low, af_start, af_increment, af_maximum, sar, trend):
+    """indicators.sar.calculate_sar的逐根递推，结果写入sar/trend"""
+    n = len(high)
+    if n == 0:
+        return
+    sar[0] = low[0]
+    trend[0] = 1
+    ep = high[0]
+    af = af_start
+    for i in range(1, n):
+        prev = sar[i - 1]
+        value = prev + af * (ep - prev)
+        if trend[i - 1] == 1:
+            # SAR不能高于当前K线的最低价
+            if value > low[i]:
+                value = low[i]
+            if high[i] > ep:
+                ep = high[i]
+                af = min(af + af_increment, af_maximum)
+            if low[i] < value:
+                trend[i] = -1
+                value = ep
+                ep = low[i]
+                af = af_start
+            else:
+                trend[i] = 1
+        else:
+            # SAR不能低于当前K线的最高价
+            if value < high[i]:
+                value = high[i]
+            if low[i] < ep:
+                ep = low[i]
+                af = min(af + af_increment, af_maximum)
+            if high[i] > value:
+                trend[i] = 1
+                value = ep
+                ep = high[i]
+                af = af_start
+            else:
+                trend[i] = -1
+        sar[i] = value
+
+def _sar_grid_kernel(high, low, af_start, af_increment, af_maximum, sar, trend):
+    """
+    多组参数的calculate_sar递推：外层按K线、内层按参数，high/low只遍历一次，结果写入形状(n, m)的sar/trend
+
+    内层循环只用条件表达式、没有分支，各组参数互不依赖，编译器可以向量化；
+    逐组调用时趋势反转处的分支预测失败是主要开销
+    """
+    n = len(high)
+    m = len(af_start)
+    if n == 0:
+        return
+    ep = np.empty(m)
+    af = np.empty(m)
+    up = np.empty(m, dtype=np.bool_)
+    last = np.empty(m)  # 上一根K线的SAR
+    for k in range(m):
+        sar[0, k] = last[k] = low[0]
+        trend[0, k] = 1
+        ep[k] = high[0]
+        af[k] = af_start[k]
+        up[k] = True
+    for i in range(1, n):
+        h = high[i]
+        l = low[i]
+        for k in range(m):
+            rising = up[k]
+            prev = last[k]
+            value = prev + af[k] * (ep[k] - prev)
+            # SAR不能高于（上升）/低于（下降）当前K线的最低价/最高价
+            value = (l if value > l else value) if rising else (h if value < h else value)
+            extend = (h > ep[k]) if rising else (l < ep[k])
+            new_ep = (h if rising else l) if extend else ep[k]
+            new_af = min(af[k] + af_increment[k], af_maximum[k]) if extend else af[k]
+            flip = (l < value) if rising else (h > value)
+            value = new_ep if flip else value
+            sar[i, k] = last[k] = value
+            ep[k] = (l if rising else h) if flip else new_ep
+            af[k] = af_start[k] if flip else new_af
+            rising = rising != flip
+            up[k] = rising
+            trend[i, k] = 1 if rising else -1
+
+def _sar_grid_numpy(high, low, af_start, af_increment, af_maximum, sar, up):
+    """_sar_grid_kernel的NumPy版本：每根K线对全部参数做一次数组运算，up为布尔趋势"""
+    n = len(high)
+    if n == 0:
+        return
+    sar[0] = low[0]
+    up[0] = True
+    ep = np.full(len(af_start), high[0])
+    af = af_start.copy()
+    for i in range(1, n):
+        h = high[i]
+        l = low[i]
+        rising = up[i - 1]
+        value = sar[i - 1] + af * (ep - sar[i - 1])
+        # SAR不能高于（上升）/低于（下降）当前K线的最低价/最高价
+        value = np.where(rising, np.minimum(value, l), np.maximum(value, h))
+        extend = np.where(rising, h > ep, l < ep)
+        ep = np.where(extend, np.where(rising, h, l), ep)
+        af = np.where(extend, np.minimum(af + af_increment, af_maximum), af)
+        flip = np.where(rising, l < value, h > value)
+        sar[i] = np.where(flip, ep, value)
+        ep = np.where(flip, np.where(rising, l, h), ep)
+        af = np.where(flip, af_start, af)
+        np.not_equal(rising, flip, out=up[i])
+
+def _psar_kernel(high, low, initial_af, af_increment, max_af, sar):
+    """AdvancedIndicators.parabolic_sar的逐根递推（不钳制SAR，触及即反转）"""
+    n = len(high)
+    if n == 0:
+        return
+    sar[0] = low[0]
+    rising = True
+    af = initial_af
+    ep = high[0]
+    for i in range(1, n):
+        value = sar[i - 1] + af * (ep - sar[i - 1])
+        if rising:
+            if low[i] <= value:
+                rising = False
+                value = ep
+                af = initial_af
+                ep = low[i]
+            elif high[i] > ep:
+                af = min(af + af_increment, max_af)
+                ep = high[i]
+        else:
+            if high[i] >= value:
+                rising = True
+                value = ep
+                af = initial_af
+                ep = high[i]
+            elif low[i] < ep:
+                af = min(af + af_increment, max_af)
+                ep = low[i]
+        sar[i] = value
+
+def _atr_kernel(high, low, close, period, atr):
+    """
+    滑动窗口求和的ATR：atr[i]为tr[i-period+1..i]的均值（tr[0]=0），i >= period
+
+    与逐窗口求均值相同，窗口内有NaN的TR时为NaN、有inf时为inf，只影响包含它们的窗口；
+    每period根重新对整个窗口求和，滑动加减的舍入误差不随序列长度累积
+    """
+    n = len(high)
+    tr = np.zeros(n)
+    for i in range(1, n):
+        # 与max(high-low, |high-prev|, |low-prev|)相同：high-low为NaN时结果为NaN，缺口为NaN时忽略
+        value = high[i] - low[i]
+        gap = abs(high[i] - close[i - 1])
+        if gap > value:
+            value = gap
+        gap = abs(low[i] - close[i - 1])
+        if gap > value:
+            value = gap
+        tr[i] = value
+    total = 0.0
+    nans = 0
+    infs = 0
+    for i in range(1, n):
+        if i % period == 0:
+            total = 0.0
+            nans = 0
+            infs = 0
+            for j in range(i - period + 1, i + 1):
+                value = tr[j]
+                if value != value:
+                    nans += 1
+                elif value == np.inf:
+                    infs += 1
+                else:
+                    total += value
+        else:
+            value = tr[i]
+            if value != value:
+                nans += 1
+            elif value == np.inf:
+                infs += 1
+            else:
+                total += value
+            if i > period:
+                # 移出窗口的那一根
+                value = tr[i - period]
+                if value != value:
+                    nans -= 1
+                elif value == np.inf:
+                    infs -= 1
+                else:
+                    total -= value
+        if i >= period:
+            if nans:
+                atr[i] = np.nan
+            elif infs:
+                atr[i] = np.inf
+            else:
+                atr[i] = total / period
+
+def _ema_kernel(values, multiplier, initial, out):
+    """calculate_ema原来的逐根递推 ema = price * k + ema * (1 - k)"""
+    ema = initial
+    for i in range(len(values)):
+        ema = (values[i] * multiplier) + (ema * (1 - multiplier))
+        out[i] = ema
+
+def _wilder_kernel(values, period, initial, out):
+    """calculate_rsi原来的逐根Wilder平滑 avg = (avg * (period - 1) + value) / period"""
+    avg = initial
+    for i in range(len(values)):
+        avg = (avg * (period - 1) + values[i]) / period
+        out[i] = avg
+
+def _rolling_extrema_kernel(high, low, period, highest, lowest):
+    """
+    单调队列求滑动窗口内high的最大值和low的最小值，每个元素最多入队出队各一次（O(n)）
+    窗口内有NaN时输出NaN（与pandas rolling(period).max()/min()一致），结果写入highest/lowest
+    """
+    n = len(high)
+    max_queue = np.empty(n, dtype=np.int64)  # 下标，对应的high单调递减
+    min_queue = np.empty(n, dtype=np.int64)  # 下标，对应的low单调递增
+    max_head = max_tail = min_head = min_tail = 0
+    high_nan = low_nan = -period - 1  # 最近一个NaN的下标
+    for i in range(n):
+        h = high[i]
+        if h != h:
+            high_nan = i
+        else:
+            while max_tail > max_head and high[max_queue[max_tail - 1]] <= h:
+                max_tail -= 1
+            max_queue[max_tail] = i
+            max_tail += 1
+        l = low[i]
+        if l != l:
+            low_nan = i
+        else:
+            while min_tail > min_head and low[min_queue[min_tail - 1]] >= l:
+                min_tail -= 1
+            min_queue[min_tail] = i
+            min_tail += 1
+        # 移出窗口的下标
+        while max_tail > max_head and max_queue[max_head] <= i - period:
+            max_head += 1
+        while min_tail > min_head and min_queue[min_head] <= i - period:
+            min_head += 1
+        if i >= period - 1:
+            if i - high_nan >= period:
+                highest[i] = high[max_queue[max_head]]
+            if i - low_nan >= period:
+                lowest[i] = low[min_queue[min_head]]
+
+def _window_extreme(values, period, ufunc, fill):
+    """
+    滑动窗口极值的NumPy实现（van Herk/Gil-Werman）：按period分块，块内各做一次前缀和后缀累计极值，
+    每个窗口恰好跨越相邻两块，结果为左块后缀极值与右块前缀极值中的较大/较小者
+    """
+    n = len(values)
+    blocks = -(-n // period)
+    padded = np.full(blocks * period, fill)
+    padded[:n] = values
+    padded = padded.reshape(blocks, period)
+    prefix = ufunc.accumulate(padded, axis=1).ravel()
+    suffix = ufunc.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    result = np.full(n, np.nan)
+    result[period - 1:] = ufunc(suffix[:n - period + 1], prefix[period - 1:n])
+    return result
+
+def rolling_extrema(high, low, period):
+    """
+    滑动窗口内的最高价和最低价（与pandas high.rolling(period).max()、low.rolling(period).min()逐位相同）
+
+    返回:
+        highest: float64数组，前period-1个为NaN
+        lowest: float64数组，前period-1个为NaN
+    """
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    n = len(high)
+    if n < period:
+        return np.full(n, np.nan), np.full(n, np.nan)
+    if JIT_ENABLED:
+        highest = np.full(n, np.nan)
+        lowest = np.full(n, np.nan)
+        _jit(_rolling_extrema_kernel)(high, low, int(period), highest, lowest)
+        return highest, lowest
+    return _window_extreme(high, period, np.maximum, -np.inf), _window_extreme(low, period, np.minimum, np.inf)
+
+def sar_loop(high, low, af_start=0.02, af_increment=0.02, af_maximum=0.2):
+    """
+    计算SAR和趋势（与calculate_sar语义一致）
+
+    返回:
+        sar: float64数组
+        trend: int数组 (1=上升, -1=下降)
+    """
+    n = len(high)
+    if JIT_ENABLED:
+        sar = np.empty(n)
+        trend = np.empty(n, dtype=np.int64)
+        kernel = _jit(_sar_kernel)
+        kernel(np.ascontiguousarray(high, dtype=np.float64), np.ascontiguousarray(low, dtype=np.float64),
+               float(af_start), float(af_increment), float(af_maximum), sar, trend)
+        return sar, trend.astype(int, copy=False)
+    sar = [0.0] * n
+    trend = [0] * n
+    _sar_kernel(np.asarray(high, dtype=float).tolist(), np.asarray(low, dtype=float).tolist(),
+                af_start, af_increment, af_maximum, sar, trend)
+    return np.array(sar, dtype=float), np.array(trend, dtype=int)
+
+def sar_grid_loop(high, low, af_start, af_increment, af_maximum):
+    """
+    一次计算多组参数的SAR和趋势
+
+    参数:
+        af_start/af_increment/af_maximum: 长度为m的参数数组，第k组参数为(af_start[k], af_increment[k], af_maximum[k])
+
+    返回:
+        sar: 形状(m, n)的float64数组，第k行等于sar_loop(high, low, *第k组参数)[0]
+        trend: 形状(m, n)的int数组
+    """
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    af_start = np.ascontiguousarray(af_start, dtype=np.float64)
+    af_increment = np.ascontiguousarray(af_increment, dtype=np.float64)
+    af_maximum = np.ascontiguousarray(af_maximum, dtype=np.float64)
+    n, m = len(high), len(af_start)
+    # 按(K线, 参数)存放，每根K线连续写入一整行；返回转置视图（不复制），第k行即第k组参数
+    sar = np.empty((n, m))
+    if JIT_ENABLED:
+        trend = np.empty((n, m), dtype=np.int64)
+        _jit(_sar_grid_kernel)(high, low, af_start, af_increment, af_maximum, sar, trend)
+        return sar.T, trend.T.astype(int, copy=False)
+    up = np.empty((n, m), dtype=bool)
+    _sar_grid_numpy(high, low, af_start, af_increment, af_maximum, sar, up)
+    return sar.T, np.where(up, 1, -1).T
+
+def psar_loop(high, low, initial_af=0.02, af_increment=0.02, max_af=0.2):
+    """计算SAR（与AdvancedIndicators.parabolic_sar语义一致），返回float64数组"""
+    n = len(high)
+    if JIT_ENABLED:
+        sar = np.empty(n)
+        kernel = _jit(_psar_kernel)
+        kernel(np.ascontiguousarray(high, dtype=np.float64), np.ascontiguousarray(low, dtype=np.float64),
+               float(initial_af), float(af_increment), float(max_af), sar)
+        return sar
+    sar = [0.0] * n
+    _psar_kernel(np.asarray(high, dtype=float).tolist(), np.asarray(low, dtype=float).tolist(),
+                 initial_af, af_increment, max_af, sar)
+    return np.array(sar, dtype=float)
+
+def ema_recursion(values, multiplier, initial):
+    """
+    EMA递推，返回与values等长的结果（第一个元素之前的EMA为initial）
+
+    安装numba时逐根计算，与原始循环及StreamingEMA逐位相同；否则用分块闭式解
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if JIT_ENABLED:
+        out = np.empty(len(values))
+        _jit(_ema_kernel)(values, float(multiplier), float(initial), out)
+        return out
+    from .ema import recursive_filter
+
+    return recursive_filter(values, multiplier, initial)
+
+def wilder_recursion(values, period, initial):
+    """
+    Wilder平滑递推，返回与values等长的结果（第一个元素之前的均值为initial）
+
+    安装numba时逐根计算，与原始循环及StreamingRSI逐位相同；否则用分块闭式解
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if JIT_ENABLED:
+        out = np.empty(len(values))
+        _jit(_wilder_kernel)(values, int(period), float(initial), out)
+        return out
+    from .ema import recursive_filter
+
+    return recursive_filter(values, 1 / period, initial)
+
+def _window_sums(values, period):
+    """
+    长度为period的滑动窗口和，第i个元素为values[i-period+1..i]之和（i < period-1时无意义）
+
+    按period分块求块内前缀和，每个窗口最多跨两块：前缀和的量级只有一个窗口大小，
+    不会像全局前缀和那样随序列长度增大而放大相减时的舍入误差
+    """
+    n = len(values)
+    blocks = -(-n // period)
+    padded = np.zeros(blocks * period)
+    padded[:n] = values
+    local = np.cumsum(padded.reshape(blocks, period), axis=1).reshape(-1)
+    sums = np.zeros(n)
+    end = np.arange(period - 1, n)
+    start = end - period + 1
+    # 窗口起点不在块首时，加上起点所在块中起点及之后的部分
+    split = start % period != 0
+    head = start[split]
+    carry = local[(head // period + 1) * period - 1] - local[head - 1]
+    sums[period - 1:] = local[end]
+    sums[period - 1:][split] += carry
+    return sums
+
+def atr_values(high, low, close, period=14):
+    """
+    ATR（与OptimizedSARStrategy.calculate_atr语义一致：第一根的TR记为0，前period根为NaN）
+
+    返回:
+        float64数组
+    """
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n = len(close)
+    atr = np.full(n, np.nan)
+    if n <= period:
+        return atr
+    if JIT_ENABLED:
+        _jit(_atr_kernel)(high, low, close, int(period), atr)
+        return atr
+
+    tr = np.zeros(n)
+    spread = high[1:] - low[1:]
+    gap = np.fmax(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1]))
+    # high-low为NaN时TR为NaN，缺口为NaN时忽略（与内核的比较语义相同）
+    tr[1:] = np.where(np.isnan(spread), spread, np.fmax(spread, gap))
+    # 非有限的TR按0求和，再按窗口内的NaN/inf个数屏蔽
+    finite = np.isfinite(tr)
+    atr[period:] = _window_sums(np.where(finite, tr, 0.0), period)[period:] / period
+    if not finite.all():
+        end = np.arange(period + 1, n + 1)
+        nans = np.concatenate(([0], np.cumsum(np.isnan(tr))))
+        infs = np.concatenate(([0], np.cumsum(tr == np.inf)))
+        atr[period:][infs[end] > infs[end - period]] = np.inf
+        atr[period:][nans[end] > nans[end - period]] = np.nan
+    return atr
@@ -4,13 +4,14 @@ MACD指标 (Moving Average Convergence Divergence)
 """
 
 import numpy as np
+from .ema import calculate_ema
 
 def calculate_macd(prices, fast_period=12, slow_period=26, signal_period=9):
     """
     计算MACD指标
     
     参数:
-        prices: 价格数组
+        prices: 价格数组，也可以传入Candles（使用收盘价）
         fast_period: 快线周期 (默认12)
         slow_period: 慢线周期 (默认26)
         signal_period: 信号线周期 (默认9)
@@ -20,7 +21,7 @@ def calculate_macd(prices, fast_period=12, slow_period=26, signal_period=9):
         signal_line: 信号线
         histogram: 柱状图
     """
-    prices = np.array(prices, dtype=float)
+    prices = np.asarray(getattr(prices, 'close', prices), dtype=float)
     n = len(prices)
     
     # 计算快线和慢线EMA
@@ -58,20 +59,6 @@ def calculate_macd(prices, fast_period=12, slow_period=26, signal_period=9):
     
     return macd_line, signal_line_full, histogram
 
-def calculate_ema(prices, period):
-    """计算EMA的辅助函数"""
-    prices = np.array(prices, dtype=float)
-    n = len(prices)
-    ema = np.full(n, np.nan)
-    
-    multiplier = 2 / (period + 1)
-    ema[period - 1] = np.mean(prices[:period])
-    
-    for i in range(period, n):
-        ema[i] = (prices[i] * multiplier) + (ema[i - 1] * (1 - multiplier))
-    
-    return ema
-
 def get_macd_signal(macd_line, signal_line, histogram):
     """
     获取MACD交易信号
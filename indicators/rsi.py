@@ -4,50 +4,49 @@
 """
 
 import numpy as np
+from . import kernels
 
 def calculate_rsi(prices, period=14):
     """
     计算相对强弱指数
     
     参数:
-        prices: 价格数组
+        prices: 价格数组，也可以传入Candles（使用收盘价）
         period: 周期 (默认14)
     
     返回:
         rsi: RSI值数组
     """
-    prices = np.array(prices, dtype=float)
+    prices = np.asarray(getattr(prices, 'close', prices), dtype=float)
     n = len(prices)
     rsi = np.full(n, np.nan)
+    if n <= period:
+        return rsi
     
     # 计算价格变化
     deltas = np.diff(prices)
     
     # 分离上涨和下跌
+    # np.where把NaN的变化记为0（np.maximum会传播NaN，使之后的RSI全部变成NaN）
     gains = np.where(deltas > 0, deltas, 0)
     losses = np.where(deltas < 0, -deltas, 0)
     
     # 计算初始平均收益和损失
-    avg_gain = np.mean(gains[:period])
-    avg_loss = np.mean(losses[:period])
+    avg_gain = np.empty(n - period)
+    avg_loss = np.empty(n - period)
+    avg_gain[0] = np.mean(gains[:period])
+    avg_loss[0] = np.mean(losses[:period])
     
-    if avg_loss == 0:
-        rsi[period] = 100
-    else:
-        rs = avg_gain / avg_loss
-        rsi[period] = 100 - (100 / (1 + rs))
+    # 后续使用Wilder平滑: avg = (avg * (period - 1) + 当期值) / period
+    avg_gain[1:] = kernels.wilder_recursion(gains[period:], period, avg_gain[0])
+    avg_loss[1:] = kernels.wilder_recursion(losses[period:], period, avg_loss[0])
     
-    # 计算后续RSI值
-    for i in range(period + 1, n):
-        # 使用平滑移动平均
-        avg_gain = (avg_gain * (period - 1) + gains[i - 1]) / period
-        avg_loss = (avg_loss * (period - 1) + losses[i - 1]) / period
-        
-        if avg_loss == 0:
-            rsi[i] = 100
-        else:
-            rs = avg_gain / avg_loss
-            rsi[i] = 100 - (100 / (1 + rs))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+    rs += 1
+    rsi[period:] = 100 - np.divide(100, rs, out=rs)
+    # 平均损失为0时RSI为100
+    rsi[period:][avg_loss == 0] = 100
     
     return rsi
 
@@ -4,13 +4,14 @@
 """
 
 import numpy as np
+from .kernels import sar_loop, sar_grid_loop
 
-def calculate_sar(high, low, af_start=0.02, af_increment=0.02, af_maximum=0.2):
+def calculate_sar(high, low=None, af_start=0.02, af_increment=0.02, af_maximum=0.2):
     """
     计算抛物线SAR指标
     
     参数:
-        high: 最高价数组
+        high: 最高价数组，也可以传入Candles（此时省略low）
         low: 最低价数组
         af_start: 初始加速因子 (默认0.02)
         af_increment: 加速因子增量 (默认0.02)
@@ -20,56 +21,35 @@ def calculate_sar(high, low, af_start=0.02, af_increment=0.02, af_maximum=0.2):
         sar: SAR值数组
         trend: 趋势数组 (1=上升, -1=下降)
     """
-    high = np.array(high, dtype=float)
-    low = np.array(low, dtype=float)
-    n = len(high)
-    
-    sar = np.zeros(n)
-    trend = np.zeros(n, dtype=int)
+    if low is None:
+        high, low = high.high, high.low
+    # 逐根递推在indicators.kernels中实现（有numba时编译执行）
+    return sar_loop(high, low, af_start, af_increment, af_maximum)
+
+def calculate_sar_grid(high, low=None, af_start=0.02, af_increment=0.02, af_maximum=0.2):
+    """
+    一次计算多组参数的抛物线SAR（参数调优时代替逐组调用calculate_sar）
     
-    # 初始化
-    sar[0] = low[0]
-    trend[0] = 1  # 1表示上升趋势，-1表示下降趋势
-    ep = high[0]  # 极值点
-    af = af_start
+    参数:
+        high: 最高价数组，也可以传入Candles（此时省略low）
+        low: 最低价数组
+        af_start: 初始加速因子，标量或数组
+        af_increment: 加速因子增量，标量或数组
+        af_maximum: 最大加速因子，标量或数组
+        三个参数按NumPy规则广播后展平，第k组参数为各自的第k个元素
     
-    for i in range(1, n):
-        if trend[i-1] == 1:  # 上升趋势
-            sar[i] = sar[i-1] + af * (ep - sar[i-1])
-            # SAR不能高于当前K线的最低价
-            if sar[i] > low[i]:
-                sar[i] = low[i]
-            # 更新极值点和加速因子
-            if high[i] > ep:
-                ep = high[i]
-                af = min(af + af_increment, af_maximum)
-            # 检查趋势反转
-            if low[i] < sar[i]:
-                trend[i] = -1
-                sar[i] = ep  # 新SAR点为前一个EP
-                ep = low[i]  # 新EP为当前K线最低价
-                af = af_start
-            else:
-                trend[i] = 1
-        else:  # 下降趋势
-            sar[i] = sar[i-1] + af * (ep - sar[i-1])
-            # SAR不能低于当前K线的最高价
-            if sar[i] < high[i]:
-                sar[i] = high[i]
-            # 更新极值点和加速因子
-            if low[i] < ep:
-                ep = low[i]
-                af = min(af + af_increment, af_maximum)
-            # 检查趋势反转
-            if high[i] > sar[i]:
-                trend[i] = 1
-                sar[i] = ep  # 新SAR点为前一个EP
-                ep = high[i]  # 新EP为当前K线最高价
-                af = af_start
-            else:
-                trend[i] = -1
+    返回:
+        sar: 形状(参数组数, K线数)的SAR值数组，第k行与calculate_sar(high, low, *第k组参数)相同
+        trend: 同形状的趋势数组 (1=上升, -1=下降)
     
-    return sar, trend
+    示例:
+        starts, maxima = np.meshgrid([0.01, 0.015, 0.02], [0.1, 0.15, 0.2], indexing='ij')
+        sar, trend = calculate_sar_grid(high, low, starts, starts, maxima)  # 9组参数
+    """
+    if low is None:
+        high, low = high.high, high.low
+    af_start, af_increment, af_maximum = (np.ravel(a) for a in np.broadcast_arrays(af_start, af_increment, af_maximum))
+    return sar_grid_loop(high, low, af_start, af_increment, af_maximum)
 
 def get_sar_signal(sar, trend, price):
     """
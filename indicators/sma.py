@@ -10,18 +10,32 @@ def calculate_sma(prices, period):
     计算简单移动平均线
     
     参数:
-        prices: 价格数组
+        prices: 价格数组，也可以传入Candles（使用收盘价）
         period: 周期
     
     返回:
         sma: SMA值数组
     """
-    prices = np.array(prices, dtype=float)
+    prices = np.asarray(getattr(prices, 'close', prices), dtype=float)
     n = len(prices)
     sma = np.full(n, np.nan)
+    if n < period:
+        return sma
     
-    for i in range(period - 1, n):
-        sma[i] = np.mean(prices[i - period + 1:i + 1])
+    # 累加和相减得到窗口和；先减去首个有限价格，减小累加和的量级和舍入误差
+    # NaN/inf按0累加，只影响包含它们的窗口，不会让之后的结果全部变成NaN
+    finite = np.isfinite(prices)
+    base = prices[np.argmax(finite)] if finite.any() else 0.0
+    cumsum = np.concatenate(([0.0], np.cumsum(np.where(finite, prices - base, 0.0))))
+    sma[period - 1:] = (cumsum[period:] - cumsum[:-period]) / period + base
+    
+    if not finite.all():
+        # 与逐窗口求均值相同：含NaN的窗口为NaN，只含inf的窗口（极少见）直接求均值
+        nans = np.concatenate(([0], np.cumsum(np.isnan(prices))))
+        others = np.concatenate(([0], np.cumsum(~finite)))
+        sma[period - 1:][nans[period:] > nans[:-period]] = np.nan
+        for i in np.flatnonzero((others[period:] > others[:-period]) & (nans[period:] == nans[:-period])):
+            sma[i + period - 1] = np.mean(prices[i:i + period])
     
     return sma
 
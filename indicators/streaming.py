@@ -0,0 +1,343 @@
+"""
+流式指标
+每根确认K线O(1)更新一次状态，不必每个周期对整个窗口重新计算；
+未收盘K线可以用confirmed=False做临时计算，不改变状态，收盘后再以confirmed=True提交。
+状态可序列化为dict（可直接json.dump，不含NaN字面量），重启时用from_state恢复，无需重新预热
+
+与批量函数的一致性（从同一根K线开始喂入时）:
+    StreamingSAR / StreamingSMA: 与calculate_sar / calculate_sma逐位相同（StreamingSMA对只含inf、不含NaN的窗口输出NaN）
+    StreamingATR / StreamingEMA / StreamingRSI: 安装numba时与atr_values / calculate_ema / calculate_rsi逐位相同；
+        未安装numba时批量函数使用分块前缀和/分块闭式解，与流式结果只差浮点舍入误差（EMA相对误差1e-14量级，
+        RSI绝对误差1e-11以内），这是纯NumPy环境下有意接受的偏差
+
+用法:
+    sar = StreamingSAR(0.015, 0.015, 0.15)
+    for candle in history:
+        sar.update(candle['high'], candle['low'])
+    value, trend = sar.update(high, low, confirmed=False)   # 未收盘K线
+    state = sar.to_state()                                   # 保存
+    sar = StreamingSAR.from_state(state)                     # 恢复
+"""
+import math
+from collections import deque
+import numpy as np
+
+NAN = float('nan')
+
+def _encode(value):
+    """非有限浮点数 -> 'nan'/'inf'/'-inf'，deque/tuple -> list"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return repr(float(value))
+    if isinstance(value, (list, tuple, deque)):
+        return [_encode(item) for item in value]
+    return value
+
+def _decode(value):
+    if isinstance(value, str):
+        return float(value)
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+def _encode_output(value):
+    """输出值：NaN（数据不足）-> None，SAR的(sar, trend) -> list"""
+    if isinstance(value, tuple):
+        return [_encode_output(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return _encode(value)
+
+def _decode_output(value):
+    if isinstance(value, list):
+        return tuple(_decode_output(item) for item in value)
+    return NAN if value is None else _decode(value)
+
+class StreamingIndicator:
+    """流式指标基类：子类实现_step(输入) -> (新状态, 输出) 且不修改self"""
+
+    # to_state中保存的属性名
+    _fields = ()
+
+    def __init__(self):
+        self.count = 0    # 已确认的K线数
+        self.value = NAN  # 最后一根确认K线的输出
+
+    def update(self, *values, confirmed=True):
+        """
+        输入一根K线
+
+        参数:
+            confirmed: False表示未收盘K线，只计算不提交，下次update仍基于上一根确认K线
+
+        返回:
+            当前指标值（数据不足时为NaN）
+        """
+        state, output = self._step(*values)
+        if confirmed:
+            self._commit(state)
+            self.count += 1
+            self.value = output
+        return output
+
+    def prime(self, *arrays):
+        """用历史数组逐根预热（确认K线），返回最后一个输出"""
+        output = None
+        for values in zip(*arrays):
+            output = self.update(*(float(v) for v in values))
+        return output
+
+    def _commit(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def to_state(self):
+        """
+        可JSON序列化的状态dict（json.dumps(allow_nan=False)也能通过）
+
+        输出value中的NaN写为None；其他属性中的NaN/inf写为字符串'nan'/'inf'/'-inf'（这些属性中None另有含义）
+        """
+        state = {'type': type(self).__name__, 'count': self.count, 'value': _encode_output(self.value)}
+        for name in self._fields:
+            state[name] = _encode(getattr(self, name))
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """从to_state的结果恢复"""
+        if state.get('type') != cls.__name__:
+            raise ValueError(f"状态类型不匹配: {state.get('type')} != {cls.__name__}")
+        obj = cls.__new__(cls)
+        obj.count = state['count']
+        obj.value = _decode_output(state['value'])
+        for name in cls._fields:
+            setattr(obj, name, obj._restore(name, _decode(state[name])))
+        return obj
+
+    def _restore(self, name, value):
+        return value
+
+class StreamingSMA(StreamingIndicator):
+    """
+    滑动平均
+
+    与calculate_sma相同：累加(价格 - 首个有限价格)，窗口和为两个累加和之差；
+    NaN/inf按0累加并计数，窗口内有非有限值时输出NaN
+    """
+
+    _fields = ('period', 'base', 'sums', 'bad')
+
+    def __init__(self, period):
+        super().__init__()
+        self.period = period
+        self.base = None
+        self.sums = deque([0.0], maxlen=period + 1)  # 最近period+1个累加和
+        self.bad = deque([0], maxlen=period + 1)     # 对应的非有限值个数累加
+
+    def _restore(self, name, value):
+        return deque(value, maxlen=self.period + 1) if name in ('sums', 'bad') else value
+
+    def _step(self, price):
+        finite = np.isfinite(price)
+        base = price if self.base is None and finite else self.base
+        total = self.sums[-1] + (price - base if finite else 0.0)
+        bad = self.bad[-1] + (0 if finite else 1)
+        state = {'base': base, 'total': total, 'bad': bad}
+        if len(self.sums) < self.period:
+            return state, NAN
+        # 加入total后窗口起点为当前的sums[-period]
+        if bad > self.bad[-self.period]:
+            return state, NAN
+        return state, (total - self.sums[-self.period]) / self.period + base
+
+    def _commit(self, state):
+        self.base = state['base']
+        self.sums.append(state['total'])
+        self.bad.append(state['bad'])
+
+class StreamingEMA(StreamingIndicator):
+    """指数移动平均：前period根的均值作为初值，之后 ema = price * k + ema * (1 - k)"""
+
+    _fields = ('period', 'multiplier', 'ema', 'seed')
+
+    def __init__(self, period):
+        super().__init__()
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.ema = None
+        self.seed = []  # 初值之前的价格
+
+    def _step(self, price):
+        if self.ema is not None:
+            ema = (price * self.multiplier) + (self.ema * (1 - self.multiplier))
+            return {'ema': ema}, ema
+        seed = self.seed + [price]
+        if len(seed) < self.period:
+            return {'seed': seed}, NAN
+        ema = float(np.mean(seed))
+        return {'ema': ema, 'seed': []}, ema
+
+class StreamingRSI(StreamingIndicator):
+    """相对强弱指数：前period个涨跌的均值作为初值，之后Wilder平滑"""
+
+    _fields = ('period', 'last_price', 'avg_gain', 'avg_loss', 'gains', 'losses')
+
+    def __init__(self, period=14):
+        super().__init__()
+        self.period = period
+        self.last_price = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.gains = []
+        self.losses = []
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def _step(self, price):
+        if self.last_price is None:
+            return {'last_price': price}, NAN
+        delta = price - self.last_price
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if self.avg_gain is not None:
+            avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+            return ({'last_price': price, 'avg_gain': avg_gain, 'avg_loss': avg_loss},
+                    self._rsi(avg_gain, avg_loss))
+        gains = self.gains + [gain]
+        losses = self.losses + [loss]
+        if len(gains) < self.period:
+            return {'last_price': price, 'gains': gains, 'losses': losses}, NAN
+        avg_gain = float(np.mean(gains))
+        avg_loss = float(np.mean(losses))
+        return ({'last_price': price, 'avg_gain': avg_gain, 'avg_loss': avg_loss, 'gains': [], 'losses': []},
+                self._rsi(avg_gain, avg_loss))
+
+class StreamingATR(StreamingIndicator):
+    """
+    平均真实波幅：最近period个TR的滑动均值（与OptimizedSARStrategy.calculate_atr一致，第一根K线没有TR）
+
+    与kernels.atr_values的内核相同：NaN/inf的TR单独计数，只影响包含它们的窗口；每period根重新对窗口求和
+    """
+
+    _fields = ('period', 'last_close', 'total', 'nans', 'infs', 'ranges')
+
+    def __init__(self, period=14):
+        super().__init__()
+        self.period = period
+        self.last_close = None
+        self.total = 0.0  # 窗口内有限TR之和
+        self.nans = 0
+        self.infs = 0
+        self.ranges = deque(maxlen=period)  # 窗口内的TR
+
+    def _restore(self, name, value):
+        return deque(value, maxlen=self.period) if name == 'ranges' else value
+
+    @staticmethod
+    def _kind(tr):
+        if tr != tr:
+            return 'nans'
+        return 'infs' if tr == float('inf') else None
+
+    def _step(self, high, low, close):
+        if self.last_close is None:
+            return {'last_close': close, 'tr': None, 'total': 0.0, 'nans': 0, 'infs': 0}, NAN
+        tr = high - low
+        gap = abs(high - self.last_close)
+        if gap > tr:
+            tr = gap
+        gap = abs(low - self.last_close)
+        if gap > tr:
+            tr = gap
+        counts = {'nans': self.nans, 'infs': self.infs}
+        if self.count % self.period == 0:
+            # 与内核相同的位置重新求和
+            total = 0.0
+            counts = {'nans': 0, 'infs': 0}
+            for value in (list(self.ranges) + [tr])[-self.period:]:
+                kind = self._kind(value)
+                if kind is None:
+                    total += value
+                else:
+                    counts[kind] += 1
+        else:
+            total = self.total
+            kind = self._kind(tr)
+            if kind is None:
+                total += tr
+            else:
+                counts[kind] += 1
+            if len(self.ranges) == self.period:
+                out = self.ranges[0]
+                kind = self._kind(out)
+                if kind is None:
+                    total -= out
+                else:
+                    counts[kind] -= 1
+        if self.count < self.period:
+            value = NAN
+        elif counts['nans']:
+            value = NAN
+        elif counts['infs']:
+            value = float('inf')
+        else:
+            value = total / self.period
+        return dict(counts, last_close=close, tr=tr, total=total), value
+
+    def _commit(self, state):
+        self.last_close = state['last_close']
+        self.total = state['total']
+        self.nans = state['nans']
+        self.infs = state['infs']
+        if state['tr'] is not None:
+            self.ranges.append(state['tr'])
+
+class StreamingSAR(StreamingIndicator):
+    """抛物线SAR，update返回(sar, trend)，与calculate_sar逐位相同"""
+
+    _fields = ('af_start', 'af_increment', 'af_maximum', 'sar', 'trend', 'ep', 'af')
+
+    def __init__(self, af_start=0.02, af_increment=0.02, af_maximum=0.2):
+        super().__init__()
+        self.af_start = af_start
+        self.af_increment = af_increment
+        self.af_maximum = af_maximum
+        self.value = (NAN, 0)
+        self.sar = None
+        self.trend = 1
+        self.ep = None
+        self.af = af_start
+
+    def _step(self, high, low):
+        if self.sar is None:
+            return {'sar': low, 'trend': 1, 'ep': high, 'af': self.af_start}, (low, 1)
+        ep, af = self.ep, self.af
+        value = self.sar + af * (ep - self.sar)
+        if self.trend == 1:
+            # SAR不能高于当前K线的最低价
+            if value > low:
+                value = low
+            if high > ep:
+                ep = high
+                af = min(af + self.af_increment, self.af_maximum)
+            if low < value:
+                trend, value, ep, af = -1, ep, low, self.af_start
+            else:
+                trend = 1
+        else:
+            # SAR不能低于当前K线的最高价
+            if value < high:
+                value = high
+            if low < ep:
+                ep = low
+                af = min(af + self.af_increment, self.af_maximum)
+            if high > value:
+                trend, value, ep, af = 1, ep, high, self.af_start
+            else:
+                trend = -1
+        return {'sar': value, 'trend': trend, 'ep': ep, 'af': af}, (value, trend)
+
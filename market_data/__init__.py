@@ -0,0 +1,75 @@
+"""
+行情数据模块
+WebSocket推送、行情录制回放、历史K线下载、K线缺口检测与补齐、列式K线存储、Arrow/Parquet导出、多周期合成、行情共享、本地订单簿、K线快速解码、K线周期工具等
+
+WebSocket推送、录制回放、历史下载、缺口补齐和Arrow导出按需导入，只用到K线解码/存储时不会加载websockets、线程池、pyarrow等依赖
+"""
+import importlib
+from .bars import bar_to_ms, bar_offset_ms, bar_start
+from .candles import Candles
+from .candle_store import MemmapCandleStore
+from .resample import resample, Resampler
+from .hub import MarketDataHub
+from .order_book import OrderBook
+from .decode import decode_candle_rows, decode_candle_response, candles_to_dataframe
+
+# 延迟导入的名称 -> 所在子模块
+_LAZY_EXPORTS = {
+    'MarketDataFeed': 'ws_feed',
+    'QueueListener': 'ws_feed',
+    'Recorder': 'recorder',
+    'Replayer': 'recorder',
+    'ReplayFeed': 'recorder',
+    'HistoryDownloader': 'history',
+    'CsvCandleStore': 'history',
+    'find_gaps': 'gaps',
+    'missing_timestamps': 'gaps',
+    'BackfillScheduler': 'gaps',
+    'arrays_to_table': 'arrow_io',
+    'table_to_arrays': 'arrow_io',
+    'table_to_candles': 'arrow_io',
+    'export_parquet': 'arrow_io',
+    'export_ipc': 'arrow_io',
+    'read_parquet': 'arrow_io',
+    'read_ipc': 'arrow_io'
+}
+
+__all__ = [
+    'bar_to_ms',
+    'bar_offset_ms',
+    'bar_start',
+    'MarketDataFeed',
+    'QueueListener',
+    'Recorder',
+    'Replayer',
+    'ReplayFeed',
+    'HistoryDownloader',
+    'CsvCandleStore',
+    'find_gaps',
+    'missing_timestamps',
+    'BackfillScheduler',
+    'arrays_to_table',
+    'table_to_arrays',
+    'table_to_candles',
+    'export_parquet',
+    'export_ipc',
+    'read_parquet',
+    'read_ipc',
+    'Candles',
+    'MemmapCandleStore',
+    'resample',
+    'Resampler',
+    'MarketDataHub',
+    'OrderBook',
+    'decode_candle_rows',
+    'decode_candle_response',
+    'candles_to_dataframe'
+]
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,228 @@
+"""
+Arrow/Parquet导出
+把本地存储的K线和calculate_all_indicators的结果导出为Parquet数据集或Arrow IPC文件，
+研究notebook可以直接读取机器人使用的同一份数据，不必再通过get_candles重新下载
+
+- Parquet数据集按 inst_id=.../bar=.../ 分区（hive风格），按品种过滤时只打开对应目录；
+  文件内按ts升序分行组，行组的min/max统计让时间过滤只读取命中的行组（谓词下推）
+- 内部NumPy列数组（含MemmapCandleStore的memmap）与Arrow数组互转时直接共享缓冲区，不复制数据
+- Arrow IPC文件通过内存映射读取，多GB的数据集也不需要整体载入内存
+
+需要pyarrow: pip install pyarrow
+
+运行:
+    python3 -m market_data.arrow_io data/candles data/parquet --indicators
+"""
+import argparse
+import os
+import numpy as np
+from .candles import Candles
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # 可选依赖
+    pa = None
+
+# 计算指标时在导出区间之前多读取的K线数，避免区间开头的指标处于预热期
+INDICATOR_WARMUP_BARS = 200
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('Arrow/Parquet导出需要pyarrow: pip install pyarrow')
+
+# ---------- 零拷贝转换 ----------
+
+def to_arrow_array(values):
+    """
+    NumPy一维数值数组 -> Arrow数组，共享同一块内存
+
+    非连续数组（例如带步长的切片）无法共享，会先复制为连续数组
+    """
+    _require_pyarrow()
+    values = np.ascontiguousarray(values)
+    return pa.Array.from_buffers(pa.from_numpy_dtype(values.dtype), len(values), [None, pa.py_buffer(values)])
+
+def to_numpy(array):
+    """
+    Arrow数组/单块ChunkedArray -> 只读NumPy数组，共享同一块内存
+
+    多块的ChunkedArray需要拼接，只有这种情况会复制
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.chunk(0) if array.num_chunks == 1 else array.combine_chunks()
+    return array.to_numpy(zero_copy_only=True)
+
+def arrays_to_table(arrays):
+    """
+    列数组dict（decode_candle_rows/CandleCache/MemmapCandleStore的格式）-> pyarrow.Table（零拷贝）
+
+    Candles也可以直接传入
+    """
+    _require_pyarrow()
+    if isinstance(arrays, Candles):
+        arrays = arrays.to_arrays()
+    names = list(arrays)
+    return pa.Table.from_arrays([to_arrow_array(arrays[name]) for name in names], names=names)
+
+def table_to_arrays(table, columns=None):
+    """pyarrow.Table -> 列数组dict（零拷贝，只读）"""
+    names = columns or table.column_names
+    return {name: to_numpy(table.column(name)) for name in names}
+
+def table_to_candles(table):
+    """pyarrow.Table -> Candles（零拷贝）"""
+    return Candles.from_arrays(table_to_arrays(table, Candles.FIELDS))
+
+def indicator_arrays(arrays):
+    """
+    对K线列数组计算calculate_all_indicators
+
+    返回:
+        dict: {指标名: float64数组}，与输入K线逐行对齐
+    """
+    from utils.advanced_indicators import calculate_all_indicators
+
+    frame = Candles.from_arrays(arrays).to_dataframe()
+    result = calculate_all_indicators(frame)
+    return {name: np.asarray(values, dtype=np.float64) for name, values in result.items()}
+
+# ---------- 导出 ----------
+
+def _read_series(store, inst_id, bar, start, end, indicators):
+    """读取[start, end)的K线，需要指标时多读预热区间并在计算后截掉"""
+    if not indicators or start is None:
+        arrays = store.read(inst_id, bar, start, end)
+        if indicators:
+            arrays = dict(arrays, **indicator_arrays(arrays))
+        return arrays
+
+    ts = store.open(inst_id, bar)['ts']
+    lo = int(np.searchsorted(ts, start, side='left'))
+    warm_start = int(ts[max(0, lo - INDICATOR_WARMUP_BARS)]) if len(ts) else start
+    arrays = store.read(inst_id, bar, warm_start, end)
+    arrays = dict(arrays, **indicator_arrays(arrays))
+    skip = int(np.searchsorted(arrays['ts'], start, side='left'))
+    return {name: column[skip:] for name, column in arrays.items()}
+
+def export_parquet(store, path, series=None, start=None, end=None, indicators=False,
+                   row_group_size=64 * 1024, compression='zstd'):
+    """
+    把存储中的K线导出为按品种/周期分区的Parquet数据集
+
+    参数:
+        store: MemmapCandleStore
+        path: 数据集根目录
+        series: 要导出的[(inst_id, bar)]，默认全部
+        start/end: 导出的时间范围(ms)
+        indicators: 是否附加calculate_all_indicators的各列
+        row_group_size: 每个行组的行数，越小时间过滤越精确
+        compression: Parquet压缩算法
+
+    返回:
+        int: 导出的行数
+    """
+    _require_pyarrow()
+    total = 0
+    for inst_id, bar in (series if series is not None else list(store.series())):
+        arrays = _read_series(store, inst_id, bar, start, end, indicators)
+        if len(arrays['ts']) == 0:
+            continue
+        series_dir = os.path.join(path, f'inst_id={inst_id}', f'bar={bar}')
+        os.makedirs(series_dir, exist_ok=True)
+        file_path = os.path.join(series_dir, 'part-0.parquet')
+        tmp_path = file_path + '.tmp'
+        pq.write_table(arrays_to_table(arrays), tmp_path, row_group_size=row_group_size,
+                       compression=compression)
+        os.replace(tmp_path, file_path)
+        total += len(arrays['ts'])
+        print(f"✅ 导出{inst_id} {bar}: {len(arrays['ts'])}行 -> {file_path}")
+    return total
+
+def export_ipc(store, path, inst_id, bar, start=None, end=None, indicators=False):
+    """
+    把单个序列导出为Arrow IPC文件（未压缩，读取时可内存映射零拷贝）
+
+    返回:
+        int: 导出的行数
+    """
+    _require_pyarrow()
+    table = arrays_to_table(_read_series(store, inst_id, bar, start, end, indicators))
+    table = table.replace_schema_metadata({'inst_id': inst_id, 'bar': bar})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return table.num_rows
+
+# ---------- 读取 ----------
+
+def read_parquet(path, inst_ids=None, bars=None, start=None, end=None, columns=None):
+    """
+    按条件读取导出的Parquet数据集，过滤条件下推到分区目录和行组统计
+
+    参数:
+        path: export_parquet的数据集根目录
+        inst_ids: 只读取这些品种
+        bars: 只读取这些周期
+        start/end: 时间范围[start, end)(ms)
+        columns: 只读取这些列
+
+    返回:
+        pyarrow.Table: 含inst_id和bar分区列
+    """
+    _require_pyarrow()
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    condition = None
+    for expr in (
+        ds.field('inst_id').isin(list(inst_ids)) if inst_ids is not None else None,
+        ds.field('bar').isin(list(bars)) if bars is not None else None,
+        ds.field('ts') >= start if start is not None else None,
+        ds.field('ts') < end if end is not None else None,
+    ):
+        if expr is not None:
+            condition = expr if condition is None else condition & expr
+    return dataset.to_table(columns=columns, filter=condition)
+
+def read_ipc(path, start=None, end=None):
+    """
+    内存映射读取export_ipc导出的文件，按时间范围切片（二分查找，零拷贝）
+
+    返回:
+        pyarrow.Table
+    """
+    _require_pyarrow()
+    with pa.memory_map(path, 'r') as source:
+        table = ipc.open_file(source).read_all()
+    ts = to_numpy(table.column('ts'))
+    lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+    hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='left'))
+    return table.slice(lo, hi - lo)
+
+def main():
+    from .candle_store import MemmapCandleStore
+    from .history import to_ms
+
+    parser = argparse.ArgumentParser(description='K线导出为Parquet数据集')
+    parser.add_argument('root', help='MemmapCandleStore目录')
+    parser.add_argument('out', help='Parquet数据集目录')
+    parser.add_argument('--inst', nargs='+', help='只导出这些品种')
+    parser.add_argument('--start', help='开始时间，例如 2024-01-01')
+    parser.add_argument('--end', help='结束时间（不含）')
+    parser.add_argument('--indicators', action='store_true', help='附加calculate_all_indicators的指标列')
+    args = parser.parse_args()
+
+    store = MemmapCandleStore(args.root)
+    series = [s for s in store.series() if args.inst is None or s[0] in args.inst]
+    total = export_parquet(store, args.out, series=series,
+                           start=to_ms(args.start) if args.start else None,
+                           end=to_ms(args.end) if args.end else None,
+                           indicators=args.indicators)
+    print(f"📊 共导出{total}行")
+
+if __name__ == "__main__":
+    main()
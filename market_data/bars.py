@@ -0,0 +1,52 @@
+"""
+K线周期工具
+OKX周期字符串与毫秒之间的换算
+"""
+
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+
+# OKX周期 -> 毫秒
+BAR_MS = {
+    '1m': MINUTE_MS,
+    '3m': 3 * MINUTE_MS,
+    '5m': 5 * MINUTE_MS,
+    '15m': 15 * MINUTE_MS,
+    '30m': 30 * MINUTE_MS,
+    '1H': HOUR_MS,
+    '2H': 2 * HOUR_MS,
+    '4H': 4 * HOUR_MS,
+    '6H': 6 * HOUR_MS,
+    '12H': 12 * HOUR_MS,
+    '1D': DAY_MS,
+    '2D': 2 * DAY_MS,
+    '3D': 3 * DAY_MS,
+    '1W': 7 * DAY_MS,
+}
+
+# 6H及以上周期默认按香港时间(UTC+8)开盘，带utc后缀的按UTC开盘
+HK_OFFSET_MS = 8 * HOUR_MS
+
+# 周线从周一开盘，而1970-01-01是周四
+WEEK_OFFSET_MS = 3 * DAY_MS
+
+def bar_to_ms(bar):
+    """周期字符串转毫秒，例如 '15m' -> 900000"""
+    key = bar[:-3] if bar.endswith('utc') else bar
+    if key not in BAR_MS:
+        raise ValueError(f'不支持的K线周期: {bar}')
+    return BAR_MS[key]
+
+def bar_offset_ms(bar):
+    """K线起点的偏移毫秒数：K线起点ts满足 (ts + offset) % bar_ms == 0"""
+    bar_ms = bar_to_ms(bar)
+    offset = WEEK_OFFSET_MS if bar_ms == BAR_MS['1W'] else 0
+    if not bar.endswith('utc') and bar_ms >= 6 * HOUR_MS:
+        offset += HK_OFFSET_MS
+    return offset % bar_ms
+
+def bar_start(ts, bar):
+    """时间戳所在K线的起点（支持int和NumPy数组）"""
+    bar_ms = bar_to_ms(bar)
+    return ts - (ts + bar_offset_ms(bar)) % bar_ms
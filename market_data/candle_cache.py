@@ -0,0 +1,216 @@
+"""
+增量K线缓存
+每个(instId, bar)维护一个滚动缓冲区，只拉取最后一根已确认K线之后的数据，
+用confirm字段替换未确认的尾部K线，任意长度的窗口直接从内存返回
+"""
+import threading
+import time
+import numpy as np
+from .bars import bar_to_ms
+from .decode import CANDLE_FIELDS, empty_candles
+
+# /api/v5/market/candles单页最多返回的K线数
+CANDLES_PAGE_LIMIT = 300
+
+def _candle_row(candle):
+    """推送K线dict -> 单行列数组"""
+    row = empty_candles()
+    for name in CANDLE_FIELDS:
+        if name == 'ts':
+            row[name] = np.array([int(candle['ts'])], dtype=np.int64)
+        elif name == 'confirm':
+            row[name] = np.array([bool(candle.get('confirm', True))])
+        else:
+            row[name] = np.array([candle.get(name, np.nan)], dtype=np.float64)
+    return row
+
+class CandleCache:
+    """按(instId, bar)缓存K线列数组"""
+
+    def __init__(self, client, capacity=1000, max_age=0.0):
+        """
+        参数:
+            client: OKXHTTPClient实例，需提供get_candle_arrays
+            capacity: 每个缓冲区最多保留的K线数量（请求更长窗口时自动扩大）
+            max_age: 距上次拉取不足max_age秒时直接返回缓存，0表示每次都增量拉取
+        """
+        self.client = client
+        self.capacity = capacity
+        self.max_age = max_age
+        self.requests = 0
+        self._buffers = {}   # (inst_id, bar) -> 列数组dict
+        self._fetched = {}   # (inst_id, bar) -> 上次拉取的monotonic时间
+        self._key_locks = {}  # 同一序列的拉取串行，不同序列互不阻塞
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _last_confirmed(arrays):
+        """最后一根已确认K线的时间戳，没有时返回None"""
+        confirmed = np.flatnonzero(arrays['confirm'])
+        return int(arrays['ts'][confirmed[-1]]) if len(confirmed) else None
+
+    def _merge(self, key, new):
+        """把新K线合并进缓冲区：时间戳不早于new首根的旧K线（含未确认尾部）被替换"""
+        old = self._buffers.get(key)
+        if old is None or len(old['ts']) == 0:
+            merged = new
+        elif len(new['ts']) == 0:
+            return
+        else:
+            keep = np.searchsorted(old['ts'], new['ts'][0], side='left')
+            # 总是生成新数组，之前返回给调用方的窗口不会被修改
+            merged = {name: np.concatenate((old[name][:keep], new[name])) for name in CANDLE_FIELDS}
+        if len(merged['ts']) > self.capacity:
+            merged = {name: column[-self.capacity:] for name, column in merged.items()}
+        self._buffers[key] = merged
+
+    def _fetch(self, inst_id, bar, limit, before=None):
+        self.requests += 1
+        result = self.client.get_candle_arrays(inst_id, bar, limit, before=before)
+        if result and result.get('code') == '0':
+            return result['data']
+        print(f"❌ 获取K线数据失败: {result}")
+        return None
+
+    def refresh(self, inst_id, bar, limit):
+        """
+        同步缓冲区，保证至少有limit根K线且包含最新数据
+
+        返回:
+            bool: 是否成功
+        """
+        key = (inst_id, bar)
+        buffer = self._buffers.get(key)
+        last_confirmed = self._last_confirmed(buffer) if buffer is not None else None
+        have = len(buffer['ts']) if buffer is not None else 0
+
+        if last_confirmed is None or have < limit:
+            # 首次加载或请求的窗口比缓存长，整体重新拉取
+            arrays = self._fetch(inst_id, bar, max(limit, min(have, CANDLES_PAGE_LIMIT)))
+            if arrays is None:
+                return False
+            self._buffers.pop(key, None)
+        else:
+            now_ms = int(time.time() * 1000)
+            missing = (now_ms - last_confirmed) // bar_to_ms(bar)
+            if missing >= CANDLES_PAGE_LIMIT:
+                # 停顿太久，一页补不齐，整体重新拉取
+                arrays = self._fetch(inst_id, bar, max(limit, CANDLES_PAGE_LIMIT))
+                if arrays is None:
+                    return False
+                self._buffers.pop(key, None)
+            else:
+                # before=ts返回比ts更新的K线：只拉取最后确认K线之后的部分
+                arrays = self._fetch(inst_id, bar, CANDLES_PAGE_LIMIT, before=last_confirmed)
+                if arrays is None:
+                    return False
+        self._merge(key, arrays)
+        self._fetched[key] = time.monotonic()
+        return True
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def window(self, inst_id, bar, limit):
+        """
+        不访问接口，直接返回缓存中最近limit根K线
+
+        返回:
+            dict: 只读列数组视图；缓存不足limit根时返回None
+        """
+        buffer = self._buffers.get((inst_id, bar))
+        if buffer is None or len(buffer['ts']) < limit:
+            return None
+        window = {}
+        for name, column in buffer.items():
+            view = column[-limit:] if limit else column[:0]
+            view.flags.writeable = False
+            window[name] = view
+        return window
+
+    def age(self, inst_id, bar):
+        """距上次成功拉取的秒数，从未拉取时返回None"""
+        fetched = self._fetched.get((inst_id, bar))
+        return None if fetched is None else time.monotonic() - fetched
+
+    def get(self, inst_id, bar, limit=100):
+        """
+        获取最近limit根K线
+
+        返回:
+            dict: 与decode_candle_rows格式一致的列数组（只读视图，时间升序），失败时返回None
+        """
+        limit = int(limit)
+        self.capacity = max(self.capacity, limit)
+        with self._key_lock((inst_id, bar)):
+            age = self.age(inst_id, bar)
+            fresh = self.max_age and age is not None and age < self.max_age
+            window = self.window(inst_id, bar, limit) if fresh else None
+            if window is not None:
+                return window
+            if not self.refresh(inst_id, bar, limit):
+                return None
+            return self.window(inst_id, bar, min(limit, len(self._buffers[(inst_id, bar)]['ts'])))
+
+    def update(self, inst_id, bar, candle):
+        """
+        合并一根推送的K线（ws_feed.parse_candle格式），只更新已有的缓冲区
+
+        已确认的推送K线让下次get()无需访问接口即可获得最新数据
+        """
+        key = (inst_id, bar)
+        with self._key_lock(key):
+            buffer = self._buffers.get(key)
+            if buffer is None or len(buffer['ts']) == 0:
+                return
+            ts = int(candle['ts'])
+            last = int(buffer['ts'][-1])
+            if ts < last:
+                return
+            if ts > last and (ts - last > bar_to_ms(bar) or not buffer['confirm'][-1]):
+                # 与缓存之间有缺口或漏掉了上一根的确认推送，交给下次get()补齐
+                return
+            self._merge(key, _candle_row(candle))
+
+    def clear(self, inst_id=None, bar=None):
+        """清除缓存，不传参数时清除全部"""
+        for key in list(self._buffers):
+            if (inst_id is None or key[0] == inst_id) and (bar is None or key[1] == bar):
+                with self._key_lock(key):
+                    self._buffers.pop(key, None)
+                    self._fetched.pop(key, None)
+
+class OfflineCandleCache(CandleCache):
+    """
+    不访问接口的K线缓存，只由推送K线(update)或prime填充
+
+    回放录制行情时代替CandleCache：窗口只包含回放到当前为止的K线，不会混入实时数据
+    """
+
+    def __init__(self, capacity=1000):
+        super().__init__(None, capacity)
+
+    def refresh(self, inst_id, bar, limit):
+        """没有数据源，缓冲区有数据即视为成功（不足limit根时get返回已有的部分）"""
+        buffer = self._buffers.get((inst_id, bar))
+        return buffer is not None and len(buffer['ts']) > 0
+
+    def prime(self, inst_id, bar, arrays):
+        """用历史K线（decode_candle_rows格式的列数组，时间升序）初始化缓冲区"""
+        key = (inst_id, bar)
+        with self._key_lock(key):
+            self._buffers.pop(key, None)
+            self._merge(key, {name: np.asarray(arrays[name]) for name in CANDLE_FIELDS})
+
+    def update(self, inst_id, bar, candle):
+        """合并一根推送K线：没有缓冲区时新建，早于最后一根的K线被忽略，缺口不影响追加"""
+        key = (inst_id, bar)
+        with self._key_lock(key):
+            buffer = self._buffers.get(key)
+            if buffer is not None and len(buffer['ts']) and int(candle['ts']) < int(buffer['ts'][-1]):
+                return
+            self._merge(key, _candle_row(candle))
@@ -0,0 +1,233 @@
+"""
+内存映射的列式K线存储
+每个(instId, bar)一组定宽列文件（ts为int64，其余为float64），通过numpy.memmap读取，
+多年的1m K线也不需要整体载入内存；按时间二分查找切片，追加写入是原子的
+
+目录结构:
+    root/{instId}/{bar}/meta.json           # {'length': 行数, 'generation': 文件代号}
+    root/{instId}/{bar}/{列名}.{代号}.bin    # 每列一个文件
+
+写入协议: 追加时先把数据写到列文件末尾并fsync，再用os.replace原子替换meta.json；
+读者只读取meta中的length行，写到一半崩溃留下的尾部垃圾会在下次追加时截掉。
+早于已有数据的写入只重写重叠的尾部：用searchsorted找到新数据插入的位置，
+把合并后的尾部先写入journal.npz，meta的length缩短到插入位置（读者只看到不变的前缀），
+再从该位置覆盖列文件并恢复length；中途崩溃时下次写入会按journal重做。
+已打开的映射中被重写的尾部会看到新数据，需要一致快照的读者应在写入后重新open。
+同一序列只能有一个写入进程。
+"""
+import json
+import os
+import threading
+import numpy as np
+from .decode import decode_candle_rows
+
+# 存储的列，与decode_candle_rows的字段一致（confirm不存储，入库的都是已确认K线）
+STORE_FIELDS = ('ts', 'open', 'high', 'low', 'close', 'vol', 'vol_ccy', 'vol_ccy_quote')
+
+def _dtype(name):
+    return np.int64 if name == 'ts' else np.float64
+
+class MemmapCandleStore:
+    """列式追加K线存储"""
+
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _series_dir(self, inst_id, bar):
+        return os.path.join(self.root, inst_id, bar)
+
+    def _lock(self, inst_id, bar):
+        with self._locks_guard:
+            return self._locks.setdefault((inst_id, bar), threading.Lock())
+
+    def _column_path(self, series_dir, name, generation):
+        return os.path.join(series_dir, f'{name}.{generation}.bin')
+
+    def _read_meta(self, series_dir):
+        path = os.path.join(series_dir, 'meta.json')
+        if not os.path.exists(path):
+            return {'length': 0, 'generation': 0}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, series_dir, meta):
+        path = os.path.join(series_dir, 'meta.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def series(self):
+        """遍历已有的(instId, bar)"""
+        if not os.path.isdir(self.root):
+            return
+        for inst_id in sorted(os.listdir(self.root)):
+            inst_dir = os.path.join(self.root, inst_id)
+            if not os.path.isdir(inst_dir):
+                continue
+            for bar in sorted(os.listdir(inst_dir)):
+                if os.path.exists(os.path.join(inst_dir, bar, 'meta.json')):
+                    yield inst_id, bar
+
+    def length(self, inst_id, bar):
+        """已存储的K线数量"""
+        return self._read_meta(self._series_dir(inst_id, bar))['length']
+
+    def open(self, inst_id, bar):
+        """
+        打开整个序列
+
+        返回:
+            dict: {列名: 只读numpy.memmap}，按时间升序；没有数据时为空数组
+        """
+        series_dir = self._series_dir(inst_id, bar)
+        meta = self._read_meta(series_dir)
+        length = meta['length']
+        columns = {}
+        for name in STORE_FIELDS:
+            if length == 0:
+                columns[name] = np.empty(0, dtype=_dtype(name))
+            else:
+                path = self._column_path(series_dir, name, meta['generation'])
+                columns[name] = np.memmap(path, dtype=_dtype(name), mode='r', shape=(length,))
+        return columns
+
+    def read(self, inst_id, bar, start=None, end=None):
+        """
+        读取[start, end)时间范围内的K线（毫秒时间戳），O(log n)定位，不复制数据
+
+        返回:
+            dict: {列名: 只读memmap切片}
+        """
+        columns = self.open(inst_id, bar)
+        ts = columns['ts']
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='left'))
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    def last_ts(self, inst_id, bar):
+        """最后一根K线的时间戳，没有数据时返回None"""
+        ts = self.open(inst_id, bar)['ts']
+        return int(ts[-1]) if len(ts) else None
+
+    @staticmethod
+    def _normalize(rows):
+        """OKX原始数组列表或列数组dict -> 按时间升序、时间戳唯一的列数组"""
+        arrays = decode_candle_rows(rows) if isinstance(rows, (list, tuple)) else rows
+        ts = np.asarray(arrays['ts'], dtype=np.int64)
+        if len(ts) == 0:
+            return None
+        # 同一批内的重复时间戳以后出现的为准
+        order = np.argsort(ts, kind='stable')
+        ts_sorted = ts[order]
+        last = np.append(ts_sorted[1:] != ts_sorted[:-1], True)
+        index = order[last]
+        return {name: np.asarray(arrays[name], dtype=_dtype(name))[index] for name in STORE_FIELDS}
+
+    def write(self, inst_id, bar, rows):
+        """
+        写入一批K线（OKX原始数组或decode_candle_rows结果，顺序任意）
+
+        新数据全部晚于已有数据时直接追加；否则只把新数据与时间上重叠的已有尾部合并去重（新数据优先）后重写尾部，
+        耗时与尾部长度成正比，与序列总长度无关
+
+        返回:
+            int: 写入后的总行数
+        """
+        arrays = self._normalize(rows)
+        series_dir = self._series_dir(inst_id, bar)
+        with self._lock(inst_id, bar):
+            meta = self._read_meta(series_dir)
+            self._replay_journal(series_dir, meta)
+            if arrays is None:
+                return meta['length']
+            os.makedirs(series_dir, exist_ok=True)
+            existing = self.open(inst_id, bar)
+            if meta['length'] == 0 or arrays['ts'][0] > existing['ts'][-1]:
+                self._append(series_dir, meta, arrays)
+            else:
+                self._rewrite_tail(series_dir, meta, existing, arrays)
+            return meta['length']
+
+    def _append(self, series_dir, meta, arrays):
+        length = meta['length']
+        n = len(arrays['ts'])
+        for name in STORE_FIELDS:
+            path = self._column_path(series_dir, name, meta['generation'])
+            itemsize = np.dtype(_dtype(name)).itemsize
+            with open(path, 'ab+') as f:
+                # 截掉上次崩溃可能留下的未提交数据
+                f.truncate(length * itemsize)
+                f.seek(length * itemsize)
+                f.write(np.ascontiguousarray(arrays[name]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        meta['length'] = length + n
+        self._write_meta(series_dir, meta)
+
+    def _journal_path(self, series_dir):
+        return os.path.join(series_dir, 'journal.npz')
+
+    def _rewrite_tail(self, series_dir, meta, existing, arrays):
+        # 已有数据中第一根不早于新数据的位置，之前的部分保持不动
+        offset = int(np.searchsorted(existing['ts'], arrays['ts'][0], side='left'))
+        ts = np.concatenate((arrays['ts'], existing['ts'][offset:]))
+        # 稳定排序后保留每个时间戳的第一条，即新数据
+        order = np.argsort(ts, kind='stable')
+        ts_sorted = ts[order]
+        first = np.insert(ts_sorted[1:] != ts_sorted[:-1], 0, True)
+        index = order[first]
+        tail = {name: np.concatenate((arrays[name], existing[name][offset:]))[index] for name in STORE_FIELDS}
+
+        # 先落盘journal，再缩短length，之后覆盖列文件时读者和崩溃恢复都不会看到写了一半的尾部
+        path = self._journal_path(series_dir)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, offset=np.int64(offset), **tail)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        meta['length'] = offset
+        self._write_meta(series_dir, meta)
+        self._apply_tail(series_dir, meta, offset, tail)
+
+    def _apply_tail(self, series_dir, meta, offset, tail):
+        """从offset行开始覆盖列文件，提交length后删除journal"""
+        for name in STORE_FIELDS:
+            path = self._column_path(series_dir, name, meta['generation'])
+            itemsize = np.dtype(_dtype(name)).itemsize
+            # 不截断文件：其他读者的映射可能仍覆盖旧长度，截短会使访问越界
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(offset * itemsize)
+                f.write(np.ascontiguousarray(tail[name]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        meta['length'] = offset + len(tail['ts'])
+        self._write_meta(series_dir, meta)
+        os.remove(self._journal_path(series_dir))
+
+    def _replay_journal(self, series_dir, meta):
+        """上次重写尾部时崩溃：按journal重做"""
+        path = self._journal_path(series_dir)
+        if not os.path.exists(path):
+            return
+        with np.load(path) as journal:
+            offset = int(journal['offset'])
+            tail = {name: journal[name] for name in STORE_FIELDS}
+        print(f"🔧 恢复未完成的尾部重写: {series_dir} 从第{offset}行")
+        meta['length'] = offset
+        self._apply_tail(series_dir, meta, offset, tail)
+
+    def append_candle(self, inst_id, bar, candle):
+        """追加一根已确认的推送K线（ws_feed.parse_candle格式）"""
+        row = {name: np.array([candle.get(name, np.nan)], dtype=_dtype(name)) for name in STORE_FIELDS}
+        return self.write(inst_id, bar, row)
+
+    def on_bar(self, inst_id, bar, candle, confirmed):
+        """MarketDataFeed监听接口：把确认K线实时落盘"""
+        if confirmed:
+            self.append_candle(inst_id, bar, candle)
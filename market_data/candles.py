@@ -0,0 +1,91 @@
+"""
+紧凑的K线结构
+按列(struct-of-arrays)保存ts/open/high/low/close/vol六个NumPy数组，切片和窗口都是零拷贝视图，
+供信号计算热路径替代DataFrame；indicators包和BaseStrategy可直接接收
+"""
+import numpy as np
+
+class Candles:
+    """
+    时间升序的K线列数组
+
+    用法:
+        candles.close[-1]            # 最新收盘价
+        candles.window(20)           # 最近20根（视图）
+        candles['high']              # 按列名取数组，与DataFrame列名一致
+    """
+
+    __slots__ = ('ts', 'open', 'high', 'low', 'close', 'vol')
+
+    FIELDS = ('ts', 'open', 'high', 'low', 'close', 'vol')
+
+    def __init__(self, ts, open, high, low, close, vol):
+        # 已经是正确dtype的数组（含memmap）不会被复制
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.vol = np.asarray(vol, dtype=np.float64)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """从decode_candle_rows/CandleCache/MemmapCandleStore的列数组dict构建（零拷贝）"""
+        return cls(arrays['ts'], arrays['open'], arrays['high'], arrays['low'], arrays['close'], arrays['vol'])
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """从get_market_data格式的DataFrame构建"""
+        ts = df['timestamp']
+        ts = ts.values.astype('datetime64[ms]').astype(np.int64) if hasattr(ts, 'dt') else ts.values
+        return cls(ts, df['open'].values, df['high'].values, df['low'].values, df['close'].values, df['vol'].values)
+
+    @classmethod
+    def empty(cls):
+        return cls(*(np.empty(0) for _ in cls.FIELDS))
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __getitem__(self, key):
+        """列名返回对应数组；切片返回共享内存的Candles视图"""
+        if isinstance(key, str):
+            if key == 'timestamp':
+                return self.ts
+            if key not in self.FIELDS:
+                raise KeyError(key)
+            return getattr(self, key)
+        if isinstance(key, slice):
+            return Candles(self.ts[key], self.open[key], self.high[key], self.low[key], self.close[key], self.vol[key])
+        raise TypeError(f'Candles不支持的索引: {key!r}')
+
+    def __repr__(self):
+        if len(self) == 0:
+            return 'Candles(0)'
+        return f'Candles({len(self)}, ts={int(self.ts[0])}..{int(self.ts[-1])}, close={self.close[-1]})'
+
+    def window(self, n):
+        """最近n根K线（视图）"""
+        return self[-n:] if n else self[:0]
+
+    def between(self, start=None, end=None):
+        """[start, end)毫秒时间范围内的K线（二分查找，视图）"""
+        lo = 0 if start is None else int(np.searchsorted(self.ts, start, side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.ts, end, side='left'))
+        return self[lo:hi]
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def to_dataframe(self):
+        """转为DataFrame（列名与get_market_data一致，不含volCcy等列）"""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(self.ts, unit='ms'),
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'vol': self.vol
+        })
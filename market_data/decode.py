@@ -0,0 +1,82 @@
+"""
+K线快速解码
+把OKX K线响应直接解析成按时间升序的连续NumPy数组，只在需要时才构建DataFrame
+安装了orjson时自动使用它解析JSON
+"""
+import json
+import numpy as np
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # 可选依赖
+    orjson = None
+    loads = json.loads
+
+# 解码结果的列，与OKX K线数组的顺序一致
+CANDLE_FIELDS = ('ts', 'open', 'high', 'low', 'close', 'vol', 'vol_ccy', 'vol_ccy_quote', 'confirm')
+
+# 与BaseStrategy.get_market_data原有DataFrame一致的列名
+FRAME_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'vol', 'volCcy', 'volCcy2', 'confirm')
+
+def empty_candles():
+    """空的K线数组dict"""
+    arrays = {name: np.empty(0, dtype=np.float64) for name in CANDLE_FIELDS}
+    arrays['ts'] = np.empty(0, dtype=np.int64)
+    arrays['confirm'] = np.empty(0, dtype=bool)
+    return arrays
+
+def decode_candle_rows(rows):
+    """
+    把OKX K线数组列表（时间倒序的字符串数组）解码为列数组
+
+    返回:
+        dict: {'ts': int64, 'open'...'vol_ccy_quote': float64, 'confirm': bool}，按时间升序
+    """
+    n = len(rows)
+    if n == 0:
+        return empty_candles()
+
+    # 毫秒时间戳小于2^53，用float64解析是精确的；一次性解析全部字段后按列转置
+    values = np.array(rows, dtype=np.float64)
+    if values.ndim != 2 or values.shape[1] < 6:
+        raise ValueError(f'K线数据格式错误: shape={values.shape}')
+    width = min(values.shape[1], len(CANDLE_FIELDS))
+
+    columns = np.empty((len(CANDLE_FIELDS), n), dtype=np.float64)
+    columns[:width, ::-1] = values[:, :width].T
+    if width < len(CANDLE_FIELDS):
+        columns[width:-1] = np.nan
+        columns[-1] = 1.0  # 旧格式没有confirm字段，视为已确认
+
+    # 接口返回时间倒序，但翻页结果可能已经是升序，统一按时间排序
+    if n > 1 and columns[0, 0] > columns[0, -1]:
+        columns = columns[:, ::-1].copy()
+
+    arrays = {name: columns[i] for i, name in enumerate(CANDLE_FIELDS)}
+    arrays['ts'] = columns[0].astype(np.int64)
+    arrays['confirm'] = columns[-1] != 0
+    return arrays
+
+def decode_candle_response(content):
+    """
+    解码K线接口的原始响应
+
+    参数:
+        content: 响应体bytes/str，或已解析的dict
+
+    返回:
+        dict: 与OKX响应结构一致，但'data'为decode_candle_rows的结果；code非'0'时data保持原样
+    """
+    result = loads(content) if isinstance(content, (bytes, bytearray, str)) else content
+    if isinstance(result, dict) and result.get('code') == '0':
+        result['data'] = decode_candle_rows(result.get('data') or [])
+    return result
+
+def candles_to_dataframe(arrays):
+    """把解码后的列数组构建为DataFrame（列名与get_market_data一致）"""
+    import pandas as pd
+
+    data = {frame_column: arrays[field] for field, frame_column in zip(CANDLE_FIELDS, FRAME_COLUMNS)}
+    data['timestamp'] = pd.to_datetime(arrays['ts'], unit='ms')
+    return pd.DataFrame(data, columns=list(FRAME_COLUMNS))
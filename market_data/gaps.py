@@ -0,0 +1,318 @@
+"""
+K线缺口检测与后台补齐
+轮询间隙、进程重启和交易所故障会在本地K线序列中留下空洞，使SAR/ATR悄悄算错。
+find_gaps对时间戳数组做一次向量化差分即可找出全部缺口（O(n)）；
+BackfillScheduler在后台线程中扫描存储里的所有(instId, bar)序列，按缺口结束时间从近到远
+通过history-candles接口补齐，请求经过客户端限流器并额外限制自身速率，不会阻塞实盘交易循环
+
+用法:
+    scheduler = BackfillScheduler(client, MemmapCandleStore('data/candles'))
+    scheduler.start()                 # 后台定期扫描并补齐
+    feed.add_listener(scheduler)      # WebSocket发现的K线缺口直接加入队列
+
+运行:
+    python3 -m market_data.gaps data/candles --fill
+"""
+import argparse
+import bisect
+import heapq
+import itertools
+import threading
+import time
+import numpy as np
+from okx_rate_limiter import TokenBucket
+from .bars import bar_to_ms, bar_start
+from .history import HistoryDownloader, HISTORY_PAGE_LIMIT
+
+def find_gaps(ts, bar, start=None, end=None):
+    """
+    找出K线时间戳序列中的缺口
+
+    参数:
+        ts: 升序的K线起点时间戳(ms)数组
+        bar: K线周期
+        start: 序列应当开始的时间，早于第一根K线的部分也算缺口
+        end: 序列应当结束的时间（不含），晚于最后一根K线的部分也算缺口
+
+    返回:
+        np.ndarray: 形状(k, 2)的int64数组，每行为缺失区间[缺口开始, 缺口结束)，按时间升序
+    """
+    bar_ms = bar_to_ms(bar)
+    ts = np.asarray(ts, dtype=np.int64)
+    if len(ts) == 0:
+        if start is not None and end is not None and end > start:
+            return np.array([[start, end]], dtype=np.int64)
+        return np.empty((0, 2), dtype=np.int64)
+
+    # 相邻两根相差超过一个周期即为缺口
+    idx = np.flatnonzero(np.diff(ts) > bar_ms)
+    gaps = np.column_stack((ts[idx] + bar_ms, ts[idx + 1]))
+    if start is not None and start < ts[0]:
+        gaps = np.vstack(([[start, ts[0]]], gaps))
+    if end is not None and end > ts[-1] + bar_ms:
+        gaps = np.vstack((gaps, [[ts[-1] + bar_ms, end]]))
+    return gaps.astype(np.int64, copy=False)
+
+def missing_timestamps(ts, bar, start=None, end=None):
+    """
+    缺失的每一根K线的起点时间戳
+
+    返回:
+        np.ndarray: int64时间戳数组，按时间升序
+    """
+    bar_ms = bar_to_ms(bar)
+    gaps = find_gaps(ts, bar, start, end)
+    if len(gaps) == 0:
+        return np.empty(0, dtype=np.int64)
+    counts = (gaps[:, 1] - gaps[:, 0]) // bar_ms
+    # 每个缺口内的序号0..count-1，用累加和展开，避免Python循环
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(gaps[:, 0], counts) + offsets * bar_ms
+
+class BackfillScheduler:
+    """
+    后台K线补齐调度器
+
+    所有序列的缺口放在同一个优先队列中，最近的缺口最先补；大缺口按单页K线数切块，
+    每块补完后剩余部分重新入队，因此一个多年的空洞不会挡住其他序列刚出现的新缺口
+    """
+
+    def __init__(self, client, store, max_rate=5.0, rescan_interval=300.0, include_tail=True):
+        """
+        参数:
+            client: OKXHTTPClient实例
+            store: MemmapCandleStore（需实现series/open/write）
+            max_rate: 每秒最多发出的补齐请求数（history-candles限速为每2秒20次，默认只用一半）
+            rescan_interval: 后台线程重新扫描全部序列的间隔（秒）
+            include_tail: 是否把最后一根K线到当前时间之间缺失的已收盘K线也算作缺口
+        """
+        self.client = client
+        self.store = store
+        self.rescan_interval = rescan_interval
+        self.include_tail = include_tail
+        self.downloader = HistoryDownloader(client, store)
+        self.requests = 0
+        self.filled = 0
+        self._bucket = TokenBucket(max_rate, 1)
+        self._queue = []          # (-缺口结束时间, 序号, inst_id, bar, start, end)
+        self._queued = set()      # 已在队列中的(inst_id, bar, start, end)
+        self._attempted = {}      # (inst_id, bar) -> 已请求过但交易所没有数据的区间[(start, end)]，升序
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- 扫描 ----------
+
+    def _is_attempted(self, key, start, end):
+        """[start, end)是否完全落在已请求过的区间内（交易所本身缺数据，不再重复请求）"""
+        ranges = self._attempted.get(key)
+        if not ranges:
+            return False
+        # 区间已合并且互不相交，覆盖[start, end)的只可能是起点不晚于start的最后一个
+        i = bisect.bisect_right(ranges, (start, float('inf'))) - 1
+        return i >= 0 and ranges[i][1] >= end
+
+    def _untried_end(self, key, start, end):
+        """去掉[start, end)末尾已请求过的部分，返回新的结束时间（不大于start表示全部请求过）"""
+        ranges = self._attempted.get(key)
+        if not ranges:
+            return end
+        i = bisect.bisect_left(ranges, (end, end)) - 1
+        if i >= 0 and ranges[i][0] < end <= ranges[i][1]:
+            return ranges[i][0]
+        return end
+
+    def _mark_attempted(self, key, start, end):
+        """记录[start, end)，与相邻或重叠的区间合并"""
+        ranges = self._attempted.setdefault(key, [])
+        lo = bisect.bisect_left(ranges, (start, start))
+        if lo > 0 and ranges[lo - 1][1] >= start:
+            lo -= 1
+        hi = lo
+        while hi < len(ranges) and ranges[hi][0] <= end:
+            start = min(start, ranges[hi][0])
+            end = max(end, ranges[hi][1])
+            hi += 1
+        ranges[lo:hi] = [(start, end)]
+
+    def add_gap(self, inst_id, bar, start, end):
+        """把缺失区间[start, end)加入补齐队列"""
+        if end <= start:
+            return
+        item = (inst_id, bar, int(start), int(end))
+        with self._lock:
+            if item in self._queued or self._is_attempted((inst_id, bar), item[2], item[3]):
+                return
+            self._queued.add(item)
+            heapq.heappush(self._queue, (-item[3], next(self._seq)) + item)
+        self._wakeup.set()
+
+    def scan_series(self, inst_id, bar, now_ms=None):
+        """
+        扫描单个序列并把缺口加入队列
+
+        返回:
+            int: 缺失的K线数量
+        """
+        ts = self.store.open(inst_id, bar)['ts']
+        end = None
+        if self.include_tail and len(ts):
+            # 当前未收盘的K线不算缺口
+            now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+            end = int(bar_start(now_ms, bar))
+        gaps = find_gaps(ts, bar, end=end)
+        for start, stop in gaps.tolist():
+            self.add_gap(inst_id, bar, start, stop)
+        return int(((gaps[:, 1] - gaps[:, 0]) // bar_to_ms(bar)).sum()) if len(gaps) else 0
+
+    def scan(self, series=None, now_ms=None):
+        """
+        扫描多个序列，默认扫描存储中的全部序列
+
+        返回:
+            dict: {(inst_id, bar): 缺失K线数}，只包含有缺口的序列
+        """
+        missing = {}
+        for inst_id, bar in (series if series is not None else self.store.series()):
+            try:
+                count = self.scan_series(inst_id, bar, now_ms)
+            except Exception as e:
+                print(f"❌ 扫描{inst_id} {bar}失败: {e}")
+                continue
+            if count:
+                missing[(inst_id, bar)] = count
+        return missing
+
+    def pending(self):
+        """队列中待补齐的区间数"""
+        with self._lock:
+            return len(self._queue)
+
+    # ---------- 补齐 ----------
+
+    def _throttle(self):
+        while True:
+            now = time.monotonic()
+            self._bucket.refill(now)
+            wait = self._bucket.wait_time()
+            if wait == 0:
+                self._bucket.take()
+                return True
+            if self._stop.wait(wait):
+                return False
+
+    def step(self):
+        """
+        补齐队列中最近的一块缺口（最多一页K线）
+
+        返回:
+            bool: 是否处理了一块，队列为空时返回False
+        """
+        with self._lock:
+            while True:
+                if not self._queue:
+                    return False
+                _, _, inst_id, bar, start, end = heapq.heappop(self._queue)
+                self._queued.discard((inst_id, bar, start, end))
+                # 入队后可能有其他块请求过同一段，末尾已请求过的部分直接跳过
+                end = self._untried_end((inst_id, bar), start, end)
+                if end > start:
+                    break
+        # 从缺口末端往前取一页，剩余部分重新入队
+        chunk_start = max(start, end - HISTORY_PAGE_LIMIT * bar_to_ms(bar))
+        if chunk_start > start:
+            self.add_gap(inst_id, bar, start, chunk_start)
+
+        if not self._throttle():
+            self.add_gap(inst_id, bar, chunk_start, end)
+            return False
+        self.requests += 1
+        try:
+            rows = self.downloader.fetch_range(inst_id, bar, chunk_start, end)
+        except Exception as e:
+            print(f"❌ 补齐{inst_id} {bar} [{chunk_start}, {end})失败: {e}")
+            return True
+        if rows:
+            self.store.write(inst_id, bar, rows)
+            self.filled += len(rows)
+        bar_ms = bar_to_ms(bar)
+        settled = end <= time.time() * 1000 - 2 * bar_ms  # 刚收盘的K线历史接口可能还没有
+        if len(rows) < (end - chunk_start) // bar_ms and settled:
+            # 交易所也没有这些K线（停机维护、上线前），记录下来，重新扫描时不再请求
+            with self._lock:
+                self._mark_attempted((inst_id, bar), chunk_start, end)
+        return True
+
+    def run_pending(self, max_requests=None):
+        """
+        在当前线程中补齐队列中的缺口
+
+        返回:
+            int: 发出的请求数
+        """
+        count = 0
+        while max_requests is None or count < max_requests:
+            if self._stop.is_set() or not self.step():
+                break
+            count += 1
+        return count
+
+    # ---------- 后台线程 ----------
+
+    def on_gap(self, inst_id, channel, detail):
+        """MarketDataFeed监听接口：K线推送缺口（detail['end']为最后一根缺失K线）立即入队"""
+        if not channel.startswith('candle') or 'bar' not in detail:
+            return
+        bar = detail['bar']
+        self.add_gap(inst_id, bar, detail['start'], detail['end'] + bar_to_ms(bar))
+
+    def start(self):
+        """启动后台线程：每rescan_interval秒扫描一次存储，其余时间处理队列"""
+        self._stop.clear()
+
+        def loop():
+            next_scan = 0.0
+            while not self._stop.is_set():
+                if time.monotonic() >= next_scan:
+                    missing = self.scan()
+                    if missing:
+                        print(f"📊 发现{len(missing)}个序列存在缺口，共缺{sum(missing.values())}根K线")
+                    next_scan = time.monotonic() + self.rescan_interval
+                self._wakeup.clear()
+                self.run_pending()
+                self._wakeup.wait(max(0.0, next_scan - time.monotonic()))
+
+        self._thread = threading.Thread(target=loop, name='candle-backfill', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+def main():
+    from okx_http_client import OKXHTTPClient
+    from .candle_store import MemmapCandleStore
+
+    parser = argparse.ArgumentParser(description='K线缺口检测与补齐')
+    parser.add_argument('root', help='MemmapCandleStore目录')
+    parser.add_argument('--fill', action='store_true', help='通过history-candles补齐发现的缺口')
+    parser.add_argument('--rate', type=float, default=5.0, help='每秒最多的补齐请求数')
+    args = parser.parse_args()
+
+    with OKXHTTPClient() as client:
+        scheduler = BackfillScheduler(client, MemmapCandleStore(args.root), max_rate=args.rate)
+        missing = scheduler.scan()
+        for (inst_id, bar), count in sorted(missing.items()):
+            print(f"   {inst_id} {bar}: 缺{count}根K线")
+        print(f"📊 {len(missing)}个序列存在缺口，共缺{sum(missing.values())}根K线")
+        if args.fill and missing:
+            requests = scheduler.run_pending()
+            print(f"✅ 补齐完成: {requests}次请求，写入{scheduler.filled}根K线")
+
+if __name__ == "__main__":
+    main()
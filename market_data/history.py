@@ -0,0 +1,229 @@
+"""
+历史K线下载器
+基于/api/v5/market/history-candles分页拉取，把时间区间切成多个窗口并发下载
+每个窗口完成后立即写入本地存储并记录进度，中断后重新运行会跳过已完成的窗口
+
+运行:
+    python3 -m market_data.history BTC-USDT-SWAP 1m 2023-01-01 2025-01-01 --out data/candles
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from .bars import bar_to_ms
+
+# history-candles单页最多返回的K线数
+HISTORY_PAGE_LIMIT = 100
+
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'vol', 'volCcy', 'volCcyQuote', 'confirm']
+
+def to_ms(value):
+    """时间转毫秒时间戳，支持int毫秒、datetime和ISO格式字符串（无时区按UTC）"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+def split_windows(start, end, window_ms, bar_ms):
+    """把[start, end)按K线边界切成若干窗口"""
+    start = start - start % bar_ms
+    windows = []
+    while start < end:
+        stop = min(start + window_ms, end)
+        windows.append((start, stop))
+        start = stop
+    return windows
+
+class CsvCandleStore:
+    """
+    简单的CSV K线存储
+    每个(instId, bar)一个目录，每次写入一个分块文件，读取时合并去重
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _series_dir(self, inst_id, bar):
+        return os.path.join(self.root, inst_id, bar)
+
+    def write(self, inst_id, bar, rows):
+        """写入一批K线（OKX原始数组格式，时间升序）"""
+        if not rows:
+            return
+        series_dir = self._series_dir(inst_id, bar)
+        os.makedirs(series_dir, exist_ok=True)
+        path = os.path.join(series_dir, f'{rows[0][0]}_{rows[-1][0]}.csv')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(','.join(CANDLE_COLUMNS) + '\n')
+            for row in rows:
+                f.write(','.join(str(v) for v in row) + '\n')
+        os.replace(tmp_path, path)
+
+    def read(self, inst_id, bar):
+        """读取全部K线为DataFrame（时间升序、去重）"""
+        import pandas as pd
+
+        series_dir = self._series_dir(inst_id, bar)
+        if not os.path.isdir(series_dir):
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+        frames = [pd.read_csv(os.path.join(series_dir, name))
+                  for name in sorted(os.listdir(series_dir)) if name.endswith('.csv')]
+        if not frames:
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        df = df.drop_duplicates('timestamp').sort_values('timestamp').reset_index(drop=True)
+        return df
+
+class HistoryDownloader:
+    """历史K线并发下载器"""
+
+    def __init__(self, client, store, max_workers=4, window_bars=1440, max_retries=3, state_dir=None):
+        """
+        参数:
+            client: OKXHTTPClient实例（请求经过其限流器，并发不会超出接口限速）
+            store: K线存储，需实现write(inst_id, bar, rows)
+            max_workers: 并发下载的窗口数
+            window_bars: 每个窗口包含的K线数量
+            max_retries: 单页请求失败后的重试次数
+            state_dir: 进度文件目录，默认使用store.root
+        """
+        self.client = client
+        self.store = store
+        self.max_workers = max_workers
+        self.window_bars = window_bars
+        self.max_retries = max_retries
+        self.state_dir = state_dir or getattr(store, 'root', '.')
+        self._progress_lock = threading.Lock()
+
+    def _progress_path(self, inst_id, bar):
+        return os.path.join(self.state_dir, f'.{inst_id}_{bar}.progress.json')
+
+    def _load_progress(self, inst_id, bar):
+        path = self._progress_path(inst_id, bar)
+        if not os.path.exists(path):
+            return set()
+        with open(path, 'r', encoding='utf-8') as f:
+            return {tuple(w) for w in json.load(f)}
+
+    def _save_progress(self, inst_id, bar, done):
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._progress_path(inst_id, bar)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(done), f)
+        os.replace(tmp_path, path)
+
+    def _fetch_page(self, inst_id, bar, after):
+        for attempt in range(self.max_retries + 1):
+            result = self.client.get_history_candles(inst_id, bar, limit=HISTORY_PAGE_LIMIT, after=after)
+            if result and result.get('code') == '0':
+                return result['data']
+            if attempt < self.max_retries:
+                time.sleep(0.5 * (2 ** attempt))
+        raise RuntimeError(f'获取历史K线失败: {inst_id} {bar} after={after} {result}')
+
+    def fetch_range(self, inst_id, bar, start, end):
+        """
+        拉取[start, end)区间内的全部K线
+
+        返回:
+            list: OKX原始K线数组，按时间升序
+        """
+        rows = []
+        cursor = end
+        while cursor > start:
+            page = self._fetch_page(inst_id, bar, cursor)
+            if not page:
+                break
+            # 接口按时间倒序返回，after=cursor表示早于cursor
+            rows.extend(row for row in page if start <= int(row[0]) < end)
+            oldest = int(page[-1][0])
+            if oldest >= cursor:
+                break
+            cursor = oldest
+        rows.reverse()
+        return rows
+
+    def download(self, inst_id, bar, start, end):
+        """
+        下载[start, end)区间的历史K线并写入存储
+
+        参数:
+            start, end: 毫秒时间戳、datetime或ISO字符串
+
+        返回:
+            int: 本次新写入的K线数量
+        """
+        bar_ms = bar_to_ms(bar)
+        windows = split_windows(to_ms(start), to_ms(end), self.window_bars * bar_ms, bar_ms)
+        done = self._load_progress(inst_id, bar)
+        pending = [w for w in windows if w not in done]
+        print(f"📥 下载{inst_id} {bar}: 共{len(windows)}个窗口，待下载{len(pending)}个")
+
+        total = 0
+        # 并发下载，但按时间顺序写入：先完成的后面窗口等前面的窗口写完，
+        # MemmapCandleStore始终是追加，不必反复重写尾部；同时在途的窗口数有上限，缓存的数据不会无限增长
+        max_inflight = self.max_workers * 2
+        results = {}   # 窗口序号 -> rows（下载失败为None）
+        futures = {}
+        next_submit = 0
+        next_write = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while next_write < len(pending):
+                while next_submit < len(pending) and next_submit - next_write < max_inflight:
+                    futures[executor.submit(self.fetch_range, inst_id, bar, *pending[next_submit])] = next_submit
+                    next_submit += 1
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = futures.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        print(f"❌ 窗口{pending[index]}下载失败，下次运行时重试: {e}")
+                        results[index] = None
+                while next_write in results:
+                    rows = results.pop(next_write)
+                    window = pending[next_write]
+                    next_write += 1
+                    if rows is None:
+                        continue
+                    self.store.write(inst_id, bar, rows)
+                    total += len(rows)
+                    with self._progress_lock:
+                        done.add(window)
+                        self._save_progress(inst_id, bar, done)
+
+        print(f"✅ 下载完成: 新增{total}根K线，已完成{len(done)}/{len(windows)}个窗口")
+        return total
+
+def main():
+    from okx_http_client import OKXHTTPClient
+
+    parser = argparse.ArgumentParser(description='OKX历史K线下载')
+    parser.add_argument('inst_id')
+    parser.add_argument('bar')
+    parser.add_argument('start', help='开始时间，例如 2023-01-01')
+    parser.add_argument('end', help='结束时间（不含）')
+    parser.add_argument('--out', default='data/candles', help='存储目录')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--format', choices=('csv', 'memmap'), default='csv', help='存储格式')
+    args = parser.parse_args()
+
+    if args.format == 'memmap':
+        from .candle_store import MemmapCandleStore
+        store = MemmapCandleStore(args.out)
+    else:
+        store = CsvCandleStore(args.out)
+    with OKXHTTPClient() as client:
+        downloader = HistoryDownloader(client, store, max_workers=args.workers)
+        downloader.download(args.inst_id, args.bar, args.start, args.end)
+
+if __name__ == "__main__":
+    main()
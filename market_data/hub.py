@@ -0,0 +1,152 @@
+"""
+行情数据中心
+多个策略共享同一份K线缓存：相同(instId, bar)的并发请求合并为一次接口调用(single-flight)，
+结果以只读视图分发给所有订阅者，接口调用量只随不同品种的数量增长，与策略数量无关
+
+用法:
+    hub = MarketDataHub(client)
+    strategy_a = OptimizedSARStrategy(client, hub=hub)
+    strategy_b = OptimizedSARStrategy(client, hub=hub)
+"""
+import threading
+from .candle_cache import CandleCache
+from .candles import Candles
+
+class _Flight:
+    """一次进行中的拉取"""
+
+    __slots__ = ('limit', 'event', 'result')
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.event = threading.Event()
+        self.result = None
+
+def _tail(arrays, limit):
+    """取列数组的最后limit行（视图）"""
+    if arrays is None:
+        return None
+    return {name: column[-limit:] if limit else column[:0] for name, column in arrays.items()}
+
+class MarketDataHub:
+    """共享K线缓存 + 请求合并 + 订阅分发"""
+
+    def __init__(self, client, capacity=1000, max_age=1.0):
+        """
+        参数:
+            client: OKXHTTPClient实例
+            capacity: 每个序列缓存的K线数量
+            max_age: 距上次拉取不足max_age秒的请求直接用缓存应答
+        """
+        self.cache = CandleCache(client, capacity=capacity, max_age=max_age)
+        self.coalesced = 0  # 搭上别人请求的次数
+        self._inflight = {}
+        self._subscribers = {}  # (inst_id, bar) -> [(listener, limit), ...]
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def requests(self):
+        """实际发出的K线请求数"""
+        return self.cache.requests
+
+    def get(self, inst_id, bar, limit=100):
+        """
+        获取最近limit根K线（与CandleCache.get接口一致，可直接作为策略的candle_cache）
+
+        同一(instId, bar)已有进行中的请求且其数量足够时，等待并复用它的结果
+        """
+        limit = int(limit)
+        key = (inst_id, bar)
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight(limit)
+                leader = True
+            elif flight.limit >= limit:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = None  # 需要更长的窗口，单独请求
+
+        if flight is None:
+            return self.cache.get(inst_id, bar, limit)
+        if not leader:
+            flight.event.wait()
+            return _tail(flight.result, limit)
+        try:
+            flight.result = self.cache.get(inst_id, bar, limit)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+        return flight.result
+
+    def update(self, inst_id, bar, candle):
+        """合并推送的K线（与CandleCache.update接口一致）"""
+        self.cache.update(inst_id, bar, candle)
+
+    # ---------- 订阅 ----------
+
+    def subscribe(self, inst_id, bar, listener, limit=100):
+        """
+        订阅(instId, bar)
+
+        每次刷新后调用 listener.on_candles(inst_id, bar, candles)，candles为只读的Candles
+        """
+        with self._lock:
+            self._subscribers.setdefault((inst_id, bar), []).append((listener, int(limit)))
+
+    def unsubscribe(self, inst_id, bar, listener):
+        with self._lock:
+            subscribers = self._subscribers.get((inst_id, bar), [])
+            subscribers[:] = [(l, n) for l, n in subscribers if l is not listener]
+
+    def _fan_out(self, inst_id, bar, arrays, subscribers):
+        if arrays is None:
+            return
+        for listener, limit in subscribers:
+            try:
+                listener.on_candles(inst_id, bar, Candles.from_arrays(_tail(arrays, limit)))
+            except Exception as e:
+                print(f"行情订阅者回调异常: {e}")
+
+    def poll(self):
+        """刷新所有被订阅的序列（每个序列一次请求）并分发给订阅者"""
+        with self._lock:
+            subscriptions = {key: list(subs) for key, subs in self._subscribers.items() if subs}
+        for (inst_id, bar), subscribers in subscriptions.items():
+            limit = max(n for _, n in subscribers)
+            self._fan_out(inst_id, bar, self.get(inst_id, bar, limit), subscribers)
+
+    def on_bar(self, inst_id, bar, candle, confirmed):
+        """MarketDataFeed监听接口：推送K线并入缓存，确认K线直接分发给订阅者而不访问接口"""
+        self.update(inst_id, bar, candle)
+        if not confirmed:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get((inst_id, bar), []))
+        if subscribers:
+            limit = max(n for _, n in subscribers)
+            self._fan_out(inst_id, bar, self.cache.window(inst_id, bar, limit), subscribers)
+
+    def start(self, interval=1.0):
+        """在后台线程中每interval秒poll一次"""
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"行情刷新异常: {e}")
+
+        self._thread = threading.Thread(target=loop, name='market-data-hub', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
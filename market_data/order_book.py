@@ -0,0 +1,227 @@
+"""
+本地订单簿
+用有序NumPy数组保存买卖盘，支持OKX books频道的快照/增量更新和CRC32校验，
+提供最优买卖价、按数量计算的深度加权价、预期滑点等微秒级查询，供下单定价使用
+
+数量单位与OKX一致：合约为张，现货为交易币
+"""
+import zlib
+import numpy as np
+
+# OKX校验和使用买卖各前25档
+CHECKSUM_LEVELS = 25
+
+class OrderBook:
+    """
+    单个产品的订单簿
+
+    买卖盘各保存为(价格数组, 数量数组)元组：买盘价格降序、卖盘价格升序。
+    每次更新都生成新数组并整体替换元组，其他线程读取时拿到的总是一致的快照
+    """
+
+    def __init__(self, inst_id, max_depth=400):
+        """
+        参数:
+            inst_id: 产品ID
+            max_depth: 每侧最多保留的档位数
+        """
+        self.inst_id = inst_id
+        self.max_depth = max_depth
+        self.bids = (np.empty(0), np.empty(0))
+        self.asks = (np.empty(0), np.empty(0))
+        self.ts = None
+        self.seq_id = None
+        self.valid = False
+        # 价格 -> (价格字符串, 数量字符串)，计算校验和需要原始字符串
+        self._bid_strs = {}
+        self._ask_strs = {}
+
+    # ---------- 更新 ----------
+
+    @staticmethod
+    def _parse_levels(levels):
+        """[[px, sz, ...], ...] -> (价格数组, 数量数组, 原始字符串列表)"""
+        if not levels:
+            return np.empty(0), np.empty(0), []
+        px = np.array([level[0] for level in levels], dtype=np.float64)
+        sz = np.array([level[1] for level in levels], dtype=np.float64)
+        return px, sz, [(level[0], level[1]) for level in levels]
+
+    def _merge(self, side, levels, strs, descending):
+        """把增量档位合并进一侧：数量为0表示删除该档"""
+        px, sz = side
+        upd_px, upd_sz, raw = self._parse_levels(levels)
+        for price, text in zip(upd_px, raw):
+            if float(text[1]) == 0:
+                strs.pop(price, None)
+            else:
+                strs[price] = text
+        if len(upd_px) == 0:
+            return side
+
+        # 内部按升序的key合并：买盘用负价格
+        sign = -1.0 if descending else 1.0
+        keys = px * sign
+        order = np.argsort(upd_px * sign, kind='stable')
+        upd_keys = upd_px[order] * sign
+        upd_sz = upd_sz[order]
+
+        idx = np.searchsorted(keys, upd_keys)
+        found = idx < len(keys)
+        found[found] = keys[idx[found]] == upd_keys[found]
+
+        new_sz = sz.copy()
+        new_sz[idx[found]] = upd_sz[found]
+        new_keys = np.insert(keys, idx[~found], upd_keys[~found])
+        new_sz = np.insert(new_sz, idx[~found], upd_sz[~found])
+
+        keep = new_sz > 0
+        new_px = new_keys[keep] * sign
+        new_sz = new_sz[keep]
+        if len(new_px) > self.max_depth:
+            for price in new_px[self.max_depth:]:
+                strs.pop(price, None)
+            new_px = new_px[:self.max_depth]
+            new_sz = new_sz[:self.max_depth]
+        return new_px, new_sz
+
+    def apply_snapshot(self, data):
+        """应用全量快照（books频道的snapshot或/api/v5/market/books的data[0]）"""
+        self._bid_strs = {}
+        self._ask_strs = {}
+        empty = (np.empty(0), np.empty(0))
+        self.bids = self._merge(empty, data.get('bids', []), self._bid_strs, descending=True)
+        self.asks = self._merge(empty, data.get('asks', []), self._ask_strs, descending=False)
+        self.ts = int(data['ts']) if data.get('ts') else None
+        self.seq_id = data.get('seqId')
+        self.valid = True
+        return self._verify(data)
+
+    def apply_update(self, data):
+        """
+        应用增量更新
+
+        返回:
+            bool: 序号连续且校验和一致；False时订单簿已失效，需要重新获取快照
+        """
+        if not self.valid:
+            return False
+        prev = data.get('prevSeqId')
+        if prev is not None and self.seq_id is not None and prev != self.seq_id:
+            self.valid = False
+            return False
+        self.bids = self._merge(self.bids, data.get('bids', []), self._bid_strs, descending=True)
+        self.asks = self._merge(self.asks, data.get('asks', []), self._ask_strs, descending=False)
+        self.ts = int(data['ts']) if data.get('ts') else self.ts
+        self.seq_id = data.get('seqId', self.seq_id)
+        return self._verify(data)
+
+    def _verify(self, data):
+        expected = data.get('checksum')
+        if expected is None:
+            return True
+        if self.checksum() != int(expected):
+            self.valid = False
+            return False
+        return True
+
+    def checksum(self):
+        """按OKX规则计算前25档的CRC32（有符号32位整数）"""
+        bid_px = self.bids[0][:CHECKSUM_LEVELS]
+        ask_px = self.asks[0][:CHECKSUM_LEVELS]
+        parts = []
+        for i in range(max(len(bid_px), len(ask_px))):
+            if i < len(bid_px):
+                parts.extend(self._bid_strs[bid_px[i]])
+            if i < len(ask_px):
+                parts.extend(self._ask_strs[ask_px[i]])
+        value = zlib.crc32(':'.join(parts).encode('utf-8'))
+        return value - (1 << 32) if value >= (1 << 31) else value
+
+    # ---------- 查询 ----------
+
+    def best_bid(self):
+        """最优买价(价格, 数量)，无买盘时返回None"""
+        px, sz = self.bids
+        return (float(px[0]), float(sz[0])) if len(px) else None
+
+    def best_ask(self):
+        """最优卖价(价格, 数量)，无卖盘时返回None"""
+        px, sz = self.asks
+        return (float(px[0]), float(sz[0])) if len(px) else None
+
+    def mid(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def spread(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def _taker_side(self, side):
+        """买单吃卖盘，卖单吃买盘"""
+        if side == 'buy':
+            return self.asks
+        if side == 'sell':
+            return self.bids
+        raise ValueError(f'side必须是buy或sell: {side}')
+
+    def _fill_levels(self, side, size):
+        """吃掉size需要的档位数及最后一档的成交量；深度不足时返回None"""
+        px, sz = self._taker_side(side)
+        cum = np.cumsum(sz)
+        n = int(np.searchsorted(cum, size, side='left'))
+        if n >= len(px):
+            return None
+        return px, sz, cum, n
+
+    def depth_price(self, side, size):
+        """
+        以市价成交size的深度加权均价
+
+        返回:
+            float: 均价；深度不足时返回None
+        """
+        size = float(size)
+        if size <= 0:
+            return None
+        filled = self._fill_levels(side, size)
+        if filled is None:
+            return None
+        px, sz, cum, n = filled
+        before = cum[n - 1] if n else 0.0
+        notional = float(np.dot(px[:n], sz[:n])) + px[n] * (size - before)
+        return notional / size
+
+    def limit_price(self, side, size):
+        """能一次成交size的最差档位价格（可作为吃单限价），深度不足时返回None"""
+        filled = self._fill_levels(side, float(size))
+        return None if filled is None else float(filled[0][filled[3]])
+
+    def slippage(self, side, size):
+        """
+        成交size相对最优价的预期滑点（比例，正数表示成本）
+
+        返回:
+            float: 例如0.0005表示0.05%；深度不足时返回None
+        """
+        avg = self.depth_price(side, size)
+        if avg is None:
+            return None
+        best = self._taker_side(side)[0][0]
+        return (avg - best) / best if side == 'buy' else (best - avg) / best
+
+    def depth(self, side, levels=None):
+        """
+        某一侧的档位数组(价格, 数量)
+
+        参数:
+            side: 'bids'或'asks'
+            levels: 只返回前levels档
+        """
+        px, sz = self.bids if side == 'bids' else self.asks
+        return (px, sz) if levels is None else (px[:levels], sz[:levels])
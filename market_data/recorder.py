@@ -0,0 +1,391 @@
+"""
+行情录制与回放
+把WebSocket收到的原始消息（ticker/trades/K线/深度）按到达时间写入只追加的分块压缩日志，
+之后可按原速、N倍速或最快速度回放给MarketDataFeed的监听者（策略、Resampler、MarketDataHub），
+作为OptimizedSARStrategy性能测试和回归测试的基准数据
+
+文件格式:
+    文件头: b'OKXREC1\\n'
+    数据块: 块头(magic, 压缩长度, 原始长度, 消息数, crc32, 首条时间戳, 末条时间戳) + zlib压缩的消息记录
+    消息记录: (到达时间戳ms, 长度) + UTF-8原始消息
+    索引文件(<path>.idx): 每块一条(首条时间戳, 末条时间戳, 块偏移, 消息数)，按时间回放时二分定位数据块
+进程崩溃只会丢失未刷盘的最后一块；重新打开时截掉不完整的块并重建索引
+
+用法:
+    recorder = Recorder('data/recordings/btc.rec')
+    feed = MarketDataFeed(recorder=recorder)          # 实盘运行的同时录制
+    strategy.run_streaming(ReplayFeed('data/recordings/btc.rec', speed=None))  # 最快速度回放
+"""
+import argparse
+import bisect
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from .ws_feed import MarketDataFeed
+
+FILE_MAGIC = b'OKXREC1\n'
+BLOCK_MAGIC = b'BLK1'
+BLOCK_HEADER = struct.Struct('<4sIIIIqq')
+RECORD_HEADER = struct.Struct('<qI')
+INDEX_ENTRY = struct.Struct('<qqqI')
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+def _scan_blocks(f, offset):
+    """从offset开始扫描块头，返回(完整块的索引项列表, 最后一个完整块的结束位置)"""
+    entries = []
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    while offset + BLOCK_HEADER.size <= size:
+        f.seek(offset)
+        magic, clen, _, count, _, first_ts, last_ts = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+        end = offset + BLOCK_HEADER.size + clen
+        if magic != BLOCK_MAGIC or end > size:
+            break
+        entries.append((first_ts, last_ts, offset, count))
+        offset = end
+    return entries, offset
+
+def _load_index(path):
+    """读取索引文件，再从最后一个已索引的块之后扫描补齐（索引落后于数据文件时）"""
+    entries = []
+    if os.path.exists(path + '.idx'):
+        with open(path + '.idx', 'rb') as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        entries = [INDEX_ENTRY.unpack_from(data, pos) for pos in range(0, usable, INDEX_ENTRY.size)]
+
+    with open(path, 'rb') as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f'不是行情录制文件: {path}')
+        offset = len(FILE_MAGIC)
+        if entries:
+            f.seek(entries[-1][2])
+            clen = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))[1]
+            offset = entries[-1][2] + BLOCK_HEADER.size + clen
+        tail, end = _scan_blocks(f, offset)
+    return entries + tail, end, bool(tail)
+
+class Recorder:
+    """
+    只追加的分块压缩行情录制器（线程安全）
+
+    消息先缓存在内存中，达到block_bytes或距上次刷盘超过flush_interval秒时压缩成一个块写入
+    """
+
+    def __init__(self, path, block_bytes=256 * 1024, flush_interval=5.0, level=6):
+        """
+        参数:
+            path: 录制文件路径，已存在时在末尾追加
+            block_bytes: 每块压缩前的大小
+            flush_interval: 最长刷盘间隔（秒）
+            level: zlib压缩级别
+        """
+        self.path = path
+        self.block_bytes = block_bytes
+        self.flush_interval = flush_interval
+        self.level = level
+        self.messages = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._first_ts = None
+        self._last_ts = None
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, 'wb') as f:
+                f.write(FILE_MAGIC)
+            with open(self.path + '.idx', 'wb'):
+                pass
+        else:
+            entries, end, rebuilt = _load_index(self.path)
+            if end < os.path.getsize(self.path):
+                print(f"⚠️ 录制文件末尾有不完整的数据块，截断到 {end} 字节")
+                os.truncate(self.path, end)
+            if rebuilt or not os.path.exists(self.path + '.idx'):
+                with open(self.path + '.idx', 'wb') as f:
+                    f.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in entries))
+        self._file = open(self.path, 'ab')
+        self._index = open(self.path + '.idx', 'ab')
+
+    def record(self, raw, ts=None):
+        """
+        记录一条消息
+
+        参数:
+            raw: 原始消息（str/bytes，dict会序列化为JSON）
+            ts: 到达时间戳(ms)，默认为当前时间
+        """
+        if isinstance(raw, dict):
+            raw = json.dumps(raw, separators=(',', ':'))
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        ts = _now_ms() if ts is None else int(ts)
+        with self._lock:
+            self._buffer.append(RECORD_HEADER.pack(ts, len(raw)))
+            self._buffer.append(raw)
+            self._buffer_bytes += RECORD_HEADER.size + len(raw)
+            if self._first_ts is None:
+                self._first_ts = ts
+            self._last_ts = ts
+            self.messages += 1
+            if (self._buffer_bytes >= self.block_bytes
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._write_block()
+
+    def _write_block(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        raw = b''.join(self._buffer)
+        payload = zlib.compress(raw, self.level)
+        count = len(self._buffer) // 2
+        offset = self._file.tell()
+        self._file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), len(raw), count,
+                                           zlib.crc32(payload), self._first_ts, self._last_ts))
+        self._file.write(payload)
+        self._file.flush()
+        # 数据块完整写入后才写索引，索引永远不会指向不完整的块
+        self._index.write(INDEX_ENTRY.pack(self._first_ts, self._last_ts, offset, count))
+        self._index.flush()
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._first_ts = None
+        self._last_ts = None
+
+    def flush(self):
+        """把缓存的消息写成一个数据块"""
+        with self._lock:
+            self._write_block()
+
+    def close(self):
+        with self._lock:
+            self._write_block()
+            self._file.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # MarketDataFeed之外的消息来源（例如测试中手工构造的推送）也可以把录制器当作回调使用
+    handle_message = record
+
+class Replayer:
+    """
+    读取录制文件
+
+    用法:
+        for ts, raw in Replayer(path).messages(start, end): ...
+        Replayer(path).replay(feed, speed=10)   # 10倍速推给feed.handle_message
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.blocks, _, _ = _load_index(path)
+        self._block_last_ts = [entry[1] for entry in self.blocks]
+
+    def __len__(self):
+        return sum(entry[3] for entry in self.blocks)
+
+    @property
+    def start_ts(self):
+        return self.blocks[0][0] if self.blocks else None
+
+    @property
+    def end_ts(self):
+        return self.blocks[-1][1] if self.blocks else None
+
+    def _read_block(self, f, offset):
+        f.seek(offset)
+        magic, clen, rlen, count, crc, _, _ = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+        payload = f.read(clen)
+        if magic != BLOCK_MAGIC or zlib.crc32(payload) != crc:
+            raise ValueError(f'录制文件数据块损坏: offset={offset}')
+        raw = zlib.decompress(payload)
+        if len(raw) != rlen:
+            raise ValueError(f'录制文件数据块长度不一致: offset={offset}')
+        pos = 0
+        for _ in range(count):
+            ts, length = RECORD_HEADER.unpack_from(raw, pos)
+            pos += RECORD_HEADER.size
+            yield ts, raw[pos:pos + length]
+            pos += length
+
+    def messages(self, start=None, end=None):
+        """
+        按时间顺序迭代[start, end)内的消息
+
+        返回:
+            迭代器，元素为(到达时间戳ms, 原始消息bytes)
+        """
+        # 第一个末条时间戳>=start的块之前的块都可以跳过
+        first = 0 if start is None else bisect.bisect_left(self._block_last_ts, start)
+        with open(self.path, 'rb') as f:
+            for first_ts, _, offset, _ in self.blocks[first:]:
+                if end is not None and first_ts >= end:
+                    return
+                for ts, raw in self._read_block(f, offset):
+                    if start is not None and ts < start:
+                        continue
+                    if end is not None and ts >= end:
+                        return
+                    yield ts, raw
+
+    def replay(self, target, speed=1.0, start=None, end=None, stop_event=None):
+        """
+        按录制时的时间间隔回放
+
+        参数:
+            target: 有handle_message方法的对象（MarketDataFeed），或接收原始消息的函数
+            speed: 回放倍速，None或0表示不等待、以最快速度回放
+            start/end: 回放的时间范围(ms)
+            stop_event: threading.Event，置位后提前结束
+
+        返回:
+            int: 回放的消息数
+        """
+        handle = getattr(target, 'handle_message', target)
+        count = 0
+        origin = None
+        clock_start = time.monotonic()
+        for ts, raw in self.messages(start, end):
+            if stop_event is not None and stop_event.is_set():
+                break
+            if speed:
+                if origin is None:
+                    origin = ts
+                delay = (ts - origin) / 1000 / speed - (time.monotonic() - clock_start)
+                if delay > 0:
+                    if stop_event is not None:
+                        if stop_event.wait(delay):
+                            break
+                    else:
+                        time.sleep(delay)
+            handle(raw)
+            count += 1
+        return count
+
+class ReplayFeed(MarketDataFeed):
+    """
+    用录制文件代替WebSocket连接的MarketDataFeed
+
+    接口与MarketDataFeed一致，可直接传给OptimizedSARStrategy.run_streaming（此时策略改用
+    OfflineCandleCache和纸面下单客户端，不访问接口）；
+    订阅调用被忽略（回放录制到的全部消息），回放结束后调用监听者的on_end()
+    """
+
+    def __init__(self, path, speed=1.0, start=None, end=None):
+        """
+        参数:
+            path: 录制文件路径
+            speed: 回放倍速，None表示最快速度
+            start/end: 回放的时间范围(ms)
+        """
+        super().__init__()
+        self.replayer = Replayer(path)
+        self.speed = speed
+        self.start_ts = start
+        self.end_ts = end
+        self.replayed = 0
+        self._stop_event = threading.Event()
+
+    def run_replay(self):
+        """在当前线程中回放，结束后通知监听者"""
+        # 与实时连接相同，无法处理的消息只跳过
+        self.replayed = self.replayer.replay(self._handle_raw, speed=self.speed, start=self.start_ts,
+                                             end=self.end_ts, stop_event=self._stop_event)
+        self._dispatch('on_end')
+        return self.replayed
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_replay, name='replay-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+def _record(args):
+    with Recorder(args.path) as recorder:
+        feed = MarketDataFeed(recorder=recorder)
+        for inst_id in args.inst_ids:
+            for bar in args.bars:
+                feed.subscribe_candles(inst_id, bar)
+            feed.subscribe_tickers(inst_id)
+            feed.subscribe_trades(inst_id)
+            if args.books:
+                feed.subscribe_books(inst_id)
+        print(f"🔧 开始录制 {', '.join(args.inst_ids)} -> {args.path}，按 Ctrl+C 停止")
+        feed.start()
+        try:
+            while True:
+                time.sleep(10)
+                print(f"📊 已录制 {recorder.messages} 条消息")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            feed.stop()
+        print(f"✅ 录制完成: {recorder.messages} 条消息")
+
+def _info(args):
+    replayer = Replayer(args.path)
+    size = os.path.getsize(args.path)
+    print(f"📊 {args.path}")
+    print(f"   数据块: {len(replayer.blocks)}  消息: {len(replayer)}  文件大小: {size / 1024:.1f}KB")
+    if replayer.blocks:
+        print(f"   时间范围: {replayer.start_ts} - {replayer.end_ts} ({(replayer.end_ts - replayer.start_ts) / 1000:.1f}秒)")
+
+def _replay(args):
+    class Counter:
+        def __init__(self):
+            self.counts = {}
+
+        def __getattr__(self, name):
+            if not name.startswith('on_'):
+                raise AttributeError(name)
+            return lambda *a: self.counts.__setitem__(name, self.counts.get(name, 0) + 1)
+
+    feed = MarketDataFeed()
+    counter = Counter()
+    feed.add_listener(counter)
+    start = time.monotonic()
+    count = Replayer(args.path).replay(feed, speed=args.speed or None)
+    elapsed = time.monotonic() - start
+    print(f"✅ 回放 {count} 条消息，耗时 {elapsed:.2f}秒 ({count / max(elapsed, 1e-9):.0f} 条/秒)")
+    for name, n in sorted(counter.counts.items()):
+        print(f"   {name}: {n}")
+
+def main():
+    parser = argparse.ArgumentParser(description='OKX行情录制与回放')
+    sub = parser.add_subparsers(dest='command', required=True)
+    record = sub.add_parser('record', help='录制WebSocket行情')
+    record.add_argument('path')
+    record.add_argument('inst_ids', nargs='+')
+    record.add_argument('--bars', nargs='+', default=['1m'])
+    record.add_argument('--books', action='store_true', help='同时录制400档深度')
+    info = sub.add_parser('info', help='查看录制文件')
+    info.add_argument('path')
+    replay = sub.add_parser('replay', help='回放并统计各类事件')
+    replay.add_argument('path')
+    replay.add_argument('--speed', type=float, default=0, help='回放倍速，0表示最快速度')
+    args = parser.parse_args()
+    {'record': _record, 'info': _info, 'replay': _replay}[args.command](args)
+
+if __name__ == "__main__":
+    main()
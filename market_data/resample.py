@@ -0,0 +1,188 @@
+"""
+多周期K线合成
+从1m基础K线按OKX的K线边界（6H及以上按香港时间、周线从周一开始）向量化合成任意更高周期，
+并支持新的1m K线到达时增量更新；订阅一路1m K线即可驱动策略用到的所有周期
+"""
+import numpy as np
+from .bars import bar_to_ms, bar_start
+
+# 成交量类字段按求和合成
+VOLUME_FIELDS = ('vol', 'vol_ccy', 'vol_ccy_quote')
+
+def resample(arrays, bar, base_bar='1m'):
+    """
+    把时间升序的基础K线列数组合成为bar周期
+
+    参数:
+        arrays: decode_candle_rows/MemmapCandleStore格式的列数组dict，至少含ts/open/high/low/close
+        bar: 目标周期，例如 '15m'、'4H'、'1D'
+        base_bar: 输入K线的周期
+
+    返回:
+        dict: 同样字段的列数组；confirm表示合成K线已完整（最后一根基础K线已确认且是该周期的最后一根）
+    """
+    ts = np.asarray(arrays['ts'], dtype=np.int64)
+    if len(ts) == 0:
+        return {name: np.asarray(column)[:0] for name, column in arrays.items()}
+
+    starts = bar_start(ts, bar)
+    first = np.flatnonzero(np.diff(starts)) + 1
+    first = np.concatenate(([0], first))
+    last = np.concatenate((first[1:], [len(ts)])) - 1
+
+    result = {
+        'ts': starts[first],
+        'open': np.asarray(arrays['open'])[first],
+        'high': np.maximum.reduceat(np.asarray(arrays['high']), first),
+        'low': np.minimum.reduceat(np.asarray(arrays['low']), first),
+        'close': np.asarray(arrays['close'])[last],
+    }
+    for name in VOLUME_FIELDS:
+        if name in arrays:
+            result[name] = np.add.reduceat(np.asarray(arrays[name], dtype=np.float64), first)
+
+    # 只有最后一根合成K线可能不完整
+    confirm = np.ones(len(first), dtype=bool)
+    if 'confirm' in arrays:
+        confirm &= np.logical_and.reduceat(np.asarray(arrays['confirm'], dtype=bool), first)
+    complete = ts[-1] + bar_to_ms(base_bar) >= result['ts'][-1] + bar_to_ms(bar)
+    confirm[-1] &= complete
+    result['confirm'] = confirm
+    return result
+
+class Resampler:
+    """
+    增量合成器，同时也是MarketDataFeed的监听者
+
+    收到基础周期K线（含未确认的更新）后为每个目标周期合成当前K线，并转发给下游监听者的on_bar；
+    基础K线本身以及ticker、成交、缺口、回放结束事件也原样转发，下游只需订阅一路1m K线。
+    深度(on_book)不经过合成器，需要深度的监听者直接注册到feed
+    """
+
+    def __init__(self, bars=('5m', '15m', '1H', '4H', '1D'), base_bar='1m', listeners=None):
+        """
+        参数:
+            bars: 需要合成的目标周期
+            base_bar: 订阅的基础周期
+            listeners: 下游监听者列表（实现on_bar即可），也可以之后add_listener
+        """
+        self.bars = tuple(bars)
+        self.base_bar = base_bar
+        self.base_ms = bar_to_ms(base_bar)
+        self.listeners = list(listeners or [])
+        # (inst_id, bar) -> {'start', 'committed': 已确认基础K线的合成结果, 'pending': 最新的未确认基础K线}
+        self._state = {}
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _emit(self, method, *args):
+        for listener in self.listeners:
+            callback = getattr(listener, method, None)
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"K线合成监听者回调异常({method}): {e}")
+
+    @staticmethod
+    def _fold(agg, candle, start):
+        """把一根基础K线并入合成K线，返回新的dict"""
+        if agg is None:
+            merged = {'ts': start, 'open': candle['open'], 'high': candle['high'],
+                      'low': candle['low'], 'close': candle['close']}
+            for name in VOLUME_FIELDS:
+                if name in candle:
+                    merged[name] = candle[name]
+            return merged
+        merged = dict(agg)
+        merged['high'] = max(agg['high'], candle['high'])
+        merged['low'] = min(agg['low'], candle['low'])
+        merged['close'] = candle['close']
+        for name in VOLUME_FIELDS:
+            if name in candle:
+                merged[name] = agg.get(name, 0.0) + candle[name]
+        return merged
+
+    def prime(self, inst_id, arrays):
+        """用历史基础K线（时间升序列数组）初始化各周期当前K线的状态"""
+        ts = np.asarray(arrays['ts'], dtype=np.int64)
+        if len(ts) == 0:
+            return
+        confirm = arrays.get('confirm')
+        for bar in self.bars:
+            start = int(bar_start(ts[-1], bar))
+            state = {'start': start, 'committed': None, 'pending': None, 'done': False}
+            for i in range(int(np.searchsorted(ts, start)), len(ts)):
+                candle = {name: float(arrays[name][i]) for name in ('open', 'high', 'low', 'close') + VOLUME_FIELDS
+                          if name in arrays}
+                if confirm is None or confirm[i]:
+                    state['committed'] = self._fold(state['committed'], candle, start)
+                else:
+                    state['pending'] = candle
+            state['done'] = (state['pending'] is None and state['committed'] is not None
+                             and int(ts[-1]) + self.base_ms >= start + bar_to_ms(bar))
+            self._state[(inst_id, bar)] = state
+
+    def update(self, inst_id, candle, confirmed):
+        """
+        处理一根基础K线
+
+        返回:
+            list: [(bar, candle, confirmed), ...] 本次更新的合成K线
+        """
+        ts = int(candle['ts'])
+        events = []
+        for bar in self.bars:
+            key = (inst_id, bar)
+            start = int(bar_start(ts, bar))
+            state = self._state.get(key)
+            if state is not None and start < state['start']:
+                continue  # 迟到的旧K线
+            if state is None or start > state['start']:
+                if state is not None and not state['done']:
+                    # 上一根合成K线没有等到最后一根基础K线（缺口），以已有数据收盘
+                    final = self._fold(state['committed'], state['pending'], state['start']) \
+                        if state['pending'] is not None else state['committed']
+                    if final is not None:
+                        events.append((bar, final, True))
+                state = {'start': start, 'committed': None, 'pending': None, 'done': False}
+                self._state[key] = state
+            if state['done']:
+                continue
+
+            if confirmed:
+                state['committed'] = self._fold(state['committed'], candle, start)
+                state['pending'] = None
+                current = state['committed']
+            else:
+                state['pending'] = candle
+                current = self._fold(state['committed'], candle, start)
+
+            done = confirmed and ts + self.base_ms >= start + bar_to_ms(bar)
+            state['done'] = done
+            events.append((bar, current, done))
+        return events
+
+    def on_bar(self, inst_id, bar, candle, confirmed):
+        """MarketDataFeed监听接口"""
+        self._emit('on_bar', inst_id, bar, candle, confirmed)
+        if bar != self.base_bar:
+            return
+        for target_bar, merged, done in self.update(inst_id, candle, confirmed):
+            out = dict(merged)
+            out['confirm'] = done
+            self._emit('on_bar', inst_id, target_bar, out, done)
+
+    def on_ticker(self, inst_id, ticker):
+        self._emit('on_ticker', inst_id, ticker)
+
+    def on_trade(self, inst_id, trade):
+        self._emit('on_trade', inst_id, trade)
+
+    def on_gap(self, inst_id, channel, detail):
+        self._emit('on_gap', inst_id, channel, detail)
+
+    def on_end(self):
+        self._emit('on_end')
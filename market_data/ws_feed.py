@@ -0,0 +1,328 @@
+"""
+OKX WebSocket行情推送
+订阅K线、tickers、trades、books公共频道，把确认K线、最新价格和本地订单簿实时推给策略
+断线自动重连并重新订阅，检测K线/成交的序列缺口，订单簿校验失败时重新获取快照
+"""
+import asyncio
+import json
+import queue
+import threading
+from .bars import bar_to_ms
+from .order_book import OrderBook
+
+try:
+    import websockets
+except ImportError:  # 可选依赖
+    websockets = None
+
+PUBLIC_WS_URL = 'wss://ws.okx.com:8443/ws/v5/public'
+BUSINESS_WS_URL = 'wss://ws.okx.com:8443/ws/v5/business'
+
+def parse_candle(row):
+    """把推送/REST中的K线数组转成dict"""
+    return {
+        'ts': int(row[0]),
+        'open': float(row[1]),
+        'high': float(row[2]),
+        'low': float(row[3]),
+        'close': float(row[4]),
+        'vol': float(row[5]),
+        'confirm': row[8] == '1' if len(row) > 8 else True
+    }
+
+class QueueListener:
+    """
+    把回调转成队列事件，方便在策略主线程中消费
+
+    事件格式:
+        ('bar', inst_id, bar, candle, confirmed)
+        ('ticker', inst_id, ticker)
+        ('trade', inst_id, trade)
+        ('gap', inst_id, channel, detail)
+        ('book', inst_id, book)
+        ('end',)                          # 回放结束
+    """
+
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize)
+
+    def on_bar(self, inst_id, bar, candle, confirmed):
+        self.queue.put(('bar', inst_id, bar, candle, confirmed))
+
+    def on_ticker(self, inst_id, ticker):
+        self.queue.put(('ticker', inst_id, ticker))
+
+    def on_trade(self, inst_id, trade):
+        self.queue.put(('trade', inst_id, trade))
+
+    def on_gap(self, inst_id, channel, detail):
+        self.queue.put(('gap', inst_id, channel, detail))
+
+    def on_book(self, inst_id, book):
+        self.queue.put(('book', inst_id, book))
+
+    def on_end(self):
+        self.queue.put(('end',))
+
+class MarketDataFeed:
+    """
+    OKX公共行情WebSocket客户端
+
+    监听者可实现以下任意方法:
+        on_bar(inst_id, bar, candle, confirmed)
+        on_ticker(inst_id, ticker)
+        on_trade(inst_id, trade)
+        on_gap(inst_id, channel, detail)  # detail含缺失区间，调用方可用REST补齐
+        on_book(inst_id, book)            # book为本地维护的OrderBook，已通过序号和校验和检查
+        on_end()                          # 仅回放(ReplayFeed)结束时调用
+    """
+
+    def __init__(self, public_url=PUBLIC_WS_URL, business_url=BUSINESS_WS_URL,
+                 ping_interval=25, reconnect_delay=1.0, max_reconnect_delay=30.0, recorder=None):
+        """
+        参数:
+            public_url: tickers/trades所在的公共频道地址
+            business_url: K线所在的业务频道地址
+            ping_interval: 空闲多少秒后发送ping（OKX 30秒无数据会断开）
+            reconnect_delay: 首次重连等待秒数，之后指数退避
+            max_reconnect_delay: 重连等待上限
+            recorder: market_data.recorder.Recorder实例，收到的原始消息先写入录制文件再分发
+        """
+        self.public_url = public_url
+        self.business_url = business_url
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.recorder = recorder
+
+        self.listeners = []
+        self.reconnects = 0
+        self.bad_messages = 0     # 无法处理而被跳过的消息数
+        self._subscriptions = {}  # url -> [arg, ...]
+        self._connections = {}    # url -> websocket
+        self._last_bar_ts = {}    # (inst_id, bar) -> 最后一根确认K线的时间戳
+        self._last_trade_id = {}  # inst_id -> 下一笔预期的tradeId
+        self.books = {}           # inst_id -> OrderBook
+        self._loop = None
+        self._thread = None
+        self._stopping = False
+
+    # ---------- 订阅 ----------
+
+    def add_listener(self, listener):
+        """添加监听者"""
+        self.listeners.append(listener)
+
+    def subscribe_candles(self, inst_id, bar='15m'):
+        """订阅K线频道"""
+        self._subscribe(self.business_url, {'channel': f'candle{bar}', 'instId': inst_id})
+
+    def subscribe_tickers(self, inst_id):
+        """订阅行情频道"""
+        self._subscribe(self.public_url, {'channel': 'tickers', 'instId': inst_id})
+
+    def subscribe_trades(self, inst_id):
+        """订阅成交频道"""
+        self._subscribe(self.public_url, {'channel': 'trades', 'instId': inst_id})
+
+    def subscribe_books(self, inst_id, channel='books'):
+        """订阅深度频道（books为400档增量推送），在本地维护OrderBook"""
+        self._subscribe(self.public_url, {'channel': channel, 'instId': inst_id})
+
+    def _subscribe(self, url, arg):
+        args = self._subscriptions.setdefault(url, [])
+        if arg in args:
+            return
+        args.append(arg)
+        # 已连接时立即补发订阅，否则在连接建立时统一发送
+        if self._loop is not None and url in self._connections:
+            asyncio.run_coroutine_threadsafe(self._send_subscribe(self._connections[url], [arg]), self._loop)
+
+    async def _send_subscribe(self, ws, args):
+        await ws.send(json.dumps({'op': 'subscribe', 'args': args}))
+
+    async def _resubscribe(self, ws, args):
+        """取消后重新订阅，让服务端重新推送全量快照"""
+        await ws.send(json.dumps({'op': 'unsubscribe', 'args': args}))
+        await ws.send(json.dumps({'op': 'subscribe', 'args': args}))
+
+    # ---------- 生命周期 ----------
+
+    def start(self):
+        """在后台线程中运行"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if websockets is None:
+            raise ImportError('MarketDataFeed需要websockets: pip install websockets')
+        self._stopping = False
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.run()), name='ws-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止并等待后台线程退出"""
+        self._stopping = True
+        if self._loop is not None:
+            for ws in list(self._connections.values()):
+                asyncio.run_coroutine_threadsafe(ws.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.recorder is not None:
+            self.recorder.flush()
+
+    async def run(self):
+        """运行所有连接直到stop()"""
+        if websockets is None:
+            raise ImportError('MarketDataFeed需要websockets: pip install websockets')
+        self._loop = asyncio.get_running_loop()
+        try:
+            urls = list(self._subscriptions)
+            await asyncio.gather(*(self._connection_loop(url) for url in urls))
+        finally:
+            self._loop = None
+
+    async def _connection_loop(self, url):
+        delay = self.reconnect_delay
+        while not self._stopping:
+            try:
+                async with websockets.connect(url, ping_interval=None) as ws:
+                    self._connections[url] = ws
+                    delay = self.reconnect_delay
+                    await self._send_subscribe(ws, list(self._subscriptions[url]))
+                    await self._receive_loop(ws)
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                if not self._stopping:
+                    print(f"WebSocket连接异常: {e}")
+            finally:
+                self._connections.pop(url, None)
+
+            if self._stopping:
+                break
+            self.reconnects += 1
+            print(f"WebSocket将在{delay:.1f}秒后重连: {url}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _receive_loop(self, ws):
+        waiting_pong = False
+        while not self._stopping:
+            try:
+                raw = await asyncio.wait_for(ws.recv(), timeout=self.ping_interval)
+            except asyncio.TimeoutError:
+                if waiting_pong:
+                    raise asyncio.TimeoutError('ping超时未收到pong')
+                await ws.send('ping')
+                waiting_pong = True
+                continue
+            waiting_pong = False
+            if raw == 'pong':
+                continue
+            self._handle_raw(raw)
+
+    def _handle_raw(self, raw):
+        """录制并处理一条消息；格式错误等异常只记录并跳过该消息，不中断连接"""
+        if self.recorder is not None:
+            try:
+                self.recorder.record(raw)
+            except Exception as e:
+                print(f"⚠️ 行情录制失败: {e}")
+        try:
+            self.handle_message(raw)
+        except Exception as e:
+            self.bad_messages += 1
+            preview = raw[:200] if isinstance(raw, (str, bytes)) else raw
+            print(f"⚠️ 跳过无法处理的行情消息({type(e).__name__}: {e}): {preview!r}")
+
+    # ---------- 消息分发 ----------
+
+    def handle_message(self, raw):
+        """解析一条推送消息并分发给监听者（也可用于回放录制的消息）"""
+        message = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+        if 'event' in message:
+            if message['event'] == 'error':
+                print(f"❌ WebSocket订阅失败: {message}")
+            return
+
+        arg = message.get('arg', {})
+        channel = arg.get('channel', '')
+        inst_id = arg.get('instId')
+        data = message.get('data', [])
+
+        if channel.startswith('candle'):
+            bar = channel[len('candle'):]
+            for row in data:
+                self._handle_candle(inst_id, bar, parse_candle(row))
+        elif channel == 'tickers':
+            for ticker in data:
+                self._dispatch('on_ticker', inst_id, ticker)
+        elif channel == 'trades':
+            for trade in data:
+                self._handle_trade(inst_id, trade)
+        elif channel.startswith('books'):
+            action = message.get('action', 'snapshot')
+            for book in data:
+                self._handle_book(arg, action, book)
+
+    def _handle_candle(self, inst_id, bar, candle):
+        key = (inst_id, bar)
+        last_ts = self._last_bar_ts.get(key)
+        if last_ts is not None and candle['ts'] <= last_ts:
+            return  # 重连后重复推送的已确认K线
+
+        if candle['confirm']:
+            bar_ms = bar_to_ms(bar)
+            if last_ts is not None and candle['ts'] > last_ts + bar_ms:
+                self._dispatch('on_gap', inst_id, f'candle{bar}',
+                               {'start': last_ts + bar_ms, 'end': candle['ts'] - bar_ms, 'bar': bar})
+            self._last_bar_ts[key] = candle['ts']
+        self._dispatch('on_bar', inst_id, bar, candle, candle['confirm'])
+
+    def _handle_trade(self, inst_id, trade):
+        try:
+            trade_id = int(trade['tradeId'])
+            count = int(trade.get('count') or 1)
+        except (KeyError, ValueError):
+            self._dispatch('on_trade', inst_id, trade)
+            return
+
+        expected = self._last_trade_id.get(inst_id)
+        if expected is not None:
+            if trade_id < expected:
+                return  # 重复成交
+            if trade_id > expected:
+                self._dispatch('on_gap', inst_id, 'trades', {'start': expected, 'end': trade_id - 1})
+        self._last_trade_id[inst_id] = trade_id + count
+        self._dispatch('on_trade', inst_id, trade)
+
+    def _handle_book(self, arg, action, data):
+        inst_id = arg.get('instId')
+        book = self.books.get(inst_id)
+        if action == 'snapshot' or book is None:
+            if book is None:
+                book = self.books[inst_id] = OrderBook(inst_id)
+            ok = book.apply_snapshot(data) if action == 'snapshot' else False
+        else:
+            ok = book.apply_update(data)
+        if ok:
+            self._dispatch('on_book', inst_id, book)
+            return
+
+        # 序号不连续或校验和不一致：丢弃本地订单簿，重新订阅获取快照
+        book.valid = False
+        self._dispatch('on_gap', inst_id, arg.get('channel'),
+                       {'seqId': data.get('seqId'), 'prevSeqId': data.get('prevSeqId'),
+                        'checksum': data.get('checksum')})
+        ws = self._connections.get(self.public_url)
+        if ws is not None and self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._resubscribe(ws, [arg]), self._loop)
+
+    def _dispatch(self, method, *args):
+        # 每个监听者单独捕获异常，一个订阅者出错不影响其他订阅者和连接
+        for listener in self.listeners:
+            callback = getattr(listener, method, None)
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"行情回调异常 {method}: {e}")
@@ -0,0 +1,350 @@
+"""
+OKX异步HTTP客户端
+与OKXHTTPClient接口一致，所有方法均为协程，共享同一个aiohttp连接池
+适合并发拉取大量交易对的行情数据
+"""
+import asyncio
+import json
+import time
+from okx_http_client import OKXHTTPClient, chunk_orders, merge_batch_results
+from okx_instruments import InstrumentCache
+from okx_rate_limiter import RATE_LIMIT_CODES, endpoint_path
+from config import DEFAULT_INST_ID
+
+try:
+    import aiohttp
+except ImportError:  # 可选依赖
+    aiohttp = None
+
+# 幂等GET请求遇到这些状态码时重试
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+class AsyncOKXClient(OKXHTTPClient):
+    """OKX异步HTTP客户端"""
+
+    def __init__(self, pool_size=100, max_retries=3, backoff_factor=0.3, timeout=30, rate_limiter=None, metrics=None,
+                 base_url=None):
+        """
+        参数:
+            pool_size: 连接池总连接数（同时也是单主机上限）
+            max_retries: 幂等GET请求的最大重试次数
+            backoff_factor: 重试退避系数 (第n次重试等待 backoff_factor * 2^(n-1) 秒)
+            timeout: 请求超时时间(秒)
+            rate_limiter: 客户端限流器，可与同步客户端共享同一个实例
+            metrics: 请求延迟统计，可与同步客户端共享同一个实例
+            base_url: API地址，None时使用环境变量OKX_BASE_URL或OKX官方地址
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncOKXClient需要aiohttp: pip install aiohttp')
+        super().__init__(pool_size=pool_size, max_retries=max_retries,
+                         backoff_factor=backoff_factor, timeout=timeout,
+                         rate_limiter=rate_limiter, metrics=metrics, base_url=base_url)
+
+    def _create_session(self, pool_size, max_retries, backoff_factor):
+        """aiohttp会话必须在事件循环内创建，这里只记录参数"""
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._closed = False
+        return None
+
+    def _get_session(self):
+        """获取（必要时创建）共享的aiohttp会话"""
+        if self._closed:
+            raise RuntimeError('OKX客户端已关闭')
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=30,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[self._create_trace_config()]
+            )
+        return self.session
+
+    @staticmethod
+    def _create_trace_config():
+        """用aiohttp的trace钩子记录DNS、建连(含TLS)和服务端耗时"""
+        def mark(name):
+            async def callback(session, ctx, params):
+                ctx.trace_request_ctx[name] = time.perf_counter()
+            return callback
+
+        trace = aiohttp.TraceConfig()
+        trace.on_dns_resolvehost_start.append(mark('dns_start'))
+        trace.on_dns_resolvehost_end.append(mark('dns_end'))
+        trace.on_connection_create_start.append(mark('connect_start'))
+        trace.on_connection_create_end.append(mark('connect_end'))
+        trace.on_request_headers_sent.append(mark('headers_sent'))
+        trace.on_request_end.append(mark('response_start'))
+        return trace
+
+    async def close(self):
+        """关闭会话，释放连接池"""
+        self._closed = True
+        self._instrument_caches.clear()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __enter__(self):
+        raise TypeError('AsyncOKXClient请使用 async with')
+
+    async def _request(self, method, endpoint, params=None, data=None, cost=1, decoder=None):
+        """发送HTTP请求，decoder为解析响应体bytes的函数，默认json.loads"""
+        if method not in ('GET', 'POST'):
+            raise ValueError(f'不支持的HTTP方法: {method}')
+
+        session = self._get_session()
+        # 下单等POST请求不重试，避免重复成交
+        attempts = self.max_retries + 1 if method == 'GET' else 1
+
+        for attempt in range(attempts):
+            started = time.perf_counter()
+            await self.rate_limiter.acquire_async(endpoint, cost=cost)
+            # 每次重试重新签名，避免时间戳过期
+            url, body, headers = self._prepare_request(method, endpoint, params, data)
+            retry = attempt < attempts - 1
+            marks = {'sent': time.perf_counter()}
+            status = None
+            code = None
+            error = None
+            try:
+                async with session.request(method, url, headers=headers, data=body or None,
+                                           trace_request_ctx=marks) as response:
+                    status = response.status
+                    if response.status == 429:
+                        self.rate_limiter.record_rejected(endpoint)
+                    if response.status in RETRY_STATUS and retry:
+                        await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                        continue
+                    response.raise_for_status()
+                    content = await response.read()
+                    marks['received'] = time.perf_counter()
+                    result = (decoder or json.loads)(content)
+                    marks['parsed'] = time.perf_counter()
+                    if isinstance(result, dict):
+                        code = result.get('code')
+                        if code in RATE_LIMIT_CODES:
+                            self.rate_limiter.record_rejected(endpoint)
+                    return result
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+                if retry:
+                    await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                    continue
+                print(f"请求失败: {e}")
+                return None
+            except aiohttp.ClientError as e:
+                error = str(e)
+                print(f"请求失败: {e}")
+                return None
+            except json.JSONDecodeError as e:
+                error = str(e)
+                print(f"JSON解析失败: {e}")
+                return None
+            finally:
+                self._record_metrics(endpoint, method, started, marks, status, code, error)
+
+    def _record_metrics(self, endpoint, method, started, marks, status, code, error):
+        """把trace时间点换算成各阶段耗时"""
+        def span(begin, end):
+            if begin in marks and end in marks:
+                return max(0.0, marks[end] - marks[begin])
+            return None
+
+        phases = {
+            'queue': marks['sent'] - started,
+            'dns': span('dns_start', 'dns_end'),
+            'connect': span('connect_start', 'connect_end'),
+            'server': span('headers_sent', 'response_start'),
+            'transfer': span('response_start', 'received'),
+            'parse': span('received', 'parsed'),
+            'total': time.perf_counter() - started
+        }
+        timings = {phase: seconds for phase, seconds in phases.items() if seconds is not None}
+        self.metrics.record(endpoint_path(endpoint), method, timings, status, code, error)
+
+    async def get_ticker(self, inst_id=DEFAULT_INST_ID):
+        """获取行情数据"""
+        endpoint = f'/api/v5/market/ticker?instId={inst_id}'
+        return await self._request('GET', endpoint)
+
+    async def get_order_book(self, inst_id=DEFAULT_INST_ID, sz=400):
+        """获取深度快照"""
+        endpoint = f'/api/v5/market/books?instId={inst_id}&sz={sz}'
+        return await self._request('GET', endpoint)
+
+    async def get_candles(self, inst_id=DEFAULT_INST_ID, bar="1H", limit=100, after=None, before=None):
+        """获取K线数据"""
+        endpoint = f'/api/v5/market/candles?instId={inst_id}&bar={bar}&limit={limit}'
+        if after:
+            endpoint += f'&after={after}'
+        if before:
+            endpoint += f'&before={before}'
+        return await self._request('GET', endpoint)
+
+    async def get_candle_arrays(self, inst_id=DEFAULT_INST_ID, bar="1H", limit=100, after=None, before=None, history=False):
+        """获取K线并直接解码为NumPy列数组"""
+        from market_data.decode import decode_candle_response
+
+        path = '/api/v5/market/history-candles' if history else '/api/v5/market/candles'
+        endpoint = f'{path}?instId={inst_id}&bar={bar}&limit={limit}'
+        if after:
+            endpoint += f'&after={after}'
+        if before:
+            endpoint += f'&before={before}'
+        return await self._request('GET', endpoint, decoder=decode_candle_response)
+
+    async def get_history_candles(self, inst_id=DEFAULT_INST_ID, bar="1H", limit=100, after=None, before=None):
+        """获取历史K线数据"""
+        endpoint = f'/api/v5/market/history-candles?instId={inst_id}&bar={bar}&limit={limit}'
+        if after:
+            endpoint += f'&after={after}'
+        if before:
+            endpoint += f'&before={before}'
+        return await self._request('GET', endpoint)
+
+    async def get_instruments(self, inst_type="SPOT"):
+        """获取交易产品信息"""
+        endpoint = f'/api/v5/public/instruments?instType={inst_type}'
+        return await self._request('GET', endpoint)
+
+    async def get_instrument_cache(self, inst_type="SWAP", ttl=3600):
+        """获取产品规格缓存，过期时在当前事件循环中刷新"""
+        cache = self._instrument_caches.get(inst_type)
+        if cache is None:
+            cache = InstrumentCache(None, inst_type, ttl=ttl, background=False)
+            self._instrument_caches[inst_type] = cache
+        if cache.expired:
+            cache.load(await self.get_instruments(inst_type))
+        return cache
+
+    async def get_account_balance(self, ccy=None):
+        """获取账户余额"""
+        endpoint = '/api/v5/account/balance'
+        if ccy:
+            endpoint += f'?ccy={ccy}'
+        return await self._request('GET', endpoint)
+
+    async def place_order(self, inst_id, side, ord_type, sz, px=None):
+        """下单"""
+        endpoint = '/api/v5/trade/order'
+        data = {
+            'instId': inst_id,
+            'tdMode': 'cash',  # 现货模式
+            'side': side,
+            'ordType': ord_type,
+            'sz': sz
+        }
+
+        if px:
+            data['px'] = px
+
+        return await self._request('POST', endpoint, data=data)
+
+    async def get_orders(self, inst_id=None, state=None):
+        """获取订单列表"""
+        endpoint = '/api/v5/trade/orders-pending'
+        params = {}
+        if inst_id:
+            params['instId'] = inst_id
+        if state:
+            params['state'] = state
+
+        return await self._request('GET', endpoint, params=params)
+
+    async def get_order_history(self, inst_id=None, state=None):
+        """获取历史订单"""
+        endpoint = '/api/v5/trade/orders-history'
+        params = {}
+        if inst_id:
+            params['instId'] = inst_id
+        if state:
+            params['state'] = state
+
+        return await self._request('GET', endpoint, params=params)
+
+    async def cancel_order(self, inst_id, ord_id):
+        """撤单"""
+        endpoint = '/api/v5/trade/cancel-order'
+        data = {
+            'instId': inst_id,
+            'ordId': ord_id
+        }
+        return await self._request('POST', endpoint, data=data)
+
+    async def place_futures_order(self, inst_id, side, ord_type, sz, px=None, td_mode='cross', pos_side='net'):
+        """下期货订单"""
+        endpoint = '/api/v5/trade/order'
+        data = self.build_futures_order(inst_id, side, ord_type, sz, px, td_mode, pos_side)
+        return await self._request('POST', endpoint, data=data)
+
+    async def _batch_request(self, endpoint, orders):
+        """分批并发提交并合并结果"""
+        chunks = chunk_orders(orders)
+        results = await asyncio.gather(*(self._request('POST', endpoint, data=chunk, cost=len(chunk))
+                                         for chunk in chunks))
+        return merge_batch_results(chunks, results)
+
+    async def place_batch_orders(self, orders):
+        """批量下单"""
+        return await self._batch_request('/api/v5/trade/batch-orders', orders)
+
+    async def cancel_batch_orders(self, orders):
+        """批量撤单"""
+        return await self._batch_request('/api/v5/trade/cancel-batch-orders', orders)
+
+    async def amend_batch_orders(self, orders):
+        """批量改单"""
+        return await self._batch_request('/api/v5/trade/amend-batch-orders', orders)
+
+    async def get_positions(self, inst_id=None):
+        """获取持仓信息"""
+        endpoint = '/api/v5/account/positions'
+        params = {}
+        if inst_id:
+            params['instId'] = inst_id
+
+        return await self._request('GET', endpoint, params=params)
+
+    async def get_futures_balance(self, ccy=None):
+        """获取期货账户余额"""
+        endpoint = '/api/v5/account/balance'
+        params = {}
+        if ccy:
+            params['ccy'] = ccy
+
+        return await self._request('GET', endpoint, params=params)
+
+    async def set_leverage(self, inst_id, lever, mgn_mode='cross', pos_side='net'):
+        """设置杠杆倍数"""
+        endpoint = '/api/v5/account/set-leverage'
+        data = {
+            'instId': inst_id,
+            'lever': str(lever),
+            'mgnMode': mgn_mode,
+            'posSide': pos_side
+        }
+        return await self._request('POST', endpoint, data=data)
+
+    async def get_candles_many(self, inst_ids, bar="1H", limit=100):
+        """
+        并发获取多个交易对的K线数据
+
+        返回:
+            dict: {inst_id: get_candles的返回结果}
+        """
+        results = await asyncio.gather(*(self.get_candles(inst_id, bar, limit) for inst_id in inst_ids))
+        return dict(zip(inst_ids, results))
@@ -9,12 +9,84 @@ import hmac
 import hashlib
 import base64
 import json
+import os
+import threading
+from urllib.parse import urlencode
+from okx_instruments import InstrumentCache
+from okx_metrics import RequestMetrics, TimedHTTPAdapter
+from okx_rate_limiter import RateLimiter, RATE_LIMIT_CODES, endpoint_path
 from config import API_KEY, SECRET_KEY, PASSPHRASE, FLAG, DEFAULT_INST_ID, TRADING_MODE
 
+# 批量下单/撤单/改单接口单次请求的最大订单数
+BATCH_ORDER_LIMIT = 20
+
+# _send被限流(429)、服务端5xx或连接失败、需要重新经过限流器重试时的返回值
+_RETRY = object()
+
+# GET请求遇到这些状态码时退避后重试
+RETRY_STATUSES = (500, 502, 503, 504)
+
+def merge_batch_results(chunks, results):
+    """
+    合并分批请求的结果，保持与单次批量接口相同的返回格式
+    
+    参数:
+        chunks: 每批提交的订单列表
+        results: 每批请求的返回结果（请求失败时为None）
+    
+    返回:
+        dict: code为'0'全部成功、'1'全部失败、'2'部分成功；data按提交顺序给出每个订单的结果
+    """
+    data = []
+    all_ok = True
+    all_failed = True
+    for chunk, result in zip(chunks, results):
+        items = result.get('data') if result else None
+        if isinstance(items, list) and len(items) == len(chunk):
+            data.extend(items)
+            ok_count = sum(1 for item in items if item.get('sCode') == '0')
+        else:
+            # 整批请求失败，为每个订单补一条失败记录
+            code = result.get('code', '-1') if result else '-1'
+            msg = result.get('msg', '') if result else '请求失败'
+            data.extend({
+                'clOrdId': order.get('clOrdId', ''),
+                'ordId': order.get('ordId', ''),
+                'sCode': code,
+                'sMsg': msg
+            } for order in chunk)
+            ok_count = 0
+        all_ok = all_ok and ok_count == len(chunk)
+        all_failed = all_failed and ok_count == 0
+    
+    if all_ok:
+        code = '0'
+    elif all_failed:
+        code = '1'
+    else:
+        code = '2'
+    return {'code': code, 'msg': '', 'data': data}
+
+def chunk_orders(orders, size=BATCH_ORDER_LIMIT):
+    """按批量接口上限切分订单列表"""
+    orders = list(orders)
+    return [orders[i:i + size] for i in range(0, len(orders), size)]
+
 class OKXHTTPClient:
     """OKX HTTP客户端"""
     
-    def __init__(self):
+    def __init__(self, pool_size=10, max_retries=3, backoff_factor=0.3, timeout=30, rate_limiter=None, metrics=None,
+                 base_url=None):
+        """
+        参数:
+            pool_size: 每个主机保持的长连接数量
+            max_retries: 幂等GET请求的最大重试次数
+            backoff_factor: 重试退避系数 (第n次重试等待 backoff_factor * 2^(n-1) 秒)
+            timeout: 请求超时时间(秒)
+            rate_limiter: 客户端限流器，None时使用OKX默认限速的RateLimiter
+            metrics: 请求延迟统计，None时新建RequestMetrics（可通过client.metrics.report()查看）
+            base_url: API地址，None时使用环境变量OKX_BASE_URL或OKX官方地址（指向本地模拟器时使用）
+        """
         self.api_key = API_KEY
         self.secret_key = SECRET_KEY
         self.passphrase = PASSPHRASE
@@ -26,9 +98,44 @@ class OKXHTTPClient:
             self.base_url = "https://www.okx.com"
         else:  # 模拟
             self.base_url = "https://www.okx.com"
+        self.base_url = (base_url or os.environ.get('OKX_BASE_URL') or self.base_url).rstrip('/')
+        
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self._instrument_caches = {}
+        self.session = self._create_session(pool_size, max_retries, backoff_factor)
         
         print(f"🔧 初始化OKX客户端 - {self.trading_mode}模式")
     
+    def _create_session(self, pool_size, max_retries, backoff_factor):
+        """创建带连接池的长连接会话，复用TCP+TLS连接"""
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        # 适配器不做重试：重试由_request发起，每次重发都重新从限流器取令牌，
+        # 只对幂等的GET请求重试，下单等POST请求不重试以免重复成交
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+    
+    def close(self):
+        """关闭会话，释放连接池"""
+        for cache in self._instrument_caches.values():
+            cache.stop()
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
     def _get_timestamp(self):
         """获取时间戳"""
         return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
@@ -62,9 +169,12 @@ class OKXHTTPClient:
         
         return headers
     
-    def _request(self, method, endpoint, params=None, data=None):
-        """发送HTTP请求"""
-        url = self.base_url + endpoint
+    def _prepare_request(self, method, endpoint, params=None, data=None):
+        """构造完整URL、请求体和签名请求头（同步/异步客户端共用）"""
+        # 签名必须覆盖查询字符串，因此把params拼进请求路径
+        if params:
+            separator = '&' if '?' in endpoint else '?'
+            endpoint = endpoint + separator + urlencode(params)
         
         if data:
             body = json.dumps(data)
@@ -72,33 +182,154 @@ class OKXHTTPClient:
             body = ''
         
         headers = self._get_headers(method, endpoint, body)
+        return self.base_url + endpoint, body, headers
+    
+    def _request(self, method, endpoint, params=None, data=None, cost=1, decoder=None):
+        """
+        发送HTTP请求
+        
+        参数:
+            decoder: 解析响应体bytes的函数，默认json.loads
+        """
+        if self.session is None:
+            raise RuntimeError('OKX客户端已关闭')
+        
+        attempts = self.max_retries + 1 if method == 'GET' else 1
+        for attempt in range(attempts):
+            result = self._send(method, endpoint, params, data, cost, decoder, attempt < attempts - 1)
+            if result is not _RETRY:
+                return result
+            time.sleep(self.backoff_factor * (2 ** attempt))
+    
+    def _send(self, method, endpoint, params, data, cost, decoder, can_retry):
+        """
+        发送一次请求（先从限流器取令牌）
+        
+        参数:
+            can_retry: 失败后是否还可以重试（GET且未用完重试次数）
+        
+        返回:
+            解析后的响应；被限流(429)、服务端5xx或连接失败且还可以重试时返回_RETRY
+        """
+        path = endpoint_path(endpoint)
+        started = time.perf_counter()
+        self.rate_limiter.acquire(endpoint, cost=cost)
+        url, body, headers = self._prepare_request(method, endpoint, params, data)
         
+        timings = {}
+        status = None
+        code = None
+        error = None
         try:
+            self.metrics.begin()
+            sent = time.perf_counter()
+            timings['queue'] = sent - started
             if method == 'GET':
-                response = requests.get(url, headers=headers, params=params, timeout=30)
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
             elif method == 'POST':
-                response = requests.post(url, headers=headers, json=data, timeout=30)
+                response = self.session.post(url, headers=headers, data=body, timeout=self.timeout)
             else:
                 raise ValueError(f'不支持的HTTP方法: {method}')
+            received = time.perf_counter()
             
+            # elapsed为发出请求到收到响应头的耗时，其中包含DNS解析、建连和TLS握手
+            dns, connect, tls = self.metrics.connection_timings()
+            elapsed = response.elapsed.total_seconds()
+            timings['dns'] = dns
+            timings['connect'] = connect
+            timings['tls'] = tls
+            timings['server'] = max(0.0, elapsed - dns - connect - tls)
+            timings['transfer'] = max(0.0, received - sent - elapsed)
+            status = response.status_code
+            
+            if response.status_code == 429:
+                self.rate_limiter.record_rejected(endpoint)
+                if can_retry:
+                    return _RETRY
+            if response.status_code in RETRY_STATUSES and can_retry:
+                return _RETRY
             response.raise_for_status()
-            return response.json()
+            result = (decoder or json.loads)(response.content)
+            timings['parse'] = time.perf_counter() - received
+            if isinstance(result, dict):
+                code = result.get('code')
+                if code in RATE_LIMIT_CODES:
+                    self.rate_limiter.record_rejected(endpoint)
+            return result
             
+        except requests.exceptions.SSLError as e:
+            # SSLError是ConnectionError的子类，但证书错误重试也不会恢复
+            error = str(e)
+            print(f"请求失败: {e}")
+            return None
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = str(e)
+            if can_retry:
+                print(f"⚠️ 请求失败，稍后重试: {e}")
+                return _RETRY
+            print(f"请求失败: {e}")
+            return None
         except requests.exceptions.RequestException as e:
+            error = str(e)
             print(f"请求失败: {e}")
             return None
         except json.JSONDecodeError as e:
+            error = str(e)
             print(f"JSON解析失败: {e}")
             return None
+        finally:
+            timings['total'] = time.perf_counter() - started
+            self.metrics.record(path, method, timings, status, code, error)
     
     def get_ticker(self, inst_id=DEFAULT_INST_ID):
         """获取行情数据"""
         endpoint = f'/api/v5/market/ticker?instId={inst_id}'
         return self._request('GET', endpoint)
     
-    def get_candles(self, inst_id=DEFAULT_INST_ID, bar="1H", limit=100):
-        """获取K线数据"""
+    def get_order_book(self, inst_id=DEFAULT_INST_ID, sz=400):
+        """获取深度快照，data[0]可直接用于market_data.order_book.OrderBook.apply_snapshot"""
+        endpoint = f'/api/v5/market/books?instId={inst_id}&sz={sz}'
+        return self._request('GET', endpoint)
+    
+    def get_candles(self, inst_id=DEFAULT_INST_ID, bar="1H", limit=100, after=None, before=None):
+        """
+        获取K线数据
+        
+        参数:
+            after: 返回早于该时间戳(ms)的K线，用于向前翻页
+            before: 返回晚于该时间戳(ms)的K线
+        """
         endpoint = f'/api/v5/market/candles?instId={inst_id}&bar={bar}&limit={limit}'
+        if after:
+            endpoint += f'&after={after}'
+        if before:
+            endpoint += f'&before={before}'
+        return self._request('GET', endpoint)
+    
+    def get_candle_arrays(self, inst_id=DEFAULT_INST_ID, bar="1H", limit=100, after=None, before=None, history=False):
+        """
+        获取K线并直接解码为NumPy列数组（不经过DataFrame）
+        
+        返回:
+            dict: OKX响应结构，成功时data为{'ts', 'open', 'high', 'low', 'close', 'vol', ..., 'confirm'}，按时间升序
+        """
+        from market_data.decode import decode_candle_response
+        
+        path = '/api/v5/market/history-candles' if history else '/api/v5/market/candles'
+        endpoint = f'{path}?instId={inst_id}&bar={bar}&limit={limit}'
+        if after:
+            endpoint += f'&after={after}'
+        if before:
+            endpoint += f'&before={before}'
+        return self._request('GET', endpoint, decoder=decode_candle_response)
+    
+    def get_history_candles(self, inst_id=DEFAULT_INST_ID, bar="1H", limit=100, after=None, before=None):
+        """获取历史K线数据（可回溯数年），分页参数同get_candles，单页最多100根"""
+        endpoint = f'/api/v5/market/history-candles?instId={inst_id}&bar={bar}&limit={limit}'
+        if after:
+            endpoint += f'&after={after}'
+        if before:
+            endpoint += f'&before={before}'
         return self._request('GET', endpoint)
     
     def get_instruments(self, inst_type="SPOT"):
@@ -106,6 +337,20 @@ class OKXHTTPClient:
         endpoint = f'/api/v5/public/instruments?instType={inst_type}'
         return self._request('GET', endpoint)
     
+    def get_instrument_cache(self, inst_type="SWAP", ttl=3600):
+        """
+        获取按instId索引的产品规格缓存（首次查询时加载，之后后台定时刷新）
+        
+        用法:
+            specs = client.get_instrument_cache("SWAP")
+            ct_val = specs.contract_value("BTC-USDT-SWAP", 0.01)
+        """
+        cache = self._instrument_caches.get(inst_type)
+        if cache is None:
+            cache = InstrumentCache(self, inst_type, ttl=ttl)
+            self._instrument_caches[inst_type] = cache
+        return cache
+    
     def get_account_balance(self, ccy=None):
         """获取账户余额"""
         endpoint = '/api/v5/account/balance'
@@ -160,9 +405,9 @@ class OKXHTTPClient:
         }
         return self._request('POST', endpoint, data=data)
     
-    def place_futures_order(self, inst_id, side, ord_type, sz, px=None, td_mode='cross', pos_side='net'):
-        """下期货订单"""
-        endpoint = '/api/v5/trade/order'
+    @staticmethod
+    def build_futures_order(inst_id, side, ord_type, sz, px=None, td_mode='cross', pos_side='net', **extra):
+        """构造期货订单参数，可直接用于place_futures_order或批量下单"""
         data = {
             'instId': inst_id,
             'tdMode': td_mode,  # 保证金模式: cross, isolated
@@ -174,9 +419,52 @@ class OKXHTTPClient:
         
         if px:
             data['px'] = px
+        data.update(extra)
         
+        return data
+    
+    def place_futures_order(self, inst_id, side, ord_type, sz, px=None, td_mode='cross', pos_side='net'):
+        """下期货订单"""
+        endpoint = '/api/v5/trade/order'
+        data = self.build_futures_order(inst_id, side, ord_type, sz, px, td_mode, pos_side)
         return self._request('POST', endpoint, data=data)
     
+    def _batch_request(self, endpoint, orders):
+        """按BATCH_ORDER_LIMIT分批提交并合并结果"""
+        chunks = chunk_orders(orders)
+        results = [self._request('POST', endpoint, data=chunk, cost=len(chunk)) for chunk in chunks]
+        return merge_batch_results(chunks, results)
+    
+    def place_batch_orders(self, orders):
+        """
+        批量下单，超过单次上限时自动分批
+        
+        参数:
+            orders: 订单参数列表，可用build_futures_order构造
+        
+        返回:
+            dict: code为'0'全部成功、'1'全部失败、'2'部分成功；data为每个订单的结果(sCode/sMsg/ordId)
+        """
+        return self._batch_request('/api/v5/trade/batch-orders', orders)
+    
+    def cancel_batch_orders(self, orders):
+        """
+        批量撤单
+        
+        参数:
+            orders: [{'instId': ..., 'ordId': ...}, ...]，也可用clOrdId代替ordId
+        """
+        return self._batch_request('/api/v5/trade/cancel-batch-orders', orders)
+    
+    def amend_batch_orders(self, orders):
+        """
+        批量改单
+        
+        参数:
+            orders: [{'instId': ..., 'ordId': ..., 'newSz': ..., 'newPx': ...}, ...]
+        """
+        return self._batch_request('/api/v5/trade/amend-batch-orders', orders)
+    
     def get_positions(self, inst_id=None):
         """获取持仓信息"""
         endpoint = '/api/v5/account/positions'
@@ -206,5 +494,21 @@ class OKXHTTPClient:
         }
         return self._request('POST', endpoint, data=data)
 
-# 全局客户端实例
-client = OKXHTTPClient()
+# 全局客户端实例，首次使用时才创建（导入本模块不会建连或打印）
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """获取全局共享的OKXHTTPClient，首次调用时创建"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OKXHTTPClient()
+    return _client
+
+def __getattr__(name):
+    # 兼容旧用法 from okx_http_client import client
+    if name == 'client':
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,136 @@
+"""
+交易产品规格缓存
+按instId索引/public/instruments的结果，后台定时刷新
+下单时直接查合约面值、下单步长等，不再每次下载整张产品列表
+"""
+import threading
+import time
+
+class InstrumentCache:
+    """交易产品规格缓存"""
+
+    def __init__(self, client, inst_type='SWAP', ttl=3600, background=True, miss_refresh_interval=60):
+        """
+        参数:
+            client: OKXHTTPClient实例，为None时需要调用方通过load()喂数据
+            inst_type: 产品类型 SPOT/SWAP/FUTURES/OPTION
+            ttl: 缓存有效期(秒)，后台线程按此间隔刷新
+            background: 首次加载后是否启动后台刷新线程
+            miss_refresh_interval: 查不到instId时触发刷新的最小间隔(秒)，用于发现新上线的产品
+        """
+        self.client = client
+        self.inst_type = inst_type
+        self.ttl = ttl
+        self.background = background
+        self.miss_refresh_interval = miss_refresh_interval
+        self.loaded_at = None
+        self._instruments = {}
+        self._last_miss_refresh = 0.0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def expired(self):
+        """缓存是否已过期或从未加载"""
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.ttl
+
+    def load(self, result):
+        """
+        用get_instruments的返回结果重建索引
+
+        返回:
+            bool: 是否加载成功
+        """
+        if not result or result.get('code') != '0':
+            print(f"❌ 获取交易产品信息失败: {result}")
+            return False
+
+        instruments = {inst['instId']: inst for inst in result['data']}
+        with self._lock:
+            self._instruments = instruments
+            self.loaded_at = time.monotonic()
+        return True
+
+    def refresh(self):
+        """立即从交易所刷新"""
+        try:
+            return self.load(self.client.get_instruments(self.inst_type))
+        except Exception as e:
+            print(f"刷新交易产品信息异常: {e}")
+            return False
+
+    def start(self):
+        """启动后台刷新线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name=f'instruments-{self.inst_type}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台刷新线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.ttl):
+            self.refresh()
+
+    def _ensure_loaded(self):
+        # 没有后台线程时在查询路径上按TTL懒刷新
+        if self.client is None:
+            return
+        if self.loaded_at is None or (self._thread is None and self.expired):
+            if self.refresh() and self.background:
+                self.start()
+
+    def get(self, inst_id):
+        """
+        获取单个产品的完整规格
+
+        返回:
+            dict: OKX返回的产品信息，找不到时返回None
+        """
+        self._ensure_loaded()
+        inst = self._instruments.get(inst_id)
+        if inst is None and self.client is not None:
+            now = time.monotonic()
+            if now - self._last_miss_refresh >= self.miss_refresh_interval:
+                self._last_miss_refresh = now
+                self.refresh()
+                inst = self._instruments.get(inst_id)
+        return inst
+
+    def _get_float(self, inst_id, field, default):
+        inst = self.get(inst_id)
+        if inst is None:
+            return default
+        try:
+            return float(inst[field])
+        except (KeyError, TypeError, ValueError):
+            return default
+
+    def contract_value(self, inst_id, default=None):
+        """合约面值 ctVal"""
+        return self._get_float(inst_id, 'ctVal', default)
+
+    def lot_size(self, inst_id, default=None):
+        """下单数量步长 lotSz"""
+        return self._get_float(inst_id, 'lotSz', default)
+
+    def tick_size(self, inst_id, default=None):
+        """价格最小变动 tickSz"""
+        return self._get_float(inst_id, 'tickSz', default)
+
+    def min_size(self, inst_id, default=None):
+        """最小下单数量 minSz"""
+        return self._get_float(inst_id, 'minSz', default)
+
+    def __contains__(self, inst_id):
+        return self.get(inst_id) is not None
+
+    def __len__(self):
+        return len(self._instruments)
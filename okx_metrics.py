@@ -0,0 +1,289 @@
+"""
+OKX客户端请求延迟统计
+按接口记录各阶段耗时(排队/DNS/建连/TLS/服务端/传输/解析)的HDR风格直方图，
+以及HTTP状态码和OKX错误码计数；通过钩子把每次请求的明细导出到日志或监控
+"""
+import socket
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+# 记录的阶段；两个客户端都单独记录DNS解析（复用连接时没有DNS/建连），异步客户端的TLS耗时计入connect
+PHASES = ('queue', 'dns', 'connect', 'tls', 'server', 'transfer', 'parse', 'total')
+
+# 直方图精度: 每个2的幂区间分成64格，相对误差<1.6%
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT // 2
+_MAX_SHIFT = 30  # 约 2^37 微秒 ≈ 38小时
+
+class LatencyHistogram:
+    """
+    HDR风格的对数-线性直方图（单位微秒）
+
+    记录为O(1)，内存固定，分位数误差与数值大小成比例
+    """
+
+    def __init__(self):
+        self.counts = [0] * (_SUB_BUCKET_COUNT + _MAX_SHIFT * _SUB_BUCKET_HALF)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def _index(value):
+        if value < _SUB_BUCKET_COUNT:
+            return value
+        shift = min(value.bit_length() - _SUB_BUCKET_BITS, _MAX_SHIFT)
+        sub = min(value >> shift, _SUB_BUCKET_COUNT - 1)
+        return _SUB_BUCKET_COUNT + (shift - 1) * _SUB_BUCKET_HALF + sub - _SUB_BUCKET_HALF
+
+    @staticmethod
+    def _value_at(index):
+        """桶的中点值"""
+        if index < _SUB_BUCKET_COUNT:
+            return index
+        k = index - _SUB_BUCKET_COUNT
+        shift = k // _SUB_BUCKET_HALF + 1
+        sub = k % _SUB_BUCKET_HALF + _SUB_BUCKET_HALF
+        return (sub << shift) + (1 << (shift - 1))
+
+    def record(self, seconds):
+        """记录一个耗时（秒）"""
+        value = max(0, int(seconds * 1e6))
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """第p百分位的耗时（微秒），p取0-100"""
+        if self.count == 0:
+            return 0
+        target = max(1, int(round(self.count * p / 100.0)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self._value_at(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        """合并另一个直方图"""
+        for index, n in enumerate(other.counts):
+            self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def summary(self):
+        """count/mean/p50/p99/p999/max（微秒）"""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max
+        }
+
+# ---------- DNS/建连/TLS计时 ----------
+
+_local = threading.local()
+
+def _phase_timings():
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        timings = _local.timings = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+    return timings
+
+def _timed_new_conn(conn, new_conn):
+    """
+    先单独解析域名并计入dns，再依次连接解析出的地址（与urllib3相同，一个地址失败时尝试下一个），计入connect
+
+    解析失败时交给urllib3原来的流程，抛出同样的NameResolutionError
+    """
+    timings = _phase_timings()
+    host = conn._dns_host
+    start = time.perf_counter()
+    try:
+        infos = socket.getaddrinfo(host, conn.port, allowed_gai_family(), socket.SOCK_STREAM)
+    except OSError:
+        infos = None
+    finally:
+        timings['dns'] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        if not infos:
+            return new_conn()
+        error = None
+        for address in dict.fromkeys(info[4][0] for info in infos):
+            conn._dns_host = address
+            try:
+                return new_conn()
+            except (NewConnectionError, ConnectTimeoutError) as e:
+                error = e
+            finally:
+                conn._dns_host = host
+        raise error
+    finally:
+        timings['connect'] += time.perf_counter() - start
+
+class _TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        return _timed_new_conn(self, super()._new_conn)
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        return _timed_new_conn(self, super()._new_conn)
+
+    def connect(self):
+        start = time.perf_counter()
+        timings = _phase_timings()
+        before = timings['dns'] + timings['connect']
+        try:
+            super().connect()
+        finally:
+            elapsed = time.perf_counter() - start
+            timings['tls'] += elapsed - (timings['dns'] + timings['connect'] - before)
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """分别记录DNS解析、建连和TLS握手耗时的HTTPAdapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+# ---------- 统计 ----------
+
+class RequestMetrics:
+    """按接口汇总的请求统计"""
+
+    def __init__(self):
+        self._endpoints = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """
+        注册钩子，每次请求结束后调用 hook(sample)
+
+        sample: {'endpoint', 'method', 'status', 'code', 'error', 'timings': {阶段: 秒}}
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    @staticmethod
+    def begin():
+        """请求开始前调用，清零当前线程的DNS/建连/TLS计时"""
+        timings = _phase_timings()
+        timings['dns'] = 0.0
+        timings['connect'] = 0.0
+        timings['tls'] = 0.0
+
+    @staticmethod
+    def connection_timings():
+        """当前线程本次请求的(DNS, 建连, TLS)耗时"""
+        timings = _phase_timings()
+        return timings['dns'], timings['connect'], timings['tls']
+
+    def _endpoint_stats(self, endpoint):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = {
+                'phases': {phase: LatencyHistogram() for phase in PHASES},
+                'status': {},
+                'codes': {},
+                'errors': 0
+            }
+            self._endpoints[endpoint] = stats
+        return stats
+
+    def record(self, endpoint, method, timings, status=None, code=None, error=None):
+        """
+        记录一次请求
+
+        参数:
+            endpoint: 接口路径（不含查询字符串）
+            timings: {阶段: 秒}
+            status: HTTP状态码，请求未完成时为None
+            code: OKX返回的code
+            error: 异常描述
+        """
+        with self._lock:
+            stats = self._endpoint_stats(endpoint)
+            for phase, seconds in timings.items():
+                stats['phases'][phase].record(seconds)
+            if status is not None:
+                stats['status'][status] = stats['status'].get(status, 0) + 1
+            if code is not None:
+                stats['codes'][code] = stats['codes'].get(code, 0) + 1
+            if error is not None:
+                stats['errors'] += 1
+
+        if self._hooks:
+            sample = {
+                'endpoint': endpoint,
+                'method': method,
+                'status': status,
+                'code': code,
+                'error': error,
+                'timings': timings
+            }
+            for hook in self._hooks:
+                try:
+                    hook(sample)
+                except Exception as e:
+                    print(f"延迟统计钩子异常: {e}")
+
+    def snapshot(self):
+        """
+        获取统计快照
+
+        返回:
+            dict: {接口: {'phases': {阶段: summary}, 'status': {...}, 'codes': {...}, 'errors': n}}
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    'phases': {phase: hist.summary() for phase, hist in stats['phases'].items() if hist.count},
+                    'status': dict(stats['status']),
+                    'codes': dict(stats['codes']),
+                    'errors': stats['errors']
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+
+    def report(self):
+        """生成文本报告（毫秒）"""
+        lines = []
+        for endpoint, stats in sorted(self.snapshot().items()):
+            lines.append(f"{endpoint}  status={stats['status']} codes={stats['codes']} errors={stats['errors']}")
+            for phase, s in stats['phases'].items():
+                lines.append(f"  {phase:<9} n={s['count']:<6} p50={s['p50'] / 1000:.2f}ms "
+                             f"p99={s['p99'] / 1000:.2f}ms p999={s['p999'] / 1000:.2f}ms max={s['max'] / 1000:.2f}ms")
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
@@ -0,0 +1,241 @@
+"""
+OKX客户端限流器
+按接口路径的令牌桶限流，默认值取自OKX API v5文档
+交易接口走高优先级通道，行情轮询不会抢占下单所需的配额
+"""
+import itertools
+import threading
+import time
+
+# OKX文档限速: 路径 -> (请求数, 时间窗口秒)
+DEFAULT_LIMITS = {
+    '/api/v5/market/ticker': (20, 2),
+    '/api/v5/market/tickers': (20, 2),
+    '/api/v5/market/candles': (40, 2),
+    '/api/v5/market/history-candles': (20, 2),
+    '/api/v5/market/books': (40, 2),
+    '/api/v5/market/trades': (100, 2),
+    '/api/v5/public/instruments': (20, 2),
+    '/api/v5/account/balance': (10, 2),
+    '/api/v5/account/positions': (10, 2),
+    '/api/v5/account/set-leverage': (20, 2),
+    '/api/v5/trade/order': (60, 2),
+    '/api/v5/trade/cancel-order': (60, 2),
+    '/api/v5/trade/amend-order': (60, 2),
+    # 批量接口按订单数计数
+    '/api/v5/trade/batch-orders': (300, 2),
+    '/api/v5/trade/cancel-batch-orders': (300, 2),
+    '/api/v5/trade/amend-batch-orders': (300, 2),
+    '/api/v5/trade/orders-pending': (60, 2),
+    '/api/v5/trade/orders-history': (40, 2),
+}
+
+# 未列出的接口使用的默认限速
+DEFAULT_LIMIT = (20, 2)
+
+# 优先级通道，数值越小越优先
+PRIORITY_TRADE = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET = 2
+
+# 服务端限流时返回的错误码
+RATE_LIMIT_CODES = ('50011', '50061')
+
+def endpoint_path(endpoint):
+    """去掉查询字符串，得到限流所用的接口路径"""
+    return endpoint.split('?', 1)[0]
+
+def endpoint_priority(path):
+    """根据接口路径判断所属优先级通道"""
+    if path.startswith('/api/v5/trade/'):
+        return PRIORITY_TRADE
+    if path.startswith('/api/v5/account/'):
+        return PRIORITY_ACCOUNT
+    return PRIORITY_MARKET
+
+class TokenBucket:
+    """令牌桶: capacity个令牌，每per_seconds秒补满"""
+
+    def __init__(self, capacity, per_seconds):
+        self.capacity = float(capacity)
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        """按流逝时间补充令牌"""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def wait_time(self, cost=1):
+        """距离可以取出cost个令牌还需等待的秒数，0表示可以立即取出"""
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost=1):
+        """取出令牌"""
+        self.tokens -= min(cost, self.capacity)
+
+class RateLimiter:
+    """
+    按接口路径限流的令牌桶限流器
+
+    每个接口路径一个令牌桶；可选的global_limit为所有接口共享的总桶。
+    等待中的请求按(优先级, 到达顺序)排队，同一个桶上优先级低的请求
+    必须让位于排在前面且已就绪的请求，交易接口因此总能先拿到配额。
+
+    注意: 优先级只在争用同一个桶时生效。默认不设global_limit（OKX按接口路径分别限速），
+    不同路径的请求互不占用配额，也就没有跨接口的抢占：交易请求不必等待其他接口排队中的行情请求，
+    但行情请求也不会因为交易请求而推迟。需要交易请求在所有接口间优先（例如账户级的总限速）时，
+    传入global_limit，此时排队的行情请求会让位于已就绪的交易请求。
+    """
+
+    def __init__(self, limits=None, default_limit=DEFAULT_LIMIT, global_limit=None):
+        """
+        参数:
+            limits: {接口路径: (请求数, 时间窗口秒)}，覆盖DEFAULT_LIMITS中的同名项
+            default_limit: 未配置接口的默认限速
+            global_limit: 所有接口共享的总限速 (请求数, 时间窗口秒)，None表示不限
+        """
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.default_limit = default_limit
+        self._global = TokenBucket(*global_limit) if global_limit else None
+        self._buckets = {}
+        self._waiting = {}  # ticket -> (path, cost)
+        self._seq = itertools.count()
+        self._stats = {}
+        self._cond = threading.Condition()
+
+    def set_limit(self, path, count, per_seconds):
+        """修改某个接口的限速"""
+        with self._cond:
+            self.limits[path] = (count, per_seconds)
+            self._buckets.pop(path, None)
+
+    def _bucket(self, path):
+        bucket = self._buckets.get(path)
+        if bucket is None:
+            bucket = TokenBucket(*self.limits.get(path, self.default_limit))
+            self._buckets[path] = bucket
+        return bucket
+
+    def _path_stats(self, path):
+        stats = self._stats.get(path)
+        if stats is None:
+            stats = {'requests': 0, 'throttled': 0, 'rejected': 0,
+                     'queued_time': 0.0, 'max_queued_time': 0.0}
+            self._stats[path] = stats
+        return stats
+
+    def _try_acquire(self, ticket, path, cost):
+        """
+        尝试为ticket取令牌，调用方需持有锁
+
+        返回:
+            0表示已取得令牌，否则为建议的等待秒数
+        """
+        now = time.monotonic()
+        bucket = self._bucket(path)
+        bucket.refill(now)
+        wait = bucket.wait_time(cost)
+        if self._global is not None:
+            self._global.refill(now)
+            wait = max(wait, self._global.wait_time(cost))
+        if wait > 0:
+            return wait
+
+        # 让位于排在前面、争用同一个桶且已经就绪的请求
+        for other, (other_path, other_cost) in self._waiting.items():
+            if other >= ticket:
+                continue
+            if other_path == path:
+                return 0.001
+            if self._global is not None:
+                other_bucket = self._bucket(other_path)
+                other_bucket.refill(now)
+                if other_bucket.wait_time(other_cost) == 0:
+                    return 0.001
+
+        bucket.take(cost)
+        if self._global is not None:
+            self._global.take(cost)
+        return 0.0
+
+    def _enqueue(self, endpoint, priority, cost):
+        path = endpoint_path(endpoint)
+        if priority is None:
+            priority = endpoint_priority(path)
+        ticket = (priority, next(self._seq))
+        self._waiting[ticket] = (path, cost)
+        return ticket, path
+
+    def _finish(self, ticket, path, started):
+        del self._waiting[ticket]
+        queued = time.monotonic() - started
+        stats = self._path_stats(path)
+        stats['requests'] += 1
+        if queued > 0.001:
+            stats['throttled'] += 1
+        stats['queued_time'] += queued
+        stats['max_queued_time'] = max(stats['max_queued_time'], queued)
+        self._cond.notify_all()
+
+    def acquire(self, endpoint, priority=None, cost=1):
+        """
+        阻塞直到可以发送请求
+
+        参数:
+            endpoint: 接口路径（可带查询字符串）
+            priority: 优先级通道，None时按接口路径自动判断
+            cost: 消耗的令牌数（批量接口按订单数计）
+        """
+        started = time.monotonic()
+        with self._cond:
+            ticket, path = self._enqueue(endpoint, priority, cost)
+            try:
+                while True:
+                    wait = self._try_acquire(ticket, path, cost)
+                    if wait == 0:
+                        break
+                    self._cond.wait(wait)
+            finally:
+                self._finish(ticket, path, started)
+
+    async def acquire_async(self, endpoint, priority=None, cost=1):
+        """acquire的协程版本，等待时不阻塞事件循环"""
+        import asyncio  # 同步脚本不需要asyncio，延迟导入以加快启动
+
+        started = time.monotonic()
+        with self._cond:
+            ticket, path = self._enqueue(endpoint, priority, cost)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_acquire(ticket, path, cost)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            with self._cond:
+                self._finish(ticket, path, started)
+
+    def record_rejected(self, endpoint):
+        """记录一次被服务端限流拒绝的请求"""
+        with self._cond:
+            self._path_stats(endpoint_path(endpoint))['rejected'] += 1
+
+    def stats(self):
+        """
+        获取限流统计
+
+        返回:
+            dict: {接口路径: {requests, throttled, rejected, queued_time, max_queued_time}}
+        """
+        with self._cond:
+            return {path: dict(stats) for path, stats in self._stats.items()}
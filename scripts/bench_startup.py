@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+脚本启动耗时基准
+在本地模拟器上多次运行close_all_positions.py，测量从启动进程到模拟器收到第一个请求的时间（time-to-first-request）
+紧急平仓时启动耗时就是延迟
+
+运行:
+    python3 scripts/bench_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from simulator.exchange import ExchangeServer, create_default_exchange
+
+def run_once(server, script, env):
+    """运行一次脚本，返回(首个请求耗时, 总耗时)，单位秒"""
+    server.first_request_at = None
+    start = time.monotonic()
+    subprocess.run([sys.executable, script], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    total = time.monotonic() - start
+    first = server.first_request_at - start if server.first_request_at is not None else None
+    return first, total
+
+def main():
+    parser = argparse.ArgumentParser(description='脚本启动耗时基准')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--script', default=os.path.join(project_root, 'scripts', 'close_all_positions.py'))
+    args = parser.parse_args()
+
+    exchange = create_default_exchange(step_interval=0)
+    server = ExchangeServer(exchange)
+    env = dict(os.environ, OKX_BASE_URL=server.start())
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (project_root, env.get('PYTHONPATH')) if p)
+    try:
+        # 解释器本身的启动耗时作为基线
+        baseline = []
+        for _ in range(args.runs):
+            start = time.monotonic()
+            subprocess.run([sys.executable, '-c', 'pass'], check=False)
+            baseline.append(time.monotonic() - start)
+
+        firsts, totals = [], []
+        for _ in range(args.runs):
+            # 每次都放一个多仓，让脚本走完整的平仓流程
+            exchange.positions[('BTC-USDT-SWAP', 'long')] = {'pos': 1.0, 'avgPx': exchange.last_price('BTC-USDT-SWAP')}
+            first, total = run_once(server, args.script, env)
+            if first is None:
+                print("❌ 脚本没有发出请求")
+                return
+            firsts.append(first)
+            totals.append(total)
+    finally:
+        server.stop()
+
+    print(f"📊 {os.path.basename(args.script)} ({args.runs}次)")
+    print(f"   解释器启动:   中位数 {statistics.median(baseline) * 1000:.1f}ms")
+    print(f"   首个请求:     中位数 {statistics.median(firsts) * 1000:.1f}ms  最小 {min(firsts) * 1000:.1f}ms")
+    print(f"   总耗时:       中位数 {statistics.median(totals) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 """
 账户余额检查工具
 """
-from okx_http_client import client
+from okx_http_client import get_client
 from config import DEFAULT_INST_ID
 
 def check_balance():
     """检查账户余额"""
+    client = get_client()
     print("=== OKX账户余额检查 ===")
     
     # 获取账户余额
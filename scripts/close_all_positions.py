@@ -10,22 +10,27 @@ from datetime import datetime
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
-from okx_http_client import client
+from okx_http_client import get_client
 
 def close_all_positions():
     """全平所有仓位"""
+    client = get_client()
     print("🚀 全平所有仓位")
     print("="*50)
     
     print("\n📈 获取市场数据...")
     try:
-        # 获取当前价格
-        result = client.get_candles("BTC-USDT-SWAP", "15m", "1")
-        if result and result.get('code') == '0':
-            data = result['data'][0]
-            # 数据格式: [timestamp, open, high, low, close, vol, volCcy, volCcy2, confirm]
-            current_price = float(data[4])  # close价格在第5个位置
-            print(f"当前BTC价格: ${current_price:.2f}")
+        # 获取深度快照，按实际挂单量定价（请求先发出，之后才导入numpy）
+        result = client.get_order_book("BTC-USDT-SWAP", sz=50)
+        if result and result.get('code') == '0' and result['data']:
+            from market_data.order_book import OrderBook
+            book = OrderBook("BTC-USDT-SWAP")
+            book.apply_snapshot(result['data'][0])
+            current_price = book.mid()
+            if current_price is None:
+                print("❌ 深度数据为空")
+                return
+            print(f"当前BTC价格: ${current_price:.2f} (买一 {book.best_bid()[0]} / 卖一 {book.best_ask()[0]})")
         else:
             print("❌ 无法获取市场数据")
             return
@@ -56,11 +61,14 @@ def close_all_positions():
             print("✅ 无持仓")
             return
 
-        # 平多仓
+        # 多空两腿合并为一次批量请求
+        orders = []
+        legs = []
         if long_sz > 0:
-            limit_price = str(round(current_price * 0.999, 2))
+            px = book.limit_price("sell", long_sz)
+            limit_price = str(px) if px is not None else str(round(current_price * 0.999, 2))
             print(f"平多仓数量: {long_sz} 张, 限价: ${limit_price}")
-            res = client.place_futures_order(
+            orders.append(client.build_futures_order(
                 inst_id="BTC-USDT-SWAP",
                 side="sell",
                 ord_type="limit",
@@ -68,19 +76,16 @@ def close_all_positions():
                 px=limit_price,
                 td_mode="cross",
                 pos_side="long"
-            )
-            if res and res.get('code') == '0':
-                print("✅ 平多仓成功!")
-            else:
-                print(f"⚠️ 平多仓失败: {res}")
+            ))
+            legs.append("平多仓")
         else:
             print("✅ 无多仓需要平")
 
-        # 平空仓
         if short_sz > 0:
-            limit_price = str(round(current_price * 1.001, 2))
+            px = book.limit_price("buy", short_sz)
+            limit_price = str(px) if px is not None else str(round(current_price * 1.001, 2))
             print(f"平空仓数量: {short_sz} 张, 限价: ${limit_price}")
-            res = client.place_futures_order(
+            orders.append(client.build_futures_order(
                 inst_id="BTC-USDT-SWAP",
                 side="buy",
                 ord_type="limit",
@@ -88,14 +93,19 @@ def close_all_positions():
                 px=limit_price,
                 td_mode="cross",
                 pos_side="short"
-            )
-            if res and res.get('code') == '0':
-                print("✅ 平空仓成功!")
-            else:
-                print(f"⚠️ 平空仓失败: {res}")
+            ))
+            legs.append("平空仓")
         else:
             print("✅ 无空仓需要平")
 
+        if orders:
+            res = client.place_batch_orders(orders)
+            for leg, item in zip(legs, res['data']):
+                if item.get('sCode') == '0':
+                    print(f"✅ {leg}成功!")
+                else:
+                    print(f"⚠️ {leg}失败: {item}")
+
     except Exception as e:
         print(f"⚠️ 平仓异常: {e}")
 
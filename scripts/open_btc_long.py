@@ -61,18 +61,9 @@ def open_btc_long():
     
     # 获取合约规格
     inst_id = "BTC-USDT-SWAP"
-    insts = client.get_instruments("SWAP")
-    ct_val = 0.01
-    lot_sz = 1.0
-    if insts and insts.get('code') == '0':
-        for it in insts['data']:
-            if it.get('instId') == inst_id:
-                try:
-                    ct_val = float(it.get('ctVal', ct_val))
-                    lot_sz = float(it.get('lotSz', lot_sz))
-                except Exception:
-                    pass
-                break
+    specs = client.get_instrument_cache("SWAP")
+    ct_val = specs.contract_value(inst_id, 0.01)
+    lot_sz = specs.lot_size(inst_id, 1.0)
     print(f"合约面值 ctVal: {ct_val} BTC, lotSz: {lot_sz}")
 
     target_btc = amount / current_price
@@ -61,18 +61,9 @@ def open_btc_short():
     
     # 获取合约规格用于换算张数
     inst_id = "BTC-USDT-SWAP"
-    insts = client.get_instruments("SWAP")
-    ct_val = 0.01  # 默认每张面值 0.01 BTC（兜底）
-    lot_sz = 1.0   # 默认下单步长 1 张
-    if insts and insts.get('code') == '0':
-        for it in insts['data']:
-            if it.get('instId') == inst_id:
-                try:
-                    ct_val = float(it.get('ctVal', ct_val))
-                    lot_sz = float(it.get('lotSz', lot_sz))
-                except Exception:
-                    pass
-                break
+    specs = client.get_instrument_cache("SWAP")
+    ct_val = specs.contract_value(inst_id, 0.01)  # 默认每张面值 0.01 BTC（兜底）
+    lot_sz = specs.lot_size(inst_id, 1.0)         # 默认下单步长 1 张
     print(f"合约面值 ctVal: {ct_val} { 'BTC' }")
     print(f"下单步长 lotSz: {lot_sz} 张")
 
@@ -0,0 +1,4 @@
+"""
+本地模拟环境
+离线测试用的OKX替身服务
+"""
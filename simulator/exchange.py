@@ -0,0 +1,573 @@
+"""
+本地OKX交易所模拟器
+实现客户端用到的REST接口（行情、深度、K线、产品、余额、持仓、下单、撤单、杠杆），
+校验签名，按回放的K线推进价格并撮合订单，可注入延迟和错误
+把OKXHTTPClient的base_url指向它即可离线跑通整条链路并做压测
+
+运行:
+    python3 -m simulator.exchange --port 8900 --step 1.0
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# 默认产品规格（与OKX BTC-USDT-SWAP一致）
+DEFAULT_SPEC = {'ctVal': '0.01', 'lotSz': '0.01', 'minSz': '0.01', 'tickSz': '0.1', 'ctValCcy': 'BTC', 'settleCcy': 'USDT'}
+
+# 吃单手续费率
+TAKER_FEE = 0.0005
+
+def random_walk_candles(n=2000, start_price=100000.0, bar_ms=15 * 60 * 1000, volatility=0.002, seed=0, end_ts=None):
+    """
+    生成随机游走K线，用于没有录制数据时的回放
+
+    返回:
+        list: [[ts, open, high, low, close, vol], ...] 时间升序
+    """
+    rng = random.Random(seed)
+    if end_ts is None:
+        end_ts = int(time.time() * 1000)
+    end_ts -= end_ts % bar_ms
+    ts = end_ts - (n - 1) * bar_ms
+    price = start_price
+    candles = []
+    for _ in range(n):
+        open_price = price
+        close_price = open_price * (1 + rng.gauss(0, volatility))
+        high = max(open_price, close_price) * (1 + abs(rng.gauss(0, volatility / 2)))
+        low = min(open_price, close_price) * (1 - abs(rng.gauss(0, volatility / 2)))
+        candles.append([ts, round(open_price, 1), round(high, 1), round(low, 1), round(close_price, 1),
+                        round(rng.uniform(500, 3000), 2)])
+        price = close_price
+        ts += bar_ms
+    return candles
+
+class SimulatedExchange:
+    """
+    交易所状态与撮合逻辑
+
+    每个(instId, bar)一条回放K线序列，回放游标随时间推进（每step_interval秒前进一根），
+    游标所在K线视为未确认的当前K线，最新价为其收盘价
+    """
+
+    def __init__(self, series, api_key='', secret_key='', passphrase='', step_interval=1.0,
+                 start_index=200, balance=100000.0, specs=None, verify_sign=True):
+        """
+        参数:
+            series: {(inst_id, bar): [[ts, o, h, l, c, vol], ...]}，时间升序
+            api_key, secret_key, passphrase: 签名校验使用的凭证
+            step_interval: 每根K线回放的墙钟秒数，0表示只能通过advance()推进
+            start_index: 起始游标，之前的K线作为历史数据
+            balance: 初始USDT余额
+            specs: {inst_id: 产品规格}，未提供时使用DEFAULT_SPEC
+            verify_sign: 是否校验私有接口签名
+        """
+        self.series = series
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.passphrase = passphrase
+        self.step_interval = step_interval
+        self.verify_sign = verify_sign
+        self.specs = specs or {}
+        self.balance = balance
+        self.leverage = {}
+        self.positions = {}   # (inst_id, pos_side) -> {'pos': 张数, 'avgPx': 均价}
+        self.orders = {}      # ord_id -> 订单
+        self._next_ord_id = 1
+        self._start_index = start_index
+        self._manual_steps = 0
+        self._cursor = None
+        self._t0 = time.monotonic()
+        self._lock = threading.RLock()
+        self._sync()
+
+    # ---------- 价格回放 ----------
+
+    def _primary_series(self, inst_id):
+        for (series_inst, bar), candles in self.series.items():
+            if series_inst == inst_id:
+                return candles
+        return None
+
+    def _target_cursor(self):
+        steps = self._manual_steps
+        if self.step_interval:
+            steps += int((time.monotonic() - self._t0) / self.step_interval)
+        return steps
+
+    def _sync(self):
+        """推进回放游标，并用新经过的K线撮合挂单"""
+        target = self._target_cursor()
+        if self._cursor is not None and target <= self._cursor:
+            return
+        previous = self._cursor
+        self._cursor = target
+        if previous is None:
+            return
+        for order in list(self.orders.values()):
+            if order['state'] != 'live':
+                continue
+            candles = self._primary_series(order['instId'])
+            for step in range(previous + 1, target + 1):
+                bar = candles[self._index(candles, step)]
+                if self._limit_crossed(order, bar[2], bar[3]):
+                    self._fill(order, float(order['px']))
+                    break
+
+    def _index(self, candles, cursor=None):
+        cursor = self._cursor if cursor is None else cursor
+        return min(self._start_index + cursor, len(candles) - 1)
+
+    def advance(self, steps=1):
+        """手动推进回放K线"""
+        with self._lock:
+            self._manual_steps += steps
+            self._sync()
+
+    def last_price(self, inst_id):
+        candles = self._primary_series(inst_id)
+        return float(candles[self._index(candles)][4])
+
+    # ---------- 订单与持仓 ----------
+
+    def spec(self, inst_id):
+        return self.specs.get(inst_id, DEFAULT_SPEC)
+
+    @staticmethod
+    def _limit_crossed(order, high, low):
+        px = float(order['px'])
+        return low <= px if order['side'] == 'buy' else high >= px
+
+    def place_order(self, request):
+        """下单，返回单个订单结果(sCode/sMsg/ordId/clOrdId)"""
+        inst_id = request.get('instId')
+        result = {'clOrdId': request.get('clOrdId', ''), 'ordId': '', 'tag': '', 'sCode': '0', 'sMsg': ''}
+        if self._primary_series(inst_id) is None:
+            result.update(sCode='51001', sMsg='Instrument ID does not exist')
+            return result
+        try:
+            sz = float(request['sz'])
+            px = float(request['px']) if request.get('px') else None
+        except (KeyError, ValueError):
+            result.update(sCode='51000', sMsg='Parameter sz/px error')
+            return result
+
+        lot_sz = float(self.spec(inst_id)['lotSz'])
+        if sz <= 0 or abs(sz / lot_sz - round(sz / lot_sz)) > 1e-9:
+            result.update(sCode='51121', sMsg='Order quantity must be a multiple of the lot size')
+            return result
+        if request.get('ordType') == 'limit' and px is None:
+            result.update(sCode='51000', sMsg='Parameter px error')
+            return result
+
+        side = request.get('side')
+        pos_side = request.get('posSide', 'net')
+        if not self._can_reduce(inst_id, side, pos_side, sz):
+            result.update(sCode='51169', sMsg="Order failed because you don't have any positions in this direction")
+            return result
+
+        ord_id = str(self._next_ord_id)
+        self._next_ord_id += 1
+        order = {
+            'ordId': ord_id,
+            'clOrdId': request.get('clOrdId', ''),
+            'instId': inst_id,
+            'side': side,
+            'posSide': pos_side,
+            'ordType': request.get('ordType'),
+            'tdMode': request.get('tdMode', 'cross'),
+            'sz': request['sz'],
+            'px': request.get('px', ''),
+            'state': 'live',
+            'accFillSz': '0',
+            'avgPx': '',
+            'cTime': str(int(time.time() * 1000))
+        }
+        self.orders[ord_id] = order
+
+        last = self.last_price(inst_id)
+        if order['ordType'] == 'market':
+            self._fill(order, last)
+        elif self._limit_crossed(order, last, last):
+            self._fill(order, last)
+        result['ordId'] = ord_id
+        return result
+
+    def _closing_size(self, inst_id, side, pos_side):
+        """开仓方向返回-1，平仓方向返回可平数量"""
+        if pos_side == 'long':
+            return -1 if side == 'buy' else self.positions.get((inst_id, 'long'), {}).get('pos', 0.0)
+        if pos_side == 'short':
+            return -1 if side == 'sell' else self.positions.get((inst_id, 'short'), {}).get('pos', 0.0)
+        return -1  # 单向持仓模式下任意方向都可以下单
+
+    def _can_reduce(self, inst_id, side, pos_side, sz):
+        closable = self._closing_size(inst_id, side, pos_side)
+        return closable < 0 or closable + 1e-12 >= sz
+
+    def _fill(self, order, price):
+        inst_id = order['instId']
+        sz = float(order['sz'])
+        ct_val = float(self.spec(inst_id)['ctVal'])
+        side = order['side']
+        pos_side = order['posSide']
+        signed = sz if side == 'buy' else -sz
+        if pos_side == 'short':
+            signed = -signed  # 空头持仓以正数张数记录
+
+        key = (inst_id, pos_side)
+        position = self.positions.setdefault(key, {'pos': 0.0, 'avgPx': 0.0})
+        direction = -1.0 if pos_side == 'short' else 1.0
+        current = position['pos']
+        new_pos = current + signed
+
+        if current == 0 or (current > 0) == (signed > 0):
+            # 开仓/加仓
+            position['avgPx'] = (position['avgPx'] * abs(current) + price * abs(signed)) / abs(new_pos)
+        else:
+            # 减仓/平仓，反手部分按成交价开新仓
+            closed = min(abs(signed), abs(current))
+            sign = 1.0 if current > 0 else -1.0
+            self.balance += (price - position['avgPx']) * closed * ct_val * sign * direction
+            if abs(signed) > abs(current):
+                position['avgPx'] = price
+        position['pos'] = round(new_pos, 10)
+        if position['pos'] == 0:
+            del self.positions[key]
+
+        self.balance -= price * sz * ct_val * TAKER_FEE
+        order.update(state='filled', accFillSz=order['sz'], avgPx=str(price), fillPx=str(price))
+
+    def cancel_order(self, request):
+        result = {'clOrdId': request.get('clOrdId', ''), 'ordId': request.get('ordId', ''), 'sCode': '0', 'sMsg': ''}
+        order = self.orders.get(request.get('ordId', ''))
+        if order is None and request.get('clOrdId'):
+            order = next((o for o in self.orders.values() if o['clOrdId'] == request['clOrdId']), None)
+        if order is None:
+            result.update(sCode='51400', sMsg='Order cancellation failed as the order does not exist')
+        elif order['state'] != 'live':
+            result.update(sCode='51402', sMsg='Order cancellation failed as the order has been completed')
+        else:
+            order['state'] = 'canceled'
+            result['ordId'] = order['ordId']
+        return result
+
+    def amend_order(self, request):
+        result = {'clOrdId': request.get('clOrdId', ''), 'ordId': request.get('ordId', ''), 'sCode': '0', 'sMsg': ''}
+        order = self.orders.get(request.get('ordId', ''))
+        if order is None or order['state'] != 'live':
+            result.update(sCode='51503', sMsg='Order modification failed as the order does not exist')
+            return result
+        if request.get('newSz'):
+            order['sz'] = request['newSz']
+        if request.get('newPx'):
+            order['px'] = request['newPx']
+        last = self.last_price(order['instId'])
+        if self._limit_crossed(order, last, last):
+            self._fill(order, last)
+        return result
+
+    # ---------- 接口 ----------
+
+    def handle(self, method, path, query, body):
+        """处理一次请求，返回 (HTTP状态码, 响应dict)"""
+        with self._lock:
+            self._sync()
+            route = ROUTES.get((method, path))
+            if route is None:
+                return 404, {'code': '50000', 'msg': f'Unknown endpoint {method} {path}', 'data': []}
+            return 200, route(self, query, body)
+
+    def _ticker(self, query, body):
+        inst_id = query.get('instId')
+        candles = self._primary_series(inst_id)
+        if candles is None:
+            return {'code': '51001', 'msg': 'Instrument ID does not exist', 'data': []}
+        bar = candles[self._index(candles)]
+        last = str(bar[4])
+        tick = float(self.spec(inst_id)['tickSz'])
+        return {'code': '0', 'msg': '', 'data': [{
+            'instType': 'SWAP', 'instId': inst_id, 'last': last, 'lastSz': '1',
+            'askPx': str(round(bar[4] + tick, 8)), 'askSz': '10', 'bidPx': last, 'bidSz': '10',
+            'open24h': str(bar[1]), 'high24h': str(bar[2]), 'low24h': str(bar[3]),
+            'vol24h': str(bar[5]), 'ts': str(int(time.time() * 1000))
+        }]}
+
+    def _books(self, query, body):
+        """以最新价为中心生成合成深度：每档一个tick，数量随档位递增"""
+        inst_id = query.get('instId')
+        if self._primary_series(inst_id) is None:
+            return {'code': '51001', 'msg': 'Instrument ID does not exist', 'data': []}
+        depth = min(int(query.get('sz', 1)), 400)
+        tick = float(self.spec(inst_id)['tickSz'])
+        last = round(self.last_price(inst_id) / tick) * tick
+        decimals = max(0, -int(math.floor(math.log10(tick))))
+        asks = [[f'{last + (i + 1) * tick:.{decimals}f}', f'{0.5 + i * 0.25:g}', '0', str(1 + i % 5)] for i in range(depth)]
+        bids = [[f'{last - i * tick:.{decimals}f}', f'{0.5 + i * 0.25:g}', '0', str(1 + i % 5)] for i in range(depth)]
+        return {'code': '0', 'msg': '', 'data': [{'asks': asks, 'bids': bids, 'ts': str(int(time.time() * 1000))}]}
+
+    def _candles(self, query, body, max_limit=300):
+        inst_id = query.get('instId')
+        bar = query.get('bar', '1m')
+        candles = self.series.get((inst_id, bar))
+        if candles is None:
+            return {'code': '51000', 'msg': f'Parameter bar error: {inst_id} {bar}', 'data': []}
+        end = self._index(candles) + 1
+        visible = candles[:end]
+        if query.get('after'):
+            after = int(query['after'])
+            visible = [c for c in visible if c[0] < after]
+        if query.get('before'):
+            before = int(query['before'])
+            visible = [c for c in visible if c[0] > before]
+        limit = min(int(query.get('limit', 100)), max_limit)
+        rows = []
+        for c in reversed(visible[-limit:] if not query.get('before') else visible[:limit]):
+            confirm = '0' if c is candles[end - 1] else '1'
+            vol_ccy = round(c[5] * float(self.spec(inst_id)['ctVal']), 8)
+            rows.append([str(c[0]), str(c[1]), str(c[2]), str(c[3]), str(c[4]), str(c[5]),
+                         str(vol_ccy), str(round(vol_ccy * c[4], 2)), confirm])
+        return {'code': '0', 'msg': '', 'data': rows}
+
+    def _history_candles(self, query, body):
+        return self._candles(query, body, max_limit=100)
+
+    def _instruments(self, query, body):
+        inst_type = query.get('instType', 'SWAP')
+        inst_ids = sorted({inst_id for inst_id, _ in self.series})
+        data = [dict(self.spec(inst_id), instId=inst_id, instType=inst_type, state='live') for inst_id in inst_ids]
+        return {'code': '0', 'msg': '', 'data': data}
+
+    def _balance(self, query, body):
+        equity = self.balance + sum(self._upl(inst_id, pos_side, p) for (inst_id, pos_side), p in self.positions.items())
+        detail = {'ccy': 'USDT', 'availBal': f'{self.balance:.8f}', 'cashBal': f'{self.balance:.8f}', 'eq': f'{equity:.8f}'}
+        return {'code': '0', 'msg': '', 'data': [{'totalEq': f'{equity:.8f}', 'details': [detail]}]}
+
+    def _upl(self, inst_id, pos_side, position):
+        ct_val = float(self.spec(inst_id)['ctVal'])
+        direction = -1.0 if pos_side == 'short' else 1.0
+        return (self.last_price(inst_id) - position['avgPx']) * position['pos'] * ct_val * direction
+
+    def _positions(self, query, body):
+        inst_id = query.get('instId')
+        data = []
+        for (pos_inst, pos_side), position in self.positions.items():
+            if inst_id and pos_inst != inst_id:
+                continue
+            data.append({
+                'instId': pos_inst, 'instType': 'SWAP', 'posSide': pos_side, 'mgnMode': 'cross',
+                'pos': str(position['pos']), 'avgPx': str(position['avgPx']),
+                'markPx': str(self.last_price(pos_inst)),
+                'upl': str(self._upl(pos_inst, pos_side, position)),
+                'lever': str(self.leverage.get(pos_inst, 1))
+            })
+        return {'code': '0', 'msg': '', 'data': data}
+
+    @staticmethod
+    def _batch_response(results):
+        ok = sum(1 for r in results if r['sCode'] == '0')
+        code = '0' if ok == len(results) else ('1' if ok == 0 else '2')
+        return {'code': code, 'msg': '', 'data': results}
+
+    def _order(self, query, body):
+        return self._batch_response([self.place_order(body)])
+
+    def _batch_orders(self, query, body):
+        if len(body) > 20:
+            return {'code': '51000', 'msg': 'Parameter error: max 20 orders', 'data': []}
+        return self._batch_response([self.place_order(o) for o in body])
+
+    def _cancel_order(self, query, body):
+        return self._batch_response([self.cancel_order(body)])
+
+    def _cancel_batch_orders(self, query, body):
+        return self._batch_response([self.cancel_order(o) for o in body])
+
+    def _amend_batch_orders(self, query, body):
+        return self._batch_response([self.amend_order(o) for o in body])
+
+    def _orders_pending(self, query, body):
+        data = [o for o in self.orders.values() if o['state'] == 'live'
+                and (not query.get('instId') or o['instId'] == query['instId'])]
+        return {'code': '0', 'msg': '', 'data': data}
+
+    def _orders_history(self, query, body):
+        data = [o for o in self.orders.values() if o['state'] != 'live'
+                and (not query.get('instId') or o['instId'] == query['instId'])]
+        return {'code': '0', 'msg': '', 'data': data}
+
+    def _set_leverage(self, query, body):
+        self.leverage[body['instId']] = int(float(body['lever']))
+        return {'code': '0', 'msg': '', 'data': [{
+            'instId': body['instId'], 'lever': body['lever'],
+            'mgnMode': body.get('mgnMode', 'cross'), 'posSide': body.get('posSide', 'net')
+        }]}
+
+    def check_sign(self, method, request_path, body, headers):
+        """校验OKX签名，返回错误响应或None"""
+        if headers.get('OK-ACCESS-KEY') != self.api_key or headers.get('OK-ACCESS-PASSPHRASE') != self.passphrase:
+            return {'code': '50111', 'msg': 'Invalid OK-ACCESS-KEY', 'data': []}
+        message = headers.get('OK-ACCESS-TIMESTAMP', '') + method + request_path + body
+        expected = base64.b64encode(hmac.new(self.secret_key.encode('utf-8'), message.encode('utf-8'),
+                                             hashlib.sha256).digest()).decode('utf-8')
+        if not hmac.compare_digest(expected, headers.get('OK-ACCESS-SIGN', '')):
+            return {'code': '50113', 'msg': 'Invalid Sign', 'data': []}
+        return None
+
+ROUTES = {
+    ('GET', '/api/v5/market/ticker'): SimulatedExchange._ticker,
+    ('GET', '/api/v5/market/books'): SimulatedExchange._books,
+    ('GET', '/api/v5/market/candles'): SimulatedExchange._candles,
+    ('GET', '/api/v5/market/history-candles'): SimulatedExchange._history_candles,
+    ('GET', '/api/v5/public/instruments'): SimulatedExchange._instruments,
+    ('GET', '/api/v5/account/balance'): SimulatedExchange._balance,
+    ('GET', '/api/v5/account/positions'): SimulatedExchange._positions,
+    ('POST', '/api/v5/account/set-leverage'): SimulatedExchange._set_leverage,
+    ('POST', '/api/v5/trade/order'): SimulatedExchange._order,
+    ('POST', '/api/v5/trade/batch-orders'): SimulatedExchange._batch_orders,
+    ('POST', '/api/v5/trade/cancel-order'): SimulatedExchange._cancel_order,
+    ('POST', '/api/v5/trade/cancel-batch-orders'): SimulatedExchange._cancel_batch_orders,
+    ('POST', '/api/v5/trade/amend-batch-orders'): SimulatedExchange._amend_batch_orders,
+    ('GET', '/api/v5/trade/orders-pending'): SimulatedExchange._orders_pending,
+    ('GET', '/api/v5/trade/orders-history'): SimulatedExchange._orders_history,
+}
+
+# 需要签名的私有接口前缀
+PRIVATE_PREFIXES = ('/api/v5/account/', '/api/v5/trade/')
+
+class ExchangeServer:
+    """HTTP服务器，支持延迟与错误注入"""
+
+    def __init__(self, exchange, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        """
+        参数:
+            exchange: SimulatedExchange实例
+            latency: 每个请求额外增加的延迟(秒)
+            jitter: 延迟的随机抖动上限(秒)
+            error_rate: 随机返回HTTP 503的概率
+        """
+        self.exchange = exchange
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.first_request_at = None  # 第一个请求到达的time.monotonic()，用于测量客户端启动耗时
+        self._rng = random.Random(seed)
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头和响应体分两次写出，关闭Nagle避免与客户端延迟ACK叠加出约40ms的等待
+            disable_nagle_algorithm = True
+
+            def _respond(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, method):
+                if server.first_request_at is None:
+                    server.first_request_at = time.monotonic()
+                server.requests += 1
+                length = int(self.headers.get('Content-Length') or 0)
+                raw_body = self.rfile.read(length).decode('utf-8') if length else ''
+
+                delay = server.latency + (server._rng.uniform(0, server.jitter) if server.jitter else 0.0)
+                if delay:
+                    time.sleep(delay)
+                if server.error_rate and server._rng.random() < server.error_rate:
+                    self._respond(503, {'code': '50001', 'msg': 'Service temporarily unavailable', 'data': []})
+                    return
+
+                parts = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                exchange = server.exchange
+                if exchange.verify_sign and parts.path.startswith(PRIVATE_PREFIXES):
+                    error = exchange.check_sign(method, self.path, raw_body, self.headers)
+                    if error:
+                        self._respond(401, error)
+                        return
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                except json.JSONDecodeError:
+                    self._respond(400, {'code': '50002', 'msg': 'Invalid JSON body', 'data': []})
+                    return
+                status, payload = exchange.handle(method, parts.path, query, body)
+                self._respond(status, payload)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """在后台线程中启动，返回base_url"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='okx-simulator', daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+def create_default_exchange(inst_ids=('BTC-USDT-SWAP',), bars=('15m', '1H'), **kwargs):
+    """用随机游走K线和config中的凭证创建模拟交易所"""
+    from config import API_KEY, SECRET_KEY, PASSPHRASE
+    from market_data.bars import bar_to_ms
+
+    series = {}
+    for i, inst_id in enumerate(inst_ids):
+        for bar in bars:
+            series[(inst_id, bar)] = random_walk_candles(bar_ms=bar_to_ms(bar), seed=i)
+    return SimulatedExchange(series, API_KEY, SECRET_KEY, PASSPHRASE, **kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description='本地OKX交易所模拟器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--step', type=float, default=1.0, help='每根K线回放的秒数')
+    parser.add_argument('--latency', type=float, default=0.0, help='注入延迟(秒)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟抖动(秒)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机503错误概率')
+    args = parser.parse_args()
+
+    exchange = create_default_exchange(step_interval=args.step)
+    server = ExchangeServer(exchange, args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"🔧 OKX模拟器: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n模拟器已停止")
+
+if __name__ == "__main__":
+    main()
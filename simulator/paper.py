@@ -0,0 +1,52 @@
+"""
+纸面下单客户端
+接口与OKXHTTPClient的下单/余额/产品规格部分一致，但不发出任何请求：订单只记录在本地并立即视为成交，
+供回放录制行情时代替真实客户端，同一份录制多次回放得到相同的订单序列
+"""
+import itertools
+from okx_instruments import InstrumentCache
+
+class PaperClient:
+    """只记录订单的客户端"""
+
+    def __init__(self, balance=10000.0, specs=None):
+        """
+        参数:
+            balance: get_account_balance返回的USDT余额
+            specs: {inst_id: 产品规格}（格式同simulator.exchange.DEFAULT_SPEC），未列出的产品查不到，调用方使用自己的默认值
+        """
+        self.balance = balance
+        self.specs = specs or {}
+        self.orders = []  # 按下单顺序记录的订单参数
+        self._ord_ids = itertools.count(1)
+        self._instrument_caches = {}
+
+    def _accept(self, order):
+        ord_id = str(next(self._ord_ids))
+        order = dict(order, ordId=ord_id)
+        self.orders.append(order)
+        return {'code': '0', 'msg': '', 'data': [{'ordId': ord_id, 'clOrdId': '', 'sCode': '0', 'sMsg': ''}]}
+
+    def place_order(self, inst_id, side, ord_type, sz, px=None):
+        """下单（现货）"""
+        return self._accept({'instId': inst_id, 'tdMode': 'cash', 'side': side, 'ordType': ord_type,
+                             'sz': str(sz), 'px': px})
+
+    def place_futures_order(self, inst_id, side, ord_type, sz, px=None, td_mode='cross', pos_side='net'):
+        """下期货订单"""
+        return self._accept({'instId': inst_id, 'tdMode': td_mode, 'side': side, 'ordType': ord_type,
+                             'sz': str(sz), 'px': px, 'posSide': pos_side})
+
+    def get_account_balance(self, ccy=None):
+        """固定余额"""
+        return {'code': '0', 'data': [{'details': [{'ccy': 'USDT', 'availBal': str(self.balance),
+                                                    'cashBal': str(self.balance), 'eq': str(self.balance)}]}]}
+
+    def get_instrument_cache(self, inst_type="SWAP", ttl=3600):
+        """只包含specs的产品规格缓存，不会访问接口"""
+        cache = self._instrument_caches.get(inst_type)
+        if cache is None:
+            cache = InstrumentCache(None, inst_type, ttl=ttl, background=False)
+            cache.load({'code': '0', 'data': [dict(spec, instId=inst_id) for inst_id, spec in self.specs.items()]})
+            self._instrument_caches[inst_type] = cache
+        return cache
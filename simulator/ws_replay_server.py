@@ -0,0 +1,142 @@
+"""
+本地WebSocket回放服务器
+模拟OKX v5公共频道：响应subscribe/ping，把录制的推送消息按订阅回放给客户端
+用于离线测试MarketDataFeed的订阅、重连和缺口处理
+
+运行:
+    python3 -m simulator.ws_replay_server simulator/data/ws_sample.jsonl --port 8765
+"""
+import argparse
+import asyncio
+import json
+import threading
+
+try:
+    import websockets
+except ImportError:  # 可选依赖
+    websockets = None
+
+def load_messages(path):
+    """读取JSONL录制文件，每行一条推送消息"""
+    messages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                messages.append(json.loads(line))
+    return messages
+
+class ReplayServer:
+    """回放录制消息的WebSocket服务器"""
+
+    def __init__(self, messages, host='127.0.0.1', port=0, interval=0.0, drop_after=None):
+        """
+        参数:
+            messages: 推送消息列表（dict，含arg和data）
+            host: 监听地址
+            port: 监听端口，0表示随机端口
+            interval: 相邻两条消息的发送间隔(秒)
+            drop_after: 每个连接发送多少条消息后主动断开，用于测试重连；None表示不断开
+        """
+        if websockets is None:
+            raise ImportError('ReplayServer需要websockets: pip install websockets')
+        self.messages = messages
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.drop_after = drop_after
+        self.connections = 0
+        self._cursor = 0  # 所有连接共享回放进度，重连后从断点继续
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f'ws://{self.host}:{self.port}'
+
+    @staticmethod
+    def _matches(arg, subscriptions):
+        return any(arg.get('channel') == sub.get('channel') and arg.get('instId') == sub.get('instId')
+                   for sub in subscriptions)
+
+    async def _handler(self, ws, *args):
+        self.connections += 1
+        subscriptions = []
+        subscribed = asyncio.Event()
+        sender = asyncio.ensure_future(self._send_loop(ws, subscriptions, subscribed))
+        try:
+            async for raw in ws:
+                if raw == 'ping':
+                    await ws.send('pong')
+                    continue
+                request = json.loads(raw)
+                if request.get('op') == 'subscribe':
+                    for arg in request.get('args', []):
+                        subscriptions.append(arg)
+                        await ws.send(json.dumps({'event': 'subscribe', 'arg': arg, 'connId': str(self.connections)}))
+                    subscribed.set()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            sender.cancel()
+
+    async def _send_loop(self, ws, subscriptions, subscribed):
+        await subscribed.wait()
+        sent = 0
+        while self._cursor < len(self.messages):
+            message = self.messages[self._cursor]
+            self._cursor += 1
+            if not self._matches(message.get('arg', {}), subscriptions):
+                continue
+            await ws.send(json.dumps(message))
+            sent += 1
+            if self.drop_after is not None and sent >= self.drop_after:
+                await ws.close()
+                return
+            if self.interval:
+                await asyncio.sleep(self.interval)
+
+    async def serve(self):
+        """运行服务器直到stop()"""
+        self._loop = asyncio.get_running_loop()
+        self._stop_future = self._loop.create_future()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self.port = list(server.sockets)[0].getsockname()[1]
+            self._ready.set()
+            await self._stop_future
+
+    def start(self):
+        """在后台线程中启动，返回服务器地址"""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.serve()), name='ws-replay', daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+        return self.url
+
+    def stop(self):
+        """停止服务器"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: self._stop_future.done() or self._stop_future.set_result(None))
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+def main():
+    parser = argparse.ArgumentParser(description='OKX WebSocket回放服务器')
+    parser.add_argument('path', help='JSONL录制文件')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--interval', type=float, default=0.1, help='消息间隔(秒)')
+    parser.add_argument('--drop-after', type=int, default=None, help='每个连接发送N条后断开')
+    args = parser.parse_args()
+
+    server = ReplayServer(load_messages(args.path), args.host, args.port, args.interval, args.drop_after)
+    print(f"🔧 回放服务器: ws://{args.host}:{args.port} ({len(server.messages)}条消息)")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\n回放服务器已停止")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""仓库没有打包配置，把根目录加入导入路径，直接运行pytest即可"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,68 @@
+import numpy as np
+from market_data.bars import bar_to_ms
+from market_data.gaps import BackfillScheduler
+
+BAR = '1H'
+BAR_MS = bar_to_ms(BAR)
+START = 1577836800000  # 2020-01-01，早已收盘
+
+
+class EmptyHistoryClient:
+    """交易所也没有数据：history-candles总是返回空"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_history_candles(self, inst_id, bar, limit=100, after=None):
+        self.calls += 1
+        return {'code': '0', 'msg': '', 'data': []}
+
+
+class ArrayStore:
+    def __init__(self, ts):
+        self.root = None
+        self.ts = np.asarray(ts, dtype=np.int64)
+
+    def series(self):
+        return [('BTC-USDT', BAR)]
+
+    def open(self, inst_id, bar):
+        return {'ts': self.ts}
+
+    def write(self, inst_id, bar, rows):
+        raise AssertionError('交易所没有数据，不应写入')
+
+
+def test_unfillable_gap_is_not_requested_again(tmp_path):
+    # 前后各50根K线，中间空出250根，超过一页(100根)
+    ts = np.concatenate((START + np.arange(50) * BAR_MS, START + np.arange(300, 350) * BAR_MS))
+    client = EmptyHistoryClient()
+    store = ArrayStore(ts)
+    store.root = str(tmp_path)
+    scheduler = BackfillScheduler(client, store, max_rate=1000, include_tail=False)
+
+    assert scheduler.scan() == {('BTC-USDT', BAR): 250}
+    assert scheduler.run_pending() == 3
+    assert scheduler._attempted[('BTC-USDT', BAR)] == [(START + 50 * BAR_MS, START + 300 * BAR_MS)]
+
+    calls = client.calls
+    for _ in range(3):
+        scheduler.scan()
+        assert scheduler.run_pending() == 0
+    assert client.calls == calls
+    assert scheduler.requests == 3
+
+
+def test_mark_attempted_merges_ranges():
+    scheduler = BackfillScheduler(EmptyHistoryClient(), ArrayStore([]))
+    key = ('BTC-USDT', BAR)
+    scheduler._mark_attempted(key, 300, 400)
+    scheduler._mark_attempted(key, 100, 200)
+    scheduler._mark_attempted(key, 300, 400)
+    assert scheduler._attempted[key] == [(100, 200), (300, 400)]
+    assert not scheduler._is_attempted(key, 150, 350)
+
+    scheduler._mark_attempted(key, 200, 300)
+    assert scheduler._attempted[key] == [(100, 400)]
+    assert scheduler._is_attempted(key, 150, 350)
+    assert scheduler._untried_end(key, 0, 250) == 100
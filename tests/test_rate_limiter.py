@@ -0,0 +1,43 @@
+"""RateLimiter优先级通道"""
+import threading
+import time
+from okx_rate_limiter import RateLimiter, PRIORITY_MARKET, PRIORITY_TRADE
+
+def _race(limiter, first, second):
+    """first先排队、second后到达，返回完成顺序"""
+    done = []
+
+    def worker(name, endpoint, priority):
+        limiter.acquire(endpoint, priority=priority)
+        done.append(name)
+
+    threads = [threading.Thread(target=worker, args=first), threading.Thread(target=worker, args=second)]
+    threads[0].start()
+    time.sleep(0.05)
+    threads[1].start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return done
+
+def test_trade_preempts_market_on_same_path():
+    limiter = RateLimiter(limits={'/api/v5/x': (1, 0.2)})
+    limiter.acquire('/api/v5/x')  # 用掉唯一的令牌
+    done = _race(limiter, ('market', '/api/v5/x', PRIORITY_MARKET), ('trade', '/api/v5/x', PRIORITY_TRADE))
+    assert done == ['trade', 'market']
+
+def test_trade_preempts_market_across_paths_with_global_limit():
+    limiter = RateLimiter(global_limit=(1, 0.2))
+    limiter.acquire('/api/v5/market/ticker')
+    done = _race(limiter, ('market', '/api/v5/market/candles', None), ('trade', '/api/v5/trade/order', None))
+    assert done == ['trade', 'market']
+
+def test_no_cross_path_preemption_by_default():
+    # 默认各接口独立限速：交易请求不等待，行情请求也不因它推迟，只按自己的桶排队
+    limiter = RateLimiter(limits={'/api/v5/market/candles': (1, 0.2)})
+    limiter.acquire('/api/v5/market/candles')
+    started = time.monotonic()
+    done = _race(limiter, ('market', '/api/v5/market/candles', None), ('trade', '/api/v5/trade/order', None))
+    assert done == ['trade', 'market']
+    assert time.monotonic() - started < 1.0
+    stats = limiter.stats()
+    assert stats['/api/v5/trade/order']['throttled'] == 0
@@ -1,8 +1,23 @@
 """
 交易策略包
 只包含合约交易策略
+
+策略类按需导入，导入包本身不会加载pandas等依赖
 """
+import importlib
+
+# 导出名称 -> 所在子模块
+_EXPORTS = {
+    'BaseStrategy': 'base_strategy',
+    'OptimizedSARStrategy': 'optimized_sar_strategy'
+}
 
-from .enhanced_sar_strategy_contract import EnhancedSARStrategyContract
+__all__ = list(_EXPORTS)
 
-__all__ = ['EnhancedSARStrategyContract']
\ No newline at end of file
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
@@ -2,19 +2,27 @@
 基础策略类
 所有交易策略的基类
 """
-import pandas as pd
 import time
+from datetime import datetime
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 from okx_http_client import OKXHTTPClient
 from config import DEFAULT_INST_ID, DEFAULT_INST_TYPE, TRADING_MODE
-from utils.advanced_indicators import AdvancedIndicators
+from market_data.bars import bar_to_ms
+from market_data.candle_cache import CandleCache
+from market_data.candles import Candles
+from market_data.decode import candles_to_dataframe
 
 class BaseStrategy(ABC):
     """
     策略基类，定义了所有交易策略应实现的基本接口和通用功能。
     """
-    def __init__(self, client: OKXHTTPClient, inst_id: str = DEFAULT_INST_ID, inst_type: str = DEFAULT_INST_TYPE):
+    def __init__(self, client: OKXHTTPClient, inst_id: str = DEFAULT_INST_ID, inst_type: str = DEFAULT_INST_TYPE,
+                 hub=None):
+        """
+        参数:
+            hub: market_data.hub.MarketDataHub，多个策略共享行情时传入同一个实例；None时使用自己的K线缓存
+        """
         self.client = client
         self.inst_id = inst_id
         self.inst_type = inst_type
@@ -22,25 +30,45 @@ class BaseStrategy(ABC):
         self.entry_price: float = 0.0
         self.take_profit_ratio: float = 0.0
         self.stop_loss_ratio: float = 0.0
-        self.indicators = AdvancedIndicators()
+        self.last_price: Optional[float] = None  # 行情推送的最新价格
+        self.order_books: Dict[str, Any] = {}  # inst_id -> 行情推送维护的OrderBook
+        # 增量K线缓存，每次只拉取新K线；共享hub时相同请求在策略间合并
+        self.candle_cache = hub if hub is not None else CandleCache(client)
+        # 回放时以行情时间作为策略时钟（见now()），保证同一份录制的结果可复现
+        self.use_event_time = False
+        self.event_time: Optional[datetime] = None
+        self._indicators = None  # 首次访问indicators时创建
         print(f"初始化策略: {self.__class__.__name__} (交易对: {self.inst_id}, 模式: {TRADING_MODE})")
 
-    def get_market_data(self, inst_id: str = None, bar: str = '1H', limit: str = '50') -> Optional[pd.DataFrame]:
-        """获取K线数据"""
+    @property
+    def indicators(self):
+        """AdvancedIndicators实例，首次访问时才导入（依赖pandas），之后复用同一个实例"""
+        if self._indicators is None:
+            from utils.advanced_indicators import AdvancedIndicators
+            
+            self._indicators = AdvancedIndicators()
+        return self._indicators
+
+    @indicators.setter
+    def indicators(self, value):
+        self._indicators = value
+
+    def get_market_data(self, inst_id: str = None, bar: str = '1H', limit: str = '50', as_frame: bool = True):
+        """
+        获取K线数据
+        
+        参数:
+            as_frame: True返回DataFrame；False返回Candles（零拷贝的NumPy列数组，信号计算热路径用，省去DataFrame构建）
+        
+        数据来自self.candle_cache，只有最后一根确认K线之后的部分会重新下载
+        """
         try:
             if inst_id is None:
                 inst_id = self.inst_id
-            result = self.client.get_candles(inst_id, bar, limit)
-            if result and result.get('code') == '0':
-                data = result['data']
-                df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'vol', 'volCcy', 'volCcy2', 'confirm'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df[['open', 'high', 'low', 'close', 'vol', 'volCcy', 'volCcy2']] = df[['open', 'high', 'low', 'close', 'vol', 'volCcy', 'volCcy2']].astype(float)
-                df = df.sort_values('timestamp')
-                return df
-            else:
-                print(f"❌ 获取K线数据失败: {result}")
+            arrays = self.candle_cache.get(inst_id, bar, int(limit))
+            if arrays is None:
                 return None
+            return candles_to_dataframe(arrays) if as_frame else Candles.from_arrays(arrays)
         except Exception as e:
             print(f"获取K线数据异常: {e}")
             return None
@@ -98,6 +126,37 @@ class BaseStrategy(ABC):
         except Exception as e:
             print(f"策略运行错误: {e}")
 
+    def now(self) -> datetime:
+        """策略时钟：use_event_time时为最近一条行情的时间，否则为系统时间"""
+        if self.use_event_time and self.event_time is not None:
+            return self.event_time
+        return datetime.now()
+
+    def _advance_clock(self, ts_ms: int):
+        if self.use_event_time:
+            event_time = datetime.fromtimestamp(ts_ms / 1000)
+            if self.event_time is None or event_time > self.event_time:
+                self.event_time = event_time
+
+    def on_bar(self, inst_id: str, bar: str, candle: Dict[str, Any], confirmed: bool):
+        """K线推送回调（MarketDataFeed），子类可覆盖"""
+        self.candle_cache.update(inst_id, bar, candle)
+        if inst_id == self.inst_id:
+            self.last_price = candle['close']
+            # 确认K线的时间是其收盘时刻
+            self._advance_clock(int(candle['ts']) + (bar_to_ms(bar) if confirmed else 0))
+
+    def on_ticker(self, inst_id: str, ticker: Dict[str, Any]):
+        """行情推送回调（MarketDataFeed），子类可覆盖"""
+        if inst_id == self.inst_id:
+            self.last_price = float(ticker['last'])
+            if ticker.get('ts'):
+                self._advance_clock(int(ticker['ts']))
+
+    def on_book(self, inst_id: str, book):
+        """订单簿推送回调（MarketDataFeed），子类可覆盖"""
+        self.order_books[inst_id] = book
+
     def get_position_info(self) -> Dict[str, Any]:
         """获取持仓信息"""
         return {
@@ -125,11 +184,20 @@ class BaseStrategy(ABC):
     
     def place_limit_order(self, inst_id: str, side: str, sz: str, current_price: float) -> Optional[Dict[str, Any]]:
         """下限价单，自动计算合适的价格"""
+        # 有本地订单簿时按实际深度定价：取能一次吃满sz的最差档位
+        limit_price = None
+        book = self.order_books.get(inst_id)
+        if book is not None and book.valid:
+            px = book.limit_price(side, float(sz))
+            if px is not None:
+                limit_price = str(px)
+                print(f"按深度定价: 均价${book.depth_price(side, float(sz)):.2f}, 预期滑点{book.slippage(side, float(sz)) * 100:.3f}%")
+        
         # 计算限价单价格
-        if side == "buy":
+        if limit_price is None and side == "buy":
             # 买入时价格稍微高一点确保成交
             limit_price = str(round(current_price * 1.001, 2))
-        else:
+        elif limit_price is None:
             # 卖出时价格稍微低一点确保成交
             limit_price = str(round(current_price * 0.999, 2))
         
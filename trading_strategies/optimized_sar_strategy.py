@@ -3,21 +3,26 @@
 基于base_strategy.py的优化SAR信号策略
 """
 
-import pandas as pd
 import numpy as np
 import math
 import time
-from datetime import datetime
 from typing import Dict, Any, Optional
 from .base_strategy import BaseStrategy
 from indicators import calculate_sar
 from indicators.sar import get_sar_signal
+from indicators.kernels import atr_values
+
+class _BookListener:
+    """只把feed的深度更新转给QueueListener"""
+    
+    def __init__(self, listener):
+        self.on_book = listener.on_book
 
 class OptimizedSARStrategy(BaseStrategy):
     """优化版SAR策略"""
     
-    def __init__(self, client, inst_id: str = "BTC-USDT-SWAP", inst_type: str = "SWAP"):
-        super().__init__(client, inst_id, inst_type)
+    def __init__(self, client, inst_id: str = "BTC-USDT-SWAP", inst_type: str = "SWAP", hub=None):
+        super().__init__(client, inst_id, inst_type, hub=hub)
         
         # SAR参数优化
         self.sar_af = 0.015  # 加速因子（从0.02降低）
@@ -34,6 +39,9 @@ class OptimizedSARStrategy(BaseStrategy):
         self.last_trade_time = None      # 上次交易时间
         self.min_trade_interval = 0.5    # 最小交易间隔(小时)
         
+        # K线周期
+        self.bar = '15m'
+        
         # 趋势过滤参数
         self.trend_period = 20  # 趋势判断周期
         self.min_trend_strength = 1.1  # 最小趋势强度
@@ -43,47 +51,22 @@ class OptimizedSARStrategy(BaseStrategy):
         print(f"   止损止盈: {self.sl_ratio}%/{self.tp_ratio}%")
         print(f"   趋势过滤: {self.trend_period}周期, 强度{self.min_trend_strength}")
     
-    def calculate_atr(self, df, period=14):
-        """计算真实波动率ATR"""
-        high = df['high'].values
-        low = df['low'].values
-        close = df['close'].values
-        
-        n = len(df)
-        tr = np.zeros(n)
-        
-        for i in range(1, n):
-            tr[i] = max(
-                high[i] - low[i],
-                abs(high[i] - close[i-1]),
-                abs(low[i] - close[i-1])
-            )
-        
-        # 计算ATR
-        atr = np.full(n, np.nan)
-        for i in range(period, n):
-            atr[i] = np.mean(tr[i-period+1:i+1])
-        
-        return atr
+    def calculate_atr(self, candles, period=14):
+        """计算真实波动率ATR（candles为Candles或DataFrame）"""
+        return atr_values(candles['high'], candles['low'], candles['close'], period)
     
-    def get_trend_filter(self, df):
-        """简单趋势过滤"""
+    def get_trend_filter(self, candles):
+        """简单趋势过滤（candles为Candles或DataFrame）"""
         try:
-            if len(df) < self.trend_period:
-                return True, 1.0
-            
-            # 计算SMA趋势
-            sma_short = df['close'].rolling(window=10).mean()
-            sma_long = df['close'].rolling(window=self.trend_period).mean()
-            
-            if len(sma_short) == 0 or len(sma_long) == 0:
+            close = np.asarray(candles['close'], dtype=float)
+            if len(close) < self.trend_period:
                 return True, 1.0
             
-            current_price = df['close'].iloc[-1]
-            sma_short_val = sma_short.iloc[-1]
-            sma_long_val = sma_long.iloc[-1]
+            # 计算SMA趋势（只需要最后一个值）
+            sma_short_val = close[-10:].mean()
+            sma_long_val = close[-self.trend_period:].mean()
             
-            if pd.isna(sma_short_val) or pd.isna(sma_long_val):
+            if np.isnan(sma_short_val) or np.isnan(sma_long_val):
                 return True, 1.0
             
             # 趋势强度计算
@@ -110,15 +93,15 @@ class OptimizedSARStrategy(BaseStrategy):
         """分析交易信号"""
         try:
             # 获取市场数据
-            df = self.get_market_data(bar='15m', limit='100')
-            if df is None or len(df) < 50:
+            candles = self.get_market_data(bar=self.bar, limit='100', as_frame=False)
+            if candles is None or len(candles) < 50:
                 return {'signal': 'hold', 'reason': 'insufficient_data'}
             
             # 计算SAR指标
-            sar, trend = calculate_sar(df['high'].values, df['low'].values, 
+            sar, trend = calculate_sar(candles.high, candles.low,
                                      self.sar_initial, self.sar_af, self.sar_max_af)
             
-            current_price = df['close'].iloc[-1]
+            current_price = float(candles.close[-1])
             
             # 1. 连续亏损控制
             if self.consecutive_losses >= self.max_consecutive_losses:
@@ -126,12 +109,12 @@ class OptimizedSARStrategy(BaseStrategy):
             
             # 2. 交易间隔控制
             if self.last_trade_time:
-                time_diff = (datetime.now() - self.last_trade_time).total_seconds() / 3600
+                time_diff = (self.now() - self.last_trade_time).total_seconds() / 3600
                 if time_diff < self.min_trade_interval:
                     return {'signal': 'hold', 'reason': 'trade_interval'}
             
             # 3. 趋势过滤
-            trend_ok, trend_direction = self.get_trend_filter(df)
+            trend_ok, trend_direction = self.get_trend_filter(candles)
             if not trend_ok:
                 return {'signal': 'hold', 'reason': 'weak_trend'}
             
@@ -139,7 +122,7 @@ class OptimizedSARStrategy(BaseStrategy):
             sar_signal = get_sar_signal(sar[-1], trend[-1], current_price)
             
             # 5. 波动率过滤
-            atr = self.calculate_atr(df)
+            atr = self.calculate_atr(candles)
             if len(atr) > 0 and not np.isnan(atr[-1]):
                 volatility_ok = atr[-1] > (current_price * 0.003)  # 最小波动率0.3%
             else:
@@ -220,12 +203,12 @@ class OptimizedSARStrategy(BaseStrategy):
                     'side': side,
                     'size': position_size,
                     'entry_price': current_price,
-                    'timestamp': datetime.now()
+                    'timestamp': self.now()
                 }
                 self.entry_price = current_price
                 self.take_profit_ratio = self.tp_ratio
                 self.stop_loss_ratio = self.sl_ratio
-                self.last_trade_time = datetime.now()
+                self.last_trade_time = self.now()
                 
                 # 设置止损止盈
                 self.set_stop_loss_take_profit(current_price, side)
@@ -250,17 +233,10 @@ class OptimizedSARStrategy(BaseStrategy):
             risk_amount = usdt_balance * adjusted_risk_ratio
             base_size = risk_amount / current_price
             
-            # 获取合约规格
-            instrument_info = self.client.get_instruments("SWAP")
-            ct_val = 0.01
-            lot_sz = 0.01
-            
-            if instrument_info and instrument_info.get('code') == '0':
-                for inst in instrument_info['data']:
-                    if inst['instId'] == self.inst_id:
-                        ct_val = float(inst['ctVal'])
-                        lot_sz = float(inst['lotSz'])
-                        break
+            # 获取合约规格（本地缓存，按instId索引）
+            specs = self.client.get_instrument_cache("SWAP")
+            ct_val = specs.contract_value(self.inst_id, 0.01)
+            lot_sz = specs.lot_size(self.inst_id, 0.01)
             
             # 计算合约张数
             target_btc_amount = base_size
@@ -373,9 +349,9 @@ class OptimizedSARStrategy(BaseStrategy):
             while True:
                 # 检查平仓条件
                 if self.position:
-                    df = self.get_market_data(bar='15m', limit='1')
-                    if df is not None and len(df) > 0:
-                        current_price = df['close'].iloc[-1]
+                    candles = self.get_market_data(bar=self.bar, limit='1', as_frame=False)
+                    if candles is not None and len(candles) > 0:
+                        current_price = float(candles.close[-1])
                         exit_reason = self.check_exit_conditions(current_price)
                         if exit_reason:
                             self.close_position(exit_reason)
@@ -395,3 +371,82 @@ class OptimizedSARStrategy(BaseStrategy):
             print(f"\n收到停止信号，正在退出优化版SAR策略...")
         except Exception as e:
             print(f"策略运行错误: {e}")
+    
+    def on_ticker(self, inst_id: str, ticker: Dict[str, Any]):
+        """价格推送: 有持仓时立即检查止损止盈"""
+        super().on_ticker(inst_id, ticker)
+        if inst_id != self.inst_id or not self.position:
+            return
+        exit_reason = self.check_exit_conditions(self.last_price)
+        if exit_reason:
+            self.close_position(exit_reason)
+    
+    def on_bar(self, inst_id: str, bar: str, candle: Dict[str, Any], confirmed: bool):
+        """K线推送: 每根确认K线收盘时分析信号"""
+        super().on_bar(inst_id, bar, candle, confirmed)
+        if inst_id != self.inst_id or bar != self.bar or not confirmed:
+            return
+        signal = self.analyze_signal()
+        print(f"\n[{self.now().strftime('%Y-%m-%d %H:%M:%S')}] 信号分析: {signal}")
+        self.execute_trade(signal)
+    
+    def run_streaming(self, feed, order_client=None):
+        """
+        使用WebSocket行情推送运行策略，取代轮询+sleep
+        
+        参数:
+            feed: market_data.ws_feed.MarketDataFeed实例（尚未start），
+                  或market_data.recorder.ReplayFeed（回放录制的行情，结束后返回）
+            order_client: 回放时的下单客户端，默认simulator.paper.PaperClient（只在本地记录订单）
+        
+        回放时完全离线：K线窗口只来自录制的推送（OfflineCandleCache），订单交给order_client，
+        交易间隔等按行情时间计算，同一份录制多次回放得到相同的信号和订单；回放后本实例不再连接实盘
+        """
+        from market_data.candle_cache import OfflineCandleCache
+        from market_data.recorder import ReplayFeed
+        from market_data.resample import Resampler
+        from market_data.ws_feed import QueueListener
+        
+        if isinstance(feed, ReplayFeed):
+            if order_client is None:
+                from simulator.paper import PaperClient
+                order_client = PaperClient()
+            self.client = order_client
+            self.candle_cache = OfflineCandleCache()
+            self.use_event_time = True
+            self.event_time = None
+            self.last_trade_time = None
+        
+        print(f"\n开始运行优化版SAR策略(推送模式)...")
+        print("按 Ctrl+C 停止")
+        # 回调统一在主线程中处理，避免与行情线程并发修改持仓状态
+        listener = QueueListener()
+        # 只订阅1m K线，策略周期由本地合成
+        feed.add_listener(Resampler(bars=(self.bar,), base_bar='1m', listeners=[listener]))
+        # 深度不经过合成器，直接送入同一个队列
+        feed.add_listener(_BookListener(listener))
+        feed.subscribe_candles(self.inst_id, '1m')
+        feed.subscribe_tickers(self.inst_id)
+        feed.subscribe_books(self.inst_id)
+        feed.start()
+        try:
+            while True:
+                event = listener.queue.get()
+                kind = event[0]
+                if kind == 'bar':
+                    self.on_bar(*event[1:])
+                elif kind == 'ticker':
+                    self.on_ticker(*event[1:])
+                elif kind == 'book':
+                    self.on_book(*event[1:])
+                elif kind == 'gap':
+                    print(f"⚠️ 行情缺口: {event[1:]}")
+                elif kind == 'end':
+                    print("✅ 行情回放结束")
+                    break
+        except KeyboardInterrupt:
+            print(f"\n收到停止信号，正在退出优化版SAR策略...")
+        except Exception as e:
+            print(f"策略运行错误: {e}")
+        finally:
+            feed.stop()
@@ -12,6 +12,14 @@ warnings.filterwarnings('ignore')
 class AdvancedIndicators:
     """高级技术指标计算类"""
     
+    @staticmethod
+    def _rolling_extrema(high: pd.Series, low: pd.Series, period: int) -> Tuple[pd.Series, pd.Series]:
+        """窗口内最高价和最低价，一次遍历同时求出（与rolling().max()/min()结果相同）"""
+        from indicators.kernels import rolling_extrema
+
+        highest, lowest = rolling_extrema(high.to_numpy(dtype=float), low.to_numpy(dtype=float), period)
+        return pd.Series(highest, index=high.index, name=high.name), pd.Series(lowest, index=low.index, name=low.name)
+    
     @staticmethod
     def sma(data: pd.Series, period: int) -> pd.Series:
         """简单移动平均线"""
@@ -24,9 +32,14 @@ class AdvancedIndicators:
     
     @staticmethod
     def wma(data: pd.Series, period: int) -> pd.Series:
-        """加权移动平均线"""
+        """加权移动平均线（卷积一次算出所有窗口的加权和）"""
         weights = np.arange(1, period + 1)
-        return data.rolling(window=period).apply(lambda x: np.average(x, weights=weights), raw=True)
+        values = data.to_numpy(dtype=float)
+        wma = np.full(len(values), np.nan)
+        if len(values) >= period:
+            # np.convolve会翻转卷积核，逆序传入后最新的价格权重最大
+            wma[period - 1:] = np.convolve(values, weights[::-1].astype(float), mode='valid') / weights.sum()
+        return pd.Series(wma, index=data.index, name=data.name)
     
     @staticmethod
     def dema(data: pd.Series, period: int) -> pd.Series:
@@ -105,8 +118,7 @@ class AdvancedIndicators:
     @staticmethod
     def stochastic(high: pd.Series, low: pd.Series, close: pd.Series, k_period: int = 14, d_period: int = 3) -> Dict[str, pd.Series]:
         """随机指标"""
-        lowest_low = low.rolling(window=k_period).min()
-        highest_high = high.rolling(window=k_period).max()
+        highest_high, lowest_low = AdvancedIndicators._rolling_extrema(high, low, k_period)
         
         k_percent = 100 * ((close - lowest_low) / (highest_high - lowest_low))
         d_percent = k_percent.rolling(window=d_period).mean()
@@ -119,8 +131,7 @@ class AdvancedIndicators:
     @staticmethod
     def williams_r(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> pd.Series:
         """威廉指标"""
-        highest_high = high.rolling(window=period).max()
-        lowest_low = low.rolling(window=period).min()
+        highest_high, lowest_low = AdvancedIndicators._rolling_extrema(high, low, period)
         return -100 * ((highest_high - close) / (highest_high - lowest_low))
     
     @staticmethod
@@ -128,7 +139,21 @@ class AdvancedIndicators:
         """商品通道指数"""
         typical_price = (high + low + close) / 3
         sma_tp = typical_price.rolling(window=period).mean()
-        mean_deviation = typical_price.rolling(window=period).apply(lambda x: np.mean(np.abs(x - x.mean())), raw=True)
+        
+        # 平均绝对偏差：把所有窗口排成(窗口数, period)的跨步视图（不复制数据），逐块整体计算
+        values = np.ascontiguousarray(typical_price.to_numpy(dtype=float))
+        deviation = np.full(len(values), np.nan)
+        count = len(values) - period + 1
+        if count > 0:
+            windows = np.lib.stride_tricks.as_strided(values, shape=(count, period),
+                                                      strides=(values.strides[0], values.strides[0]),
+                                                      writeable=False)
+            step = max(1, (1 << 18) // period)  # 每块的临时数组约2MB
+            for start in range(0, count, step):
+                block = windows[start:start + step]
+                deviation[period - 1 + start:period - 1 + start + len(block)] = \
+                    np.abs(block - block.mean(axis=1, keepdims=True)).mean(axis=1)
+        mean_deviation = pd.Series(deviation, index=typical_price.index)
         return (typical_price - sma_tp) / (0.015 * mean_deviation)
     
     @staticmethod
@@ -164,68 +189,31 @@ class AdvancedIndicators:
     @staticmethod
     def parabolic_sar(high: pd.Series, low: pd.Series, close: pd.Series, 
                      initial_af: float = 0.02, af_increment: float = 0.02, max_af: float = 0.2) -> pd.Series:
-        """抛物线SAR"""
-        length = len(high)
-        sar = np.zeros(length)
-        trend = np.zeros(length, dtype=int)
-        af = np.zeros(length)
-        ep = np.zeros(length)
-        
-        # 初始化
-        sar[0] = low.iloc[0]
-        trend[0] = 1
-        af[0] = initial_af
-        ep[0] = high.iloc[0]
-        
-        for i in range(1, length):
-            if trend[i-1] == 1:  # 上升趋势
-                sar[i] = sar[i-1] + af[i-1] * (ep[i-1] - sar[i-1])
-                if low.iloc[i] <= sar[i]:
-                    trend[i] = -1
-                    sar[i] = ep[i-1]
-                    af[i] = initial_af
-                    ep[i] = low.iloc[i]
-                else:
-                    trend[i] = 1
-                    if high.iloc[i] > ep[i-1]:
-                        af[i] = min(af[i-1] + af_increment, max_af)
-                        ep[i] = high.iloc[i]
-                    else:
-                        af[i] = af[i-1]
-                        ep[i] = ep[i-1]
-            else:  # 下降趋势
-                sar[i] = sar[i-1] + af[i-1] * (ep[i-1] - sar[i-1])
-                if high.iloc[i] >= sar[i]:
-                    trend[i] = 1
-                    sar[i] = ep[i-1]
-                    af[i] = initial_af
-                    ep[i] = high.iloc[i]
-                else:
-                    trend[i] = -1
-                    if low.iloc[i] < ep[i-1]:
-                        af[i] = min(af[i-1] + af_increment, max_af)
-                        ep[i] = low.iloc[i]
-                    else:
-                        af[i] = af[i-1]
-                        ep[i] = ep[i-1]
-        
+        """抛物线SAR（逐根递推由indicators.kernels执行，有numba时编译为机器码）"""
+        from indicators.kernels import psar_loop
+
+        sar = psar_loop(high.to_numpy(dtype=float), low.to_numpy(dtype=float), initial_af, af_increment, max_af)
         return pd.Series(sar, index=high.index)
     
     @staticmethod
     def ichimoku(high: pd.Series, low: pd.Series, close: pd.Series, 
                 tenkan_period: int = 9, kijun_period: int = 26, senkou_b_period: int = 52) -> Dict[str, pd.Series]:
         """一目均衡表"""
+        def midpoint(period):
+            highest_high, lowest_low = AdvancedIndicators._rolling_extrema(high, low, period)
+            return (highest_high + lowest_low) / 2
+        
         # 转换线
-        tenkan_sen = (high.rolling(window=tenkan_period).max() + low.rolling(window=tenkan_period).min()) / 2
+        tenkan_sen = midpoint(tenkan_period)
         
         # 基准线
-        kijun_sen = (high.rolling(window=kijun_period).max() + low.rolling(window=kijun_period).min()) / 2
+        kijun_sen = midpoint(kijun_period)
         
         # 先行带A
         senkou_span_a = ((tenkan_sen + kijun_sen) / 2).shift(kijun_period)
         
         # 先行带B
-        senkou_span_b = ((high.rolling(window=senkou_b_period).max() + low.rolling(window=senkou_b_period).min()) / 2).shift(kijun_period)
+        senkou_span_b = midpoint(senkou_b_period).shift(kijun_period)
         
         # 滞后线
         chikou_span = close.shift(-kijun_period)